@@ -0,0 +1,129 @@
+"""응답 압축 벤치마크 (전송 바이트 절감량 / 압축 시간)
+
+benchmarks/stubs.py 대역 위에서 일반적인 크기의 세션 상세(30턴, 번역 포함), 세션 목록,
+분석 결과(교정 8건), TTS(base64 오디오) 응답을 만들고 Accept-Encoding별 전송 바이트와 핸들러 시간을 비교.
+대역의 고정 문구/무음 오디오는 실제보다 압축이 잘 되므로, 대화는 턴마다 다른 문장을 조합하고
+TTS는 압축되지 않는 MP3와 비슷하게 난수 바이트로 대체. brotli 모듈이 없으면 br 항목은 건너뜀.
+
+사용법: python benchmarks/bench_compression.py [턴 수] [반복 횟수]
+"""
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIDBENCHMARK')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark-secret')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+import lambda_function  # noqa: E402
+from load_sessions import USER_LINES  # noqa: E402
+import stubs  # noqa: E402
+
+REPLY_OPENERS = ['That sounds great!', 'Oh, really?', 'Interesting!', 'I see.', 'Nice work!', 'Wow,']
+REPLY_QUESTIONS = [
+    'What did you enjoy the most about it?', 'How long have you been doing that?',
+    'Who did you go with?', 'What are you planning to do next time?', 'How did that make you feel?',
+    'Could you tell me a little more about your team?', 'What was the hardest part?',
+]
+
+USER_ID = 'bench-user'
+
+
+def call(body, accept_encoding=None):
+    """lambda_handler 호출 → (응답, 소요 ms)"""
+    event = {'httpMethod': 'POST', 'body': json.dumps({'userId': USER_ID, **body})}
+    if accept_encoding:
+        event['headers'] = {'accept-encoding': accept_encoding}
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(event, None)
+    return response, (time.perf_counter() - start) * 1000
+
+
+def wire_bytes(response):
+    """API Gateway가 클라이언트로 보내는 본문 바이트 수 (base64는 디코딩 후 크기)"""
+    body = response['body']
+    return len(base64.b64decode(body)) if response.get('isBase64Encoded') else len(body.encode('utf-8'))
+
+
+def make_line(rng, parts):
+    return ' '.join(rng.choice(part) for part in parts)
+
+
+def seed_sessions(turns):
+    for index in range(20):
+        session_id = f'bench-session-{index}'
+        call({'action': 'start_session', 'sessionId': session_id, 'settings': {'topic': 'travel'}, 'tutorName': 'Emma'})
+        call({'action': 'end_session', 'sessionId': session_id, 'duration': 300, 'turnCount': turns, 'wordCount': 400})
+
+    rng = random.Random(7)
+    messages = []
+    for turn in range(turns):
+        user_text = make_line(rng, [USER_LINES, USER_LINES])
+        reply = make_line(rng, [REPLY_OPENERS, REPLY_QUESTIONS])
+        for role, content in (('user', user_text), ('assistant', reply)):
+            message = {'role': role, 'content': content, 'translation': f'(번역) {content[::-1]}', 'turnNumber': turn}
+            call({'action': 'save_message', 'sessionId': 'bench-session-0', 'message': message})
+            messages.append({'role': role, 'content': content})
+    return messages
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    env = stubs.install_stubs(lambda_function)
+    lambda_function.RESPONSE_COMPRESSION_ENABLED = True
+    encodings = ['gzip'] + (['br'] if lambda_function.brotli else [])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        messages = seed_sessions(turns)
+    # 실제 분석 응답 크기에 가깝게 교정 항목을 채움
+    user_messages = [m['content'] for m in messages if m['role'] == 'user']
+    stubs.FAKE_ANALYSIS['grammar_corrections'] = [
+        {'original': text, 'corrected': text.replace('I ', 'I really '), 'explanation': f'{i + 1}번째 문장은 부사를 넣으면 더 자연스러워요.'}
+        for i, text in enumerate(user_messages[:8])
+    ]
+    # 대역 오디오는 무음 프레임이므로 압축이 거의 안 되는 실제 MP3처럼 난수 바이트로 교체
+    env.polly.synthesize_speech = lambda Text, **kwargs: {
+        'AudioStream': stubs.StreamingBody(os.urandom(len(Text) * 90)), 'ContentType': 'audio/mpeg'}
+    lambda_function.ELEVENLABS_API_BASE = 'http://127.0.0.1:9'  # 연결 실패 → Polly 경로 사용
+
+    cases = {
+        'get_session_detail': {'action': 'get_session_detail', 'sessionId': 'bench-session-0'},
+        'get_sessions': {'action': 'get_sessions', 'limit': 20},
+        'analyze': {'action': 'analyze', 'messages': messages},
+        'tts': {'action': 'tts', 'text': ' '.join(REPLY_QUESTIONS[:3]), 'settings': {}},
+    }
+
+    print(f'turns={turns} iterations={iterations} threshold={lambda_function.RESPONSE_COMPRESSION_MIN_BYTES}B '
+          f'brotli={"yes" if lambda_function.brotli else "no"}')
+    print(f'{"response":<20} {"encoding":<9} {"bytes":>9} {"saved":>7} {"handler ms":>11}')
+    try:
+        for name, body in cases.items():
+            for encoding in [None] + encodings:
+                timings = []
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(iterations):
+                        response, elapsed = call(body, encoding)
+                        timings.append(elapsed)
+                size = wire_bytes(response)
+                if encoding is None:
+                    identity = size
+                saved = 1 - size / identity if identity else 0
+                timings.sort()
+                print(f'{name:<20} {encoding or "identity":<9} {size:>9,} {saved:>6.0%} {timings[len(timings) // 2]:>11.2f}')
+    finally:
+        env.shutdown()
+
+
+if __name__ == '__main__':
+    main()
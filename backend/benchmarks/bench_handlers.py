@@ -0,0 +1,248 @@
+"""액션별 핸들러 지연 시간/메모리 벤치마크 (오프라인)
+
+benchmarks/stubs.py의 인메모리 AWS 대역과 ElevenLabs 목 서버를 설치한 뒤
+fixtures/events.json의 입력으로 ACTION_HANDLERS의 모든 액션을 lambda_handler 경로로 실행.
+액션별 p50/p95/p99 지연, 상태 코드 분포, DynamoDB RCU/WCU, tracemalloc 최대/잔여 메모리를 보고.
+fixture가 없는 액션은 경고로 표시하여 새 핸들러가 벤치마크에서 빠지지 않게 함.
+
+사용법:
+  python benchmarks/bench_handlers.py [반복 횟수]
+      [--actions chat,tts] [--bedrock-ms 0] [--translate-ms 0] [--elevenlabs-ms 0]
+      [--json results.json] [--baseline results.json] [--tolerance 0.2]
+
+--baseline 지정 시 p95가 tolerance 비율 이상 느려진 액션이 있으면 종료 코드 1 (CI 회귀 검사용).
+"""
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+# 실제 자격증명이 없어도 클라이언트 생성/서명이 되도록 더미 값 지정
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIDBENCHMARK')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark-secret')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+import lambda_function  # noqa: E402
+from mock_elevenlabs import FAKE_MP3_FRAME  # noqa: E402
+from stubs import install_stubs  # noqa: E402
+
+FIXTURES_PATH = os.path.join(BENCH_DIR, 'fixtures', 'events.json')
+
+# 스케줄 작업 등 API 바디로 호출하지 않는 액션
+NON_API_ACTIONS = set(lambda_function.SCHEDULED_TASKS)
+
+
+def make_sample_image():
+    """썸네일 생성 경로가 실제로 돌도록 작은 JPEG 생성 (Pillow 없으면 빈 바이트)"""
+    try:
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, 'JPEG')
+        return buffer.getvalue()
+    except ImportError:
+        return b'\xff\xd8\xff\xd9'
+
+
+PLACEHOLDERS = {
+    'image_jpeg': make_sample_image(),
+    'audio_webm': FAKE_MP3_FRAME * 40,
+}
+PLACEHOLDER_PATTERN = re.compile(r'^\{\{(\w+)\}\}$')
+
+
+def resolve(value, context):
+    """fixture 값의 {{name}} 치환 (setup 응답 필드 → PLACEHOLDERS 순, 바이트는 base64)"""
+    if isinstance(value, dict):
+        return {k: resolve(v, context) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, context) for v in value]
+    if isinstance(value, str):
+        match = PLACEHOLDER_PATTERN.match(value)
+        if match:
+            name = match.group(1)
+            resolved = context.get(name, PLACEHOLDERS.get(name))
+            if resolved is None:
+                raise KeyError(f'Unknown fixture placeholder: {name}')
+            return base64.b64encode(resolved).decode() if isinstance(resolved, bytes) else resolved
+    return value
+
+
+def invoke(body):
+    """API Gateway 이벤트 형태로 lambda_handler 호출 → (상태 코드, 응답 바디 dict)
+
+    핸들러 로그(print)는 버려서 결과 표가 읽히게 하고 터미널 출력 I/O가 측정 시간에 섞이지 않게 함.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_function.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    try:
+        payload = json.loads(response.get('body') or '{}')
+    except ValueError:
+        payload = {}
+    return response['statusCode'], payload if isinstance(payload, dict) else {}
+
+
+def run_setup(bodies, context):
+    for body in bodies:
+        status, payload = invoke(resolve(body, context))
+        if status != 200:
+            print(f'  setup {body.get("action")} failed ({status}): {payload.get("error")}')
+        context.update({k: v for k, v in payload.items() if isinstance(v, (str, int))})
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_action(env, action, fixture, iterations, warmup):
+    """단일 액션 측정 → 결과 dict"""
+    context = {}
+    run_setup(fixture.get('setup', []), context)
+    body = {'action': action, **fixture['body']}
+    before = fixture.get('before', [])
+
+    for _ in range(warmup):
+        run_setup(before, context)
+        invoke(resolve(body, context))
+
+    latencies, statuses, errors = [], Counter(), Counter()
+    read_units = write_units = 0.0
+    for _ in range(iterations):
+        run_setup(before, context)
+        request = resolve(body, context)
+        env.reset_capacity()
+        start = time.perf_counter()
+        status, payload = invoke(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+        capacity = env.dynamodb.meter.snapshot()
+        read_units += capacity['read']
+        write_units += capacity['write']
+        statuses[status] += 1
+        if status >= 400:
+            errors[str(payload.get('error', ''))[:80]] += 1
+
+    # 메모리는 별도 패스로 측정 (tracemalloc 오버헤드가 지연 측정에 섞이지 않게)
+    peaks, retained = [], []
+    for _ in range(min(iterations, 5)):
+        run_setup(before, context)
+        request = resolve(body, context)
+        tracemalloc.start()
+        baseline_size, _ = tracemalloc.get_traced_memory()
+        invoke(request)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append((peak - baseline_size) / 1024)
+        retained.append((current - baseline_size) / 1024)
+
+    return {
+        'action': action,
+        'iterations': iterations,
+        'p50Ms': round(percentile(latencies, 50), 3),
+        'p95Ms': round(percentile(latencies, 95), 3),
+        'p99Ms': round(percentile(latencies, 99), 3),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'errors': dict(errors),
+        'rcuPerCall': round(read_units / iterations, 2),
+        'wcuPerCall': round(write_units / iterations, 2),
+        'peakKiB': round(max(peaks), 1) if peaks else 0.0,
+        'retainedKiB': round(sum(retained) / len(retained), 1) if retained else 0.0
+    }
+
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    """기준 결과 대비 p95 회귀 액션 목록"""
+    with open(baseline_path) as f:
+        baseline = {r['action']: r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['action'])
+        if not previous or previous['p95Ms'] <= 0:
+            continue
+        ratio = result['p95Ms'] / previous['p95Ms']
+        if ratio > 1 + tolerance:
+            regressions.append((result['action'], previous['p95Ms'], result['p95Ms'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline handler benchmark')
+    parser.add_argument('iterations', nargs='?', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--actions', help='쉼표로 구분한 액션 목록 (기본: 전체)')
+    parser.add_argument('--bedrock-ms', type=float, default=0)
+    parser.add_argument('--translate-ms', type=float, default=0)
+    parser.add_argument('--elevenlabs-ms', type=int, default=0)
+    parser.add_argument('--json', help='결과를 JSON 파일로 저장')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='허용 p95 증가 비율')
+    args = parser.parse_args()
+
+    with open(FIXTURES_PATH) as f:
+        fixtures = json.load(f)
+
+    env = install_stubs(
+        lambda_function,
+        bedrock_latency=args.bedrock_ms / 1000,
+        translate_latency=args.translate_ms / 1000,
+        elevenlabs_latency_ms=args.elevenlabs_ms
+    )
+    # 같은 사용자로 수십 번 반복 호출하므로 속도 제한을 끄고 핸들러 자체만 측정
+    lambda_function.RATE_LIMIT_ENABLED = False
+    for key, value in fixtures.get('s3Objects', {}).items():
+        data = resolve(value, {})
+        env.s3.put_object(Bucket=lambda_function.S3_BUCKET, Key=key, Body=base64.b64decode(data))
+
+    api_actions = [a for a in lambda_function.ACTION_HANDLERS if a not in NON_API_ACTIONS]
+    missing = [a for a in api_actions if a not in fixtures['actions']]
+    for action in missing:
+        print(f'WARNING: no fixture for action "{action}" (add it to fixtures/events.json)')
+
+    selected = args.actions.split(',') if args.actions else [a for a in api_actions if a in fixtures['actions']]
+
+    print(f'iterations={args.iterations} warmup={args.warmup} bedrock={args.bedrock_ms}ms '
+          f'translate={args.translate_ms}ms elevenlabs={args.elevenlabs_ms}ms')
+    print(f'{"action":<24} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"RCU":>6} {"WCU":>6} '
+          f'{"peak KiB":>9} {"kept KiB":>9}  status')
+
+    results = []
+    try:
+        for action in selected:
+            result = bench_action(env, action, fixtures['actions'][action], args.iterations, args.warmup)
+            results.append(result)
+            statuses = ' '.join(f'{k}x{v}' for k, v in result['statuses'].items())
+            print(f'{action:<24} {result["p50Ms"]:>9.2f} {result["p95Ms"]:>9.2f} {result["p99Ms"]:>9.2f} '
+                  f'{result["rcuPerCall"]:>6.1f} {result["wcuPerCall"]:>6.1f} '
+                  f'{result["peakKiB"]:>9.1f} {result["retainedKiB"]:>9.1f}  {statuses}')
+            for error, count in result['errors'].items():
+                print(f'    {count}x {error}')
+    finally:
+        env.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'missingFixtures': missing, 'results': results}, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for action, before_ms, after_ms, ratio in regressions:
+            print(f'REGRESSION: {action} p95 {before_ms:.2f}ms → {after_ms:.2f}ms (x{ratio:.2f})')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""응답 직렬화 벤치마크 (DTO 투영 + JSON 백엔드)
+
+DynamoDB 형태(Decimal 포함)의 세션 목록/세션 상세를 만들어
+변경 전 방식(필드 수동 복사 + json.dumps), 투영 + 표준 json, 투영 + orjson을 비교.
+orjson이 설치되어 있지 않으면 해당 항목은 건너뜀.
+
+사용법: python benchmarks/bench_serialization.py [반복 횟수] [세션 수]
+"""
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import lambda_function  # noqa: E402
+
+
+def make_session_items(count):
+    return [{
+        'PK': 'DEVICE#bench-user',
+        'SK': f'SESSION#2026-01-01T10:{i % 60:02d}:00+09:00#s{i}#META',
+        'type': 'SESSION_META',
+        'sessionId': f'session-{i}',
+        'tutorName': 'Emma',
+        'topic': 'daily',
+        'accent': 'us',
+        'level': 'intermediate',
+        'settings': {'speed': Decimal('1.0'), 'accent': 'us'},
+        'startedAt': '2026-01-01T10:00:00+09:00',
+        'endedAt': '2026-01-01T10:05:00+09:00',
+        'duration': Decimal(300 + i),
+        'turnCount': Decimal(12),
+        'wordCount': Decimal(240),
+        'status': 'completed',
+        'ttl': Decimal(1900000000)
+    } for i in range(count)]
+
+
+def legacy_sessions(items):
+    """변경 전: 핸들러에서 필드를 하나씩 복사하며 int() 변환"""
+    return [{
+        'sessionId': item.get('sessionId'),
+        'tutorName': item.get('tutorName'),
+        'topic': item.get('topic', 'daily'),
+        'accent': item.get('accent', 'us'),
+        'level': item.get('level', 'intermediate'),
+        'startedAt': item.get('startedAt'),
+        'endedAt': item.get('endedAt'),
+        'duration': int(item.get('duration', 0)),
+        'turnCount': int(item.get('turnCount', 0)),
+        'wordCount': int(item.get('wordCount', 0)),
+        'status': item.get('status')
+    } for item in items]
+
+
+def measure(label, iterations, fn):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        size = len(fn())
+    elapsed = time.perf_counter() - start
+    print(f'{label:<36} {elapsed * 1e6 / iterations:>10,.1f} us/response  ({size:,} chars)')
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    items = make_session_items(count)
+    orjson = lambda_function.orjson
+
+    print(f'iterations={iterations} sessions={count} orjson={"yes" if orjson else "no"}')
+    measure('legacy copy + json.dumps', iterations,
+            lambda: json.dumps({'sessions': legacy_sessions(items)}))
+
+    lambda_function.orjson = None
+    measure('projection + json (default hook)', iterations,
+            lambda: lambda_function.dumps_json({'sessions': lambda_function.project_items(
+                items, lambda_function.SESSION_SUMMARY_DTO)}))
+    measure('raw items + json (default hook)', iterations,
+            lambda: lambda_function.dumps_json({'sessions': items}))
+
+    if orjson:
+        lambda_function.orjson = orjson
+        measure('projection + orjson', iterations,
+                lambda: lambda_function.dumps_json({'sessions': lambda_function.project_items(
+                    items, lambda_function.SESSION_SUMMARY_DTO)}))
+        measure('raw items + orjson', iterations,
+                lambda: lambda_function.dumps_json({'sessions': items}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Transcribe Streaming URL 발급 처리량 벤치마크
+
+서명 키 캐시 적중/미적중, 단건/일괄 발급의 초당 URL 수를 비교.
+AWS 호출 없이 로컬에서 실행 (더미 자격증명 사용).
+
+사용법: python benchmarks/bench_transcribe_url.py [반복 횟수]
+"""
+import os
+import sys
+import time
+
+# 실제 자격증명이 없어도 서명 계산만 수행되도록 더미 값 지정
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIDBENCHMARK')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark-secret')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import lambda_function  # noqa: E402
+
+
+def measure(label, iterations, fn):
+    """fn을 iterations회 실행하고 초당 처리량 출력"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<32} {iterations / elapsed:>12,.0f} URLs/s  ({elapsed * 1e6 / iterations:,.1f} us/URL)')
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    def uncached():
+        lambda_function.SIGNING_KEY_CACHE.clear()
+        lambda_function.build_transcribe_url('en-US', 16000)
+
+    def cached():
+        lambda_function.build_transcribe_url('en-US', 16000)
+
+    def per_request_session():
+        # 변경 전 방식: 매 요청마다 새 세션에서 자격증명 해석 + 서명 키 도출
+        credentials = lambda_function.boto3.Session().get_credentials().get_frozen_credentials()
+        lambda_function.SIGNING_KEY_CACHE.clear()
+        lambda_function.build_transcribe_url('en-US', 16000, credentials=credentials)
+
+    batch_size = 50
+    specs = [{'language': 'en-US', 'sampleRate': 16000}] * batch_size
+
+    def batch():
+        lambda_function.issue_transcribe_urls(specs)
+
+    print(f'iterations={iterations}')
+    measure('new session + key derivation', max(iterations // 20, 1), per_request_session)
+    measure('shared session, key derivation', iterations, uncached)
+    measure('shared session, cached key', iterations, cached)
+
+    start = time.perf_counter()
+    rounds = max(iterations // batch_size, 1)
+    for _ in range(rounds):
+        batch()
+    elapsed = time.perf_counter() - start
+    print(f'{"batch issue (50 per call)":<32} {rounds * batch_size / elapsed:>12,.0f} URLs/s')
+
+
+if __name__ == '__main__':
+    main()
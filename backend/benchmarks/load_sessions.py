@@ -0,0 +1,218 @@
+"""동시 통화 부하 생성기 (오프라인)
+
+실제 통화 한 건의 요청 순서를 재현하는 세션 스크립트를 여러 가상 사용자가 동시에 실행:
+  start_session → N × (chat, tts, translate, save_message[user/assistant], increment_usage)
+  → end_session → analyze → extract_user_info
+benchmarks/stubs.py의 대역(지연 시간 설정 가능)과 ElevenLabs 목 서버를 대상으로 하며,
+처리량(통화/초, 요청/초), 액션별 꼬리 지연, 통화당 DynamoDB RCU/WCU를 보고.
+
+사용법:
+  python benchmarks/load_sessions.py [--calls 500] [--concurrency 500] [--turns 6]
+      [--think-ms 1500] [--bedrock-ms 900] [--translate-ms 80] [--polly-ms 150]
+      [--elevenlabs-ms 300] [--users 0] [--no-rate-limit] [--json results.json]
+
+--users 0이면 통화마다 다른 사용자, 양수이면 해당 수의 사용자를 돌려 씀 (같은 사용자 동시 통화 재현).
+속도 제한은 기본으로 켜져 있어 전체 버킷을 넘는 부하는 429로 집계됨 (--no-rate-limit으로 끔).
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_handlers import invoke, percentile
+import lambda_function
+from stubs import install_stubs
+
+USER_LINES = [
+    "Hi! I went hiking with my friends last weekend.",
+    "We went to Bukhansan. The view from the top was amazing.",
+    "I usually work from home, but on Fridays I go to the office.",
+    "My team is preparing a presentation for a client next week.",
+    "I want to improve my English for business meetings.",
+    "Yesterday I cooked pasta for my family and they loved it.",
+    "I'm planning a trip to Japan in the spring.",
+    "Honestly, I get nervous when I speak English on the phone.",
+]
+
+SETTINGS = {'accent': 'us', 'level': 'intermediate', 'topic': 'daily', 'gender': 'female'}
+
+
+class LoadStats:
+    """스레드 간 공유 집계"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.call_durations = []
+        self.call_capacity = []
+        self.failed_calls = 0
+        self.requests = 0
+
+    def record_request(self, action, elapsed_ms, status):
+        with self.lock:
+            self.latencies[action].append(elapsed_ms)
+            self.statuses[action][status] += 1
+            self.requests += 1
+
+    def record_call(self, duration, read_units, write_units, failed):
+        with self.lock:
+            self.call_durations.append(duration)
+            self.call_capacity.append((read_units, write_units))
+            self.failed_calls += int(failed)
+
+
+def run_call(call_index, args, stats, meter):
+    """가상 통화 1건 실행 (한 스레드에서 순차 실행)"""
+    user_id = f'load-user-{call_index % args.users if args.users else call_index}'
+    device_id = f'load-device-{call_index}'
+    session_id = f'load-session-{call_index}'
+    rng = random.Random(call_index)
+    failed = False
+    read_before, write_before = meter.thread_units()
+    call_start = time.perf_counter()
+
+    def request(action, **body):
+        nonlocal failed
+        start = time.perf_counter()
+        status, payload = invoke({'action': action, 'userId': user_id, 'deviceId': device_id, **body})
+        stats.record_request(action, (time.perf_counter() - start) * 1000, status)
+        failed = failed or status >= 400
+        return payload
+
+    def think():
+        if args.think_ms:
+            # 사용자 발화/청취 시간 (±50% 지터)
+            time.sleep(args.think_ms / 1000 * rng.uniform(0.5, 1.5))
+
+    request('start_session', sessionId=session_id, settings=SETTINGS, tutorName='Emma')
+    messages = []
+    for turn in range(args.turns):
+        think()
+        user_text = rng.choice(USER_LINES)
+        messages.append({'role': 'user', 'content': user_text})
+        request('save_message', sessionId=session_id, message={'role': 'user', 'content': user_text})
+
+        reply = request('chat', messages=messages, settings=SETTINGS).get('message') or 'Tell me more.'
+        messages.append({'role': 'assistant', 'content': reply})
+        request('tts', text=reply, settings=SETTINGS)
+        request('translate', text=reply, sourceLang='en', targetLang='ko')
+        request('save_message', sessionId=session_id, message={'role': 'assistant', 'content': reply})
+        request('increment_usage', usageType='chat')
+
+    word_count = sum(len(m['content'].split()) for m in messages if m['role'] == 'user')
+    request('end_session', sessionId=session_id, duration=int(time.perf_counter() - call_start),
+            turnCount=args.turns, wordCount=word_count)
+    request('analyze', messages=messages)
+    request('extract_user_info', sessionId=session_id, messages=messages)
+
+    read_after, write_after = meter.thread_units()
+    stats.record_call(time.perf_counter() - call_start, read_after - read_before, write_after - write_before, failed)
+
+
+def print_report(stats, elapsed, args):
+    calls = len(stats.call_durations)
+    print(f'\ncalls={calls} concurrency={args.concurrency} turns={args.turns} elapsed={elapsed:.1f}s')
+    print(f'throughput: {calls / elapsed:.2f} calls/s, {stats.requests / elapsed:.1f} requests/s, '
+          f'failed calls={stats.failed_calls}')
+    if calls:
+        print(f'call duration: p50={percentile(stats.call_durations, 50):.1f}s '
+              f'p95={percentile(stats.call_durations, 95):.1f}s')
+        reads = [r for r, _ in stats.call_capacity]
+        writes = [w for _, w in stats.call_capacity]
+        print(f'DynamoDB per call: RCU avg={sum(reads) / calls:.1f} max={max(reads):.1f}, '
+              f'WCU avg={sum(writes) / calls:.1f} max={max(writes):.1f}')
+
+    print(f'\n{"action":<20} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}  status')
+    for action, values in stats.latencies.items():
+        statuses = ' '.join(f'{k}x{v}' for k, v in sorted(stats.statuses[action].items()))
+        print(f'{action:<20} {len(values):>7} {percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} '
+              f'{percentile(values, 99):>9.1f} {max(values):>9.1f}  {statuses}')
+
+
+def build_summary(stats, elapsed, args):
+    calls = len(stats.call_durations)
+    return {
+        'config': vars(args),
+        'elapsedSeconds': round(elapsed, 2),
+        'callsPerSecond': round(calls / elapsed, 3),
+        'requestsPerSecond': round(stats.requests / elapsed, 2),
+        'failedCalls': stats.failed_calls,
+        'rcuPerCall': round(sum(r for r, _ in stats.call_capacity) / calls, 2) if calls else 0,
+        'wcuPerCall': round(sum(w for _, w in stats.call_capacity) / calls, 2) if calls else 0,
+        'actions': {
+            action: {
+                'count': len(values),
+                'p50Ms': round(percentile(values, 50), 2),
+                'p95Ms': round(percentile(values, 95), 2),
+                'p99Ms': round(percentile(values, 99), 2),
+                'statuses': {str(k): v for k, v in stats.statuses[action].items()}
+            }
+            for action, values in stats.latencies.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent call-session load generator')
+    parser.add_argument('--calls', type=int, default=500, help='총 가상 통화 수')
+    parser.add_argument('--concurrency', type=int, default=500, help='동시 통화 수')
+    parser.add_argument('--turns', type=int, default=6, help='통화당 대화 턴 수')
+    parser.add_argument('--think-ms', type=float, default=1500, help='턴 사이 평균 사용자 시간')
+    parser.add_argument('--ramp-seconds', type=float, default=5, help='동시 통화 시작을 분산할 시간')
+    parser.add_argument('--users', type=int, default=0, help='사용자 수 (0이면 통화마다 다른 사용자)')
+    parser.add_argument('--bedrock-ms', type=float, default=900)
+    parser.add_argument('--translate-ms', type=float, default=80)
+    parser.add_argument('--polly-ms', type=float, default=150)
+    parser.add_argument('--elevenlabs-ms', type=int, default=300)
+    parser.add_argument('--no-rate-limit', action='store_true', help='요청 속도 제한 끄기')
+    parser.add_argument('--json', help='요약을 JSON 파일로 저장')
+    parser.add_argument('--verbose', action='store_true', help='핸들러 로그 출력')
+    args = parser.parse_args()
+
+    env = install_stubs(
+        lambda_function,
+        bedrock_latency=args.bedrock_ms / 1000,
+        translate_latency=args.translate_ms / 1000,
+        polly_latency=args.polly_ms / 1000,
+        elevenlabs_latency_ms=args.elevenlabs_ms
+    )
+    # 실제로는 컨테이너마다 TTS 풀이 따로 있으므로, 한 프로세스에서 수백 통화를 흉내낼 때
+    # 공유 풀(4 workers)이 인위적인 병목이 되지 않게 동시 통화 수에 맞춰 키움
+    lambda_function.TTS_EXECUTOR = ThreadPoolExecutor(max_workers=max(args.concurrency * 2, 4))
+    lambda_function.RATE_LIMIT_ENABLED = not args.no_rate_limit
+    stats = LoadStats()
+
+    def launch(index):
+        if args.ramp_seconds and args.concurrency > 1:
+            time.sleep(random.uniform(0, args.ramp_seconds))
+        try:
+            run_call(index, args, stats, env.dynamodb.meter)
+        except Exception as e:
+            print(f'call {index} crashed: {e}', file=sys.stderr)
+            stats.record_call(0.0, 0.0, 0.0, True)
+
+    # 핸들러 print 로그가 수만 줄이 되므로 기본은 숨김
+    log_sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    try:
+        with log_sink, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(launch, range(args.calls)))
+    finally:
+        env.shutdown()
+    elapsed = time.perf_counter() - start
+
+    print_report(stats, elapsed, args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(build_summary(stats, elapsed, args), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""ElevenLabs API 로컬 목 서버
+
+음성 클론/삭제/구독 한도/TTS 엔드포인트를 흉내내어 실제 계정 없이
+음성 수명 관리 로직과 TTS 경로를 테스트/벤치마크할 수 있게 함.
+Lambda 쪽에서 ELEVENLABS_API_BASE=http://127.0.0.1:<port> 로 지정해 사용.
+
+사용법: python benchmarks/mock_elevenlabs.py [포트] [음성 한도] [지연 ms]
+"""
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 가짜 MP3 프레임 (MPEG-1 Layer III 헤더 + 패딩)
+FAKE_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+
+class MockState:
+    """목 서버 상태 (스레드 간 공유)"""
+
+    def __init__(self, voice_limit=10, latency_ms=0, chunk_count=8):
+        self.voice_limit = voice_limit
+        self.latency_ms = latency_ms
+        self.chunk_count = chunk_count
+        self.voices = {}
+        self.deleted = set()  # 삭제된 클론 음성 (TTS 요청 시 voice_not_found)
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def _begin(self):
+            with state.lock:
+                state.requests.append((self.command, self.path))
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+            if not self.headers.get('xi-api-key'):
+                self._send_json(401, {'detail': 'missing api key'})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._begin():
+                return
+            if self.path.startswith('/v1/user/subscription'):
+                with state.lock:
+                    used = len(state.voices)
+                self._send_json(200, {'voice_limit': state.voice_limit, 'voice_slots_used': used})
+            elif self.path.startswith('/v1/voices'):
+                with state.lock:
+                    voices = [{'voice_id': vid, 'name': name} for vid, name in state.voices.items()]
+                self._send_json(200, {'voices': voices})
+            else:
+                self._send_json(404, {'detail': 'not found'})
+
+        def do_DELETE(self):
+            if not self._begin():
+                return
+            match = re.match(r'^/v1/voices/([^/?]+)', self.path)
+            with state.lock:
+                removed = match and state.voices.pop(match.group(1), None)
+                if removed:
+                    state.deleted.add(match.group(1))
+            if removed:
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'detail': 'voice not found'})
+
+        def do_POST(self):
+            body = self._read_body()
+            if not self._begin():
+                return
+
+            if self.path.startswith('/v1/voices/add'):
+                name = re.search(rb'name="name"\r\n\r\n([^\r]*)', body)
+                with state.lock:
+                    if len(state.voices) >= state.voice_limit:
+                        self._send_json(400, {'detail': {'status': 'voice_limit_reached'}})
+                        return
+                    voice_id = uuid.uuid4().hex[:20]
+                    state.voices[voice_id] = name.group(1).decode('utf-8') if name else voice_id
+                self._send_json(200, {'voice_id': voice_id})
+                return
+
+            match = re.match(r'^/v1/text-to-speech/([^/?]+)(/stream)?', self.path)
+            if not match:
+                self._send_json(404, {'detail': 'not found'})
+                return
+
+            with state.lock:
+                deleted = match.group(1) in state.deleted
+            if deleted:
+                self._send_json(404, {'detail': {'status': 'voice_not_found', 'message': 'voice was deleted'}})
+                return
+
+            text = json.loads(body or b'{}').get('text', '')
+            frames = max(len(text) // 10, 1)
+            audio = FAKE_MP3_FRAME * frames
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'audio/mpeg')
+            if match.group(2):
+                # 스트리밍: chunked 전송으로 여러 조각을 나눠 보냄
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                size = max(len(audio) // state.chunk_count, 1)
+                for i in range(0, len(audio), size):
+                    chunk = audio[i:i + size]
+                    self.wfile.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+            else:
+                self.send_header('Content-Length', str(len(audio)))
+                self.end_headers()
+                self.wfile.write(audio)
+
+    return Handler
+
+
+def start_mock_server(port=0, voice_limit=10, latency_ms=0):
+    """백그라운드 스레드로 목 서버 시작 → (server, state, base_url)"""
+    state = MockState(voice_limit=voice_limit, latency_ms=latency_ms)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    voice_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    server, _, base_url = start_mock_server(port, voice_limit, latency_ms)
+    print(f'Mock ElevenLabs listening on {base_url} (voice_limit={voice_limit}, latency={latency_ms}ms)')
+    print(f'  export ELEVENLABS_API_BASE={base_url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,770 @@
+"""벤치마크/부하 테스트용 로컬 AWS 대역 (DynamoDB, S3, Bedrock, Polly, Translate, Transcribe, SQS, Secrets Manager)
+
+lambda_function 모듈의 클라이언트 전역 변수를 install_stubs()로 교체해 실제 AWS 없이
+핸들러 전체 경로를 실행. DynamoDB 대역은 이 코드베이스가 쓰는 표현식 문법
+(SET/REMOVE/ADD, if_not_exists, attribute_(not_)exists, begins_with, BETWEEN, AND/OR)을
+해석하고, 항목 크기 기준으로 RCU/WCU 소비량을 계산함.
+"""
+import base64
+import copy
+import hashlib
+import io
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from mock_elevenlabs import FAKE_MP3_FRAME, start_mock_server
+
+
+# ============================================
+# 공통
+# ============================================
+
+def client_error(code, operation, message=''):
+    """boto3와 같은 형태의 ClientError 생성"""
+    return ClientError({'Error': {'Code': code, 'Message': message or code}}, operation)
+
+
+def to_dynamo(value):
+    """boto3 resource 직렬화 규칙 흉내 (int → Decimal, float 거부)"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {k: to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamo(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {to_dynamo(v) for v in value}
+    return value
+
+
+def item_size(item):
+    """DynamoDB 항목 크기 근사 (속성 이름 + 값의 직렬화 길이)"""
+    return len(json.dumps(item, default=str, ensure_ascii=False).encode('utf-8'))
+
+
+class CapacityMeter:
+    """DynamoDB 읽기/쓰기 용량 단위 누적 (스레드 안전)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.operations = Counter()
+
+    def thread_units(self):
+        """현재 스레드가 소비한 누적 (RCU, WCU) — 동시 실행 시 호출 단위 귀속용"""
+        return getattr(self.local, 'read', 0.0), getattr(self.local, 'write', 0.0)
+
+    def read(self, operation, size_bytes, consistent=False):
+        units = max(1, math.ceil(size_bytes / 4096)) * (1.0 if consistent else 0.5)
+        self.local.read = getattr(self.local, 'read', 0.0) + units
+        with self.lock:
+            self.read_units += units
+            self.operations[operation] += 1
+
+    def write(self, operation, size_bytes):
+        units = max(1, math.ceil(size_bytes / 1024))
+        self.local.write = getattr(self.local, 'write', 0.0) + units
+        with self.lock:
+            self.write_units += units
+            self.operations[operation] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'read': self.read_units, 'write': self.write_units, 'operations': dict(self.operations)}
+
+
+# ============================================
+# DynamoDB 표현식 해석
+# ============================================
+
+TOKEN_PATTERN = re.compile(r'\s*(<>|<=|>=|[()=<>,+-]|[#:]?[A-Za-z_][A-Za-z0-9_]*)')
+KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+def tokenize(expression):
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = TOKEN_PATTERN.match(expression, pos)
+        if not match:
+            raise ValueError(f'Cannot parse expression near: {expression[pos:]!r}')
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class ExpressionParser:
+    """조건/키 조건/업데이트 표현식 파서 (이 코드베이스에서 쓰는 범위만 지원)"""
+
+    def __init__(self, expression, names=None, values=None):
+        self.tokens = tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def peek_keyword(self):
+        token = self.peek()
+        return token.upper() if token and token.upper() in KEYWORDS else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValueError(f'Expected {expected}, got {token}')
+        self.pos += 1
+        return token
+
+    def name(self, token):
+        return self.names[token] if token.startswith('#') else token
+
+    # --- 피연산자 ---
+    def operand(self):
+        token = self.take()
+        if token.startswith(':'):
+            value = self.values[token]
+            return lambda item: value
+        if token in ('if_not_exists', 'list_append', 'size'):
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            if token == 'if_not_exists':
+                first, fallback = args
+                return lambda item: first(item) if first(item) is not None else fallback(item)
+            if token == 'list_append':
+                return lambda item: list(args[0](item) or []) + list(args[1](item) or [])
+            return lambda item: len(args[0](item) or '')
+        attribute = self.name(token)
+        return lambda item: item.get(attribute)
+
+    def value_expression(self):
+        left = self.operand()
+        while self.peek() in ('+', '-'):
+            op = self.take()
+            right = self.operand()
+            left = (lambda l, r: (lambda item: l(item) + r(item)))(left, right) if op == '+' else \
+                (lambda l, r: (lambda item: l(item) - r(item)))(left, right)
+        return left
+
+    # --- 조건 ---
+    def condition(self):
+        left = self.and_condition()
+        while self.peek_keyword() == 'OR':
+            self.take()
+            right = self.and_condition()
+            left = (lambda l, r: (lambda item: l(item) or r(item)))(left, right)
+        return left
+
+    def and_condition(self):
+        left = self.unary_condition()
+        while self.peek_keyword() == 'AND':
+            self.take()
+            right = self.unary_condition()
+            left = (lambda l, r: (lambda item: l(item) and r(item)))(left, right)
+        return left
+
+    def unary_condition(self):
+        if self.peek_keyword() == 'NOT':
+            self.take()
+            inner = self.unary_condition()
+            return lambda item: not inner(item)
+        if self.peek() == '(':
+            self.take('(')
+            inner = self.condition()
+            self.take(')')
+            return inner
+
+        token = self.peek()
+        if token in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains'):
+            self.take()
+            self.take('(')
+            attribute = self.name(self.take())
+            if token == 'attribute_exists':
+                self.take(')')
+                return lambda item: attribute in item
+            if token == 'attribute_not_exists':
+                self.take(')')
+                return lambda item: attribute not in item
+            self.take(',')
+            operand = self.operand()
+            self.take(')')
+            if token == 'begins_with':
+                return lambda item: isinstance(item.get(attribute), str) and item[attribute].startswith(operand(item))
+            return lambda item: item.get(attribute) is not None and operand(item) in item[attribute]
+
+        left = self.operand()
+        if self.peek_keyword() == 'BETWEEN':
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            high = self.operand()
+            return lambda item: left(item) is not None and low(item) <= left(item) <= high(item)
+
+        op = self.take()
+        right = self.operand()
+        comparisons = {
+            '=': lambda a, b: a == b,
+            '<>': lambda a, b: a != b,
+            '<': lambda a, b: a is not None and a < b,
+            '<=': lambda a, b: a is not None and a <= b,
+            '>': lambda a, b: a is not None and a > b,
+            '>=': lambda a, b: a is not None and a >= b,
+        }
+        compare = comparisons[op]
+        return lambda item: compare(left(item), right(item))
+
+    def parse_condition(self):
+        result = self.condition()
+        if self.peek() is not None:
+            raise ValueError(f'Unexpected token {self.peek()}')
+        return result
+
+    # --- 업데이트 ---
+    def parse_update(self):
+        """업데이트 표현식 → item을 제자리 수정하는 함수 목록"""
+        actions = []
+        while self.peek() is not None:
+            clause = self.take().upper()
+            while True:
+                if clause == 'SET':
+                    attribute = self.name(self.take())
+                    self.take('=')
+                    value = self.value_expression()
+                    actions.append((lambda a, v: (lambda item, snapshot: item.__setitem__(a, v(snapshot))))(attribute, value))
+                elif clause == 'REMOVE':
+                    attribute = self.name(self.take())
+                    actions.append((lambda a: (lambda item, snapshot: item.pop(a, None)))(attribute))
+                elif clause in ('ADD', 'DELETE'):
+                    attribute = self.name(self.take())
+                    value = self.operand()
+                    actions.append((lambda a, v, c: (lambda item, snapshot: apply_add(item, a, v(snapshot), c)))(attribute, value, clause))
+                else:
+                    raise ValueError(f'Unsupported clause {clause}')
+                if self.peek() == ',':
+                    self.take(',')
+                    continue
+                break
+        return actions
+
+
+def apply_add(item, attribute, value, clause):
+    current = item.get(attribute)
+    if isinstance(value, set):
+        current = set(current or set())
+        item[attribute] = current | value if clause == 'ADD' else current - value
+    else:
+        item[attribute] = (current or Decimal(0)) + value
+
+
+# ============================================
+# DynamoDB 대역
+# ============================================
+
+# 테이블/인덱스 키 스키마
+INDEX_KEYS = {None: ('PK', 'SK'), 'GSI1': ('GSI1PK', 'GSI1SK')}
+
+
+class InMemoryTable:
+    """boto3 Table 인터페이스 대역"""
+
+    def __init__(self, name, store, meter, lock):
+        self.name = name
+        self.store = store
+        self.meter = meter
+        self.lock = lock
+
+    @staticmethod
+    def key_of(item):
+        return item['PK'], item['SK']
+
+    def check_condition(self, operation, existing, kwargs):
+        expression = kwargs.get('ConditionExpression')
+        if not expression:
+            return
+        parser = ExpressionParser(expression, kwargs.get('ExpressionAttributeNames'),
+                                  to_dynamo(kwargs.get('ExpressionAttributeValues') or {}))
+        if not parser.parse_condition()(existing or {}):
+            raise client_error('ConditionalCheckFailedException', operation, 'The conditional request failed')
+
+    def get_item(self, Key, ConsistentRead=False, **kwargs):
+        with self.lock:
+            item = self.store.get(self.key_of(Key))
+            item = copy.deepcopy(item) if item else None
+        self.meter.read('GetItem', item_size(item) if item else 1, ConsistentRead)
+        return {'Item': item} if item else {}
+
+    def put_item(self, Item, ReturnValues='NONE', **kwargs):
+        item = to_dynamo(Item)
+        with self.lock:
+            existing = self.store.get(self.key_of(item))
+            self.check_condition('PutItem', existing, kwargs)
+            self.store[self.key_of(item)] = item
+        self.meter.write('PutItem', max(item_size(item), item_size(existing) if existing else 0))
+        return {'Attributes': copy.deepcopy(existing)} if ReturnValues == 'ALL_OLD' and existing else {}
+
+    def update_item(self, Key, UpdateExpression, ReturnValues='NONE', **kwargs):
+        parser = ExpressionParser(UpdateExpression, kwargs.get('ExpressionAttributeNames'),
+                                  to_dynamo(kwargs.get('ExpressionAttributeValues') or {}))
+        actions = parser.parse_update()
+        with self.lock:
+            existing = self.store.get(self.key_of(Key))
+            self.check_condition('UpdateItem', existing, kwargs)
+            item = copy.deepcopy(existing) if existing else dict(Key)
+            snapshot = copy.deepcopy(item)
+            for action in actions:
+                action(item, snapshot)
+            self.store[self.key_of(Key)] = item
+        self.meter.write('UpdateItem', max(item_size(item), item_size(existing) if existing else 0))
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': copy.deepcopy(item)}
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': {k: copy.deepcopy(v) for k, v in item.items() if (existing or {}).get(k) != v}}
+        if ReturnValues == 'ALL_OLD' and existing:
+            return {'Attributes': copy.deepcopy(existing)}
+        return {}
+
+    def delete_item(self, Key, ReturnValues='NONE', **kwargs):
+        with self.lock:
+            existing = self.store.get(self.key_of(Key))
+            self.check_condition('DeleteItem', existing, kwargs)
+            self.store.pop(self.key_of(Key), None)
+        self.meter.write('DeleteItem', item_size(existing) if existing else 1)
+        return {'Attributes': copy.deepcopy(existing)} if ReturnValues == 'ALL_OLD' and existing else {}
+
+    def query(self, KeyConditionExpression, IndexName=None, FilterExpression=None, ScanIndexForward=True,
+              Limit=None, ExclusiveStartKey=None, ConsistentRead=False, **kwargs):
+        names = kwargs.get('ExpressionAttributeNames')
+        values = to_dynamo(kwargs.get('ExpressionAttributeValues') or {})
+        key_condition = ExpressionParser(KeyConditionExpression, names, values).parse_condition()
+        item_filter = ExpressionParser(FilterExpression, names, values).parse_condition() if FilterExpression else None
+        partition_key, sort_key = INDEX_KEYS[IndexName]
+
+        with self.lock:
+            candidates = [
+                item for item in self.store.values()
+                if partition_key in item and sort_key in item and key_condition(item)
+            ]
+            candidates.sort(key=lambda item: (item[sort_key], item['PK'], item['SK']), reverse=not ScanIndexForward)
+
+            if ExclusiveStartKey:
+                start = (ExclusiveStartKey['PK'], ExclusiveStartKey['SK'])
+                for index, item in enumerate(candidates):
+                    if self.key_of(item) == start:
+                        candidates = candidates[index + 1:]
+                        break
+
+            # Limit는 필터 적용 전 평가 항목 수 기준 (DynamoDB와 동일)
+            evaluated = candidates[:Limit] if Limit else candidates
+            has_more = bool(Limit) and len(candidates) > Limit
+            items = [copy.deepcopy(item) for item in evaluated if not item_filter or item_filter(item)]
+
+        self.meter.read('Query', sum(item_size(item) for item in evaluated) or 1, ConsistentRead)
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(evaluated)}
+        if has_more and evaluated:
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {k: last[k] for k in {'PK', 'SK', partition_key, sort_key}}
+        return response
+
+    def batch_writer(self, **kwargs):
+        return InMemoryBatchWriter(self)
+
+
+class InMemoryBatchWriter:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key):
+        self.table.delete_item(Key=Key)
+
+
+class InMemoryDynamoDBClient:
+    """저수준 DynamoDB 클라이언트 대역 (TransactWriteItems: 조건 전체 확인 후 일괄 적용)"""
+
+    OPERATIONS = {'Put': 'PutItem', 'Update': 'UpdateItem', 'Delete': 'DeleteItem', 'ConditionCheck': 'ConditionCheck'}
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.deserializer = TypeDeserializer()
+
+    def plain(self, values):
+        return {k: self.deserializer.deserialize(v) for k, v in (values or {}).items()}
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        requests = []
+        for entry in TransactItems:
+            (kind, request), = entry.items()
+            request = dict(request)
+            for field in ('Item', 'Key', 'ExpressionAttributeValues'):
+                if field in request:
+                    request[field] = self.plain(request[field])
+            requests.append((kind, request))
+
+        with self.resource.lock:
+            reasons, failed = [], False
+            for kind, request in requests:
+                table = self.resource.Table(request['TableName'])
+                key = request.get('Key') or request['Item']
+                try:
+                    table.check_condition(self.OPERATIONS[kind], self.resource.store.get(table.key_of(key)), request)
+                    reasons.append({'Code': 'None'})
+                except ClientError:
+                    reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+                    failed = True
+            if failed:
+                raise ClientError({
+                    'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                    'CancellationReasons': reasons
+                }, 'TransactWriteItems')
+
+            for kind, request in requests:
+                table = self.resource.Table(request['TableName'])
+                unconditional = {k: v for k, v in request.items() if k not in ('TableName', 'ConditionExpression')}
+                if kind == 'Put':
+                    table.put_item(**unconditional)
+                elif kind == 'Update':
+                    table.update_item(**unconditional)
+                elif kind == 'Delete':
+                    table.delete_item(**unconditional)
+        return {}
+
+
+class InMemoryDynamoDB:
+    """boto3 DynamoDB resource 대역 (Table + batch_get_item + meta.client 트랜잭션)"""
+
+    def __init__(self):
+        self.store = {}
+        self.meter = CapacityMeter()
+        self.lock = threading.RLock()
+        self.meta = SimpleNamespace(client=InMemoryDynamoDBClient(self))
+
+    def Table(self, name):  # noqa: N802 (boto3 이름 유지)
+        return InMemoryTable(name, self.store, self.meter, self.lock)
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            found = []
+            with self.lock:
+                for key in request['Keys']:
+                    item = self.store.get((key['PK'], key['SK']))
+                    if item:
+                        found.append(copy.deepcopy(item))
+            for item in found:
+                self.meter.read('BatchGetItem', item_size(item))
+            responses[table_name] = found
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+# ============================================
+# S3 대역
+# ============================================
+
+class StreamingBody(io.BytesIO):
+    """botocore StreamingBody 대역 (read/iter_chunks/close)"""
+
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class InMemoryS3:
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.bytes_written = 0
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType='binary/octet-stream', **kwargs):
+        data = Body.encode('utf-8') if isinstance(Body, str) else (Body.read() if hasattr(Body, 'read') else bytes(Body))
+        with self.lock:
+            self.objects[Key] = {
+                'Body': data,
+                'ContentType': ContentType,
+                'LastModified': datetime.now(timezone.utc),
+                'ETag': f'"{hashlib.md5(data).hexdigest()}"'
+            }
+            self.bytes_written += len(data)
+        return {'ETag': self.objects[Key]['ETag']}
+
+    def _get(self, Key, operation):
+        with self.lock:
+            obj = self.objects.get(Key)
+        if obj is None:
+            raise client_error('NoSuchKey', operation, 'The specified key does not exist.')
+        return obj
+
+    def get_object(self, Bucket, Key, **kwargs):
+        obj = self._get(Key, 'GetObject')
+        return {
+            'Body': StreamingBody(obj['Body']),
+            'ContentLength': len(obj['Body']),
+            'ContentType': obj['ContentType'],
+            'ETag': obj['ETag'],
+            'LastModified': obj['LastModified']
+        }
+
+    def head_object(self, Bucket, Key, **kwargs):
+        obj = self._get(Key, 'HeadObject')
+        return {'ContentLength': len(obj['Body']), 'ContentType': obj['ContentType'],
+                'ETag': obj['ETag'], 'LastModified': obj['LastModified']}
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        with open(Filename, 'wb') as f:
+            f.write(self._get(Key, 'GetObject')['Body'])
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self.lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        with self.lock:
+            for obj in Delete['Objects']:
+                self.objects.pop(obj['Key'], None)
+        return {'Deleted': [{'Key': obj['Key']} for obj in Delete['Objects']]}
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, ContinuationToken=None, **kwargs):
+        with self.lock:
+            keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {
+            'KeyCount': len(page),
+            'Contents': [{'Key': k, 'Size': len(self.objects[k]['Body']), 'LastModified': self.objects[k]['LastModified'],
+                          'ETag': self.objects[k]['ETag']} for k in page if k in self.objects]
+        }
+        if start + MaxKeys < len(keys):
+            response['IsTruncated'] = True
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+    def get_paginator(self, operation):
+        s3 = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                token = None
+                while True:
+                    page = s3.list_objects_v2(ContinuationToken=token, **kwargs)
+                    yield page
+                    token = page.get('NextContinuationToken')
+                    if not token:
+                        break
+
+        return Paginator()
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        return {'url': f'https://{Bucket}.s3.amazonaws.com/', 'fields': {**(Fields or {}), 'key': Key, 'policy': 'stub'}}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600):
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?X-Amz-Expires={ExpiresIn}"
+
+
+# ============================================
+# Bedrock / Polly / Translate / Transcribe / SQS / Secrets Manager 대역
+# ============================================
+
+FAKE_REPLY = ("That sounds great! I really like how you described your weekend. "
+              "What was the most interesting part of the trip for you?")
+
+FAKE_ANALYSIS = {
+    'cafp_scores': {'complexity': 62, 'accuracy': 71, 'fluency': 68, 'pronunciation': 74},
+    'fillers': {'count': 2, 'words': ['um', 'like'], 'percentage': 3.1},
+    'grammar_corrections': [
+        {'original': 'I go to park yesterday', 'corrected': 'I went to the park yesterday', 'explanation': '과거 시제를 사용해야 해요.'}
+    ],
+    'vocabulary': {'total_words': 64, 'unique_words': 41, 'advanced_words': ['itinerary'],
+                   'suggested_words': ['memorable', 'spontaneous', 'breathtaking']},
+    'overall_feedback': '자연스럽게 대화를 이어갔어요. 시제에 조금 더 신경 써 보세요.',
+    'improvement_tips': ['과거 시제 복습', '연결어 사용하기', '질문으로 대화 이어가기']
+}
+
+FAKE_USER_INFO = {
+    'name': 'Minji', 'job': 'designer', 'company': None, 'hobbies': ['hiking', 'photography'],
+    'family': None, 'location': 'Seoul', 'goals': ['business English'], 'recent_events': ['trip to Busan'],
+    'preferences': ['coffee'], 'other_facts': []
+}
+
+
+class FakeBedrock:
+    """Bedrock Runtime 대역 (프롬프트 종류별 고정 응답 + 지연 시간 설정)"""
+
+    def __init__(self, latency=0.0, token_delay=0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = Counter()
+
+    def reply_for(self, body):
+        request = json.loads(body)
+        prompt = ' '.join(str(m.get('content', '')) for m in request.get('messages', []))
+        usage = {'input_tokens': len(request.get('system', '') + prompt) // 4}
+        if 'cafp_scores' in prompt:
+            text = json.dumps(FAKE_ANALYSIS, ensure_ascii=False)
+        elif 'extract any personal information' in prompt:
+            text = json.dumps(FAKE_USER_INFO)
+        else:
+            text = FAKE_REPLY
+        usage['output_tokens'] = len(text) // 4
+        return text, usage
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self.calls['invoke_model'] += 1
+        text, usage = self.reply_for(body)
+        time.sleep(self.latency)
+        payload = {'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn', 'usage': usage}
+        return {'body': StreamingBody(json.dumps(payload).encode('utf-8')), 'contentType': 'application/json'}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        self.calls['invoke_model_with_response_stream'] += 1
+        text, usage = self.reply_for(body)
+        time.sleep(self.latency)
+
+        def events():
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_start', 'message': {'usage': {'input_tokens': usage['input_tokens']}}}).encode()}}
+            for word in re.findall(r'\S+\s*', text):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                delta = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': word}}
+                yield {'chunk': {'bytes': json.dumps(delta).encode()}}
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_delta', 'usage': {'output_tokens': usage['output_tokens']}}).encode()}}
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_stop'}).encode()}}
+
+        return {'body': events(), 'contentType': 'application/json'}
+
+
+class FakePolly:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def synthesize_speech(self, Text, **kwargs):
+        time.sleep(self.latency)
+        return {'AudioStream': StreamingBody(FAKE_MP3_FRAME * max(len(Text) // 10, 1)), 'ContentType': 'audio/mpeg'}
+
+
+class FakeTranslate:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.characters = 0
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        time.sleep(self.latency)
+        self.characters += len(Text)
+        return {'TranslatedText': f'[{TargetLanguageCode}] {Text}',
+                'SourceLanguageCode': SourceLanguageCode, 'TargetLanguageCode': TargetLanguageCode}
+
+
+class FakeTranscribe:
+    """배치 Transcribe 대역 (즉시 COMPLETED, 결과는 data: URL로 제공)"""
+
+    def __init__(self, transcript='I went hiking with my friends last weekend.'):
+        self.transcript = transcript
+        self.jobs = {}
+
+    def start_transcription_job(self, TranscriptionJobName, **kwargs):
+        payload = json.dumps({'results': {'transcripts': [{'transcript': self.transcript}]}}).encode()
+        uri = 'data:application/json;base64,' + base64.b64encode(payload).decode()
+        self.jobs[TranscriptionJobName] = {
+            'TranscriptionJobName': TranscriptionJobName,
+            'TranscriptionJobStatus': 'COMPLETED',
+            'Transcript': {'TranscriptFileUri': uri}
+        }
+        return {'TranscriptionJob': self.jobs[TranscriptionJobName]}
+
+    def get_transcription_job(self, TranscriptionJobName):
+        return {'TranscriptionJob': self.jobs[TranscriptionJobName]}
+
+    def delete_transcription_job(self, TranscriptionJobName):
+        self.jobs.pop(TranscriptionJobName, None)
+        return {}
+
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        self.messages.append(MessageBody)
+        return {'MessageId': str(uuid.uuid4())}
+
+
+class FakeSecretsManager:
+    def get_secret_value(self, SecretId):
+        return {'Name': SecretId, 'SecretString': 'benchmark-elevenlabs-key'}
+
+
+# ============================================
+# 설치
+# ============================================
+
+class StubEnvironment:
+    """설치된 대역 모음 (벤치마크에서 지표/상태 조회용)"""
+
+    def __init__(self, **parts):
+        self.__dict__.update(parts)
+
+    def reset_capacity(self):
+        self.dynamodb.meter.reset()
+
+    def shutdown(self):
+        self.elevenlabs_server.shutdown()
+
+
+def install_stubs(module, bedrock_latency=0.0, bedrock_token_delay=0.0, translate_latency=0.0,
+                  polly_latency=0.0, elevenlabs_latency_ms=0):
+    """lambda_function 모듈의 AWS 클라이언트를 대역으로 교체하고 ElevenLabs 목 서버 시작"""
+    server, elevenlabs_state, base_url = start_mock_server(latency_ms=elevenlabs_latency_ms)
+
+    env = StubEnvironment(
+        dynamodb=InMemoryDynamoDB(),
+        s3=InMemoryS3(),
+        bedrock=FakeBedrock(bedrock_latency, bedrock_token_delay),
+        polly=FakePolly(polly_latency),
+        translate_client=FakeTranslate(translate_latency),
+        transcribe=FakeTranscribe(),
+        sqs=FakeSQS(),
+        secretsmanager=FakeSecretsManager(),
+        elevenlabs_server=server,
+        elevenlabs=elevenlabs_state,
+        elevenlabs_url=base_url
+    )
+
+    for name in ('dynamodb', 's3', 'bedrock', 'polly', 'translate_client', 'transcribe', 'sqs', 'secretsmanager'):
+        setattr(module, name, getattr(env, name))
+    module.ELEVENLABS_API_BASE = base_url
+    module.CONFIG_CACHE.clear()
+    return env
@@ -1,38 +1,87 @@
+import io
 import json
+import math
+import os
+import random
 import boto3
 import re
 import base64
+import difflib
+import gzip
+import subprocess
+import tempfile
 import time
+import uuid
+import urllib.error
 import urllib.request
 import hashlib
 import hmac
-from datetime import datetime, timedelta, timezone
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 from urllib.parse import quote
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+try:
+    from PIL import Image, ImageOps  # Pillow Lambda 레이어 (없으면 원본 이미지만 제공)
+except ImportError:
+    Image = None
+
+try:
+    import orjson  # 고속 JSON 직렬화 레이어 (없으면 표준 json 사용)
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # Brotli 압축 레이어 (없으면 gzip만 협상)
+except ImportError:
+    brotli = None
+
+# 의존성별 호출 정책: 연결/읽기 타임아웃(초), 최대 시도 횟수(첫 시도 포함)
+# boto3는 standard 재시도 모드 (지수 백오프 + full jitter, 스로틀링/일시 오류만 재시도)
+CALL_POLICIES = {
+    'bedrock': {'connect': 2, 'read': 20, 'attempts': 2},       # 응답 생성이 길어 읽기 상한만 넉넉히
+    'polly': {'connect': 2, 'read': 5, 'attempts': 2},
+    'transcribe': {'connect': 2, 'read': 5, 'attempts': 3},
+    'translate': {'connect': 2, 'read': 3, 'attempts': 2},
+    's3': {'connect': 2, 'read': 10, 'attempts': 3},
+    'dynamodb': {'connect': 1, 'read': 3, 'attempts': 3},
+    'secretsmanager': {'connect': 2, 'read': 3, 'attempts': 3},
+    'sqs': {'connect': 2, 'read': 3, 'attempts': 3},
+    'elevenlabs': {'connect': 3, 'read': 30, 'attempts': 3},    # urllib, 멱등 관리 API(GET/DELETE)만 재시도
+}
+
+
+def get_client_config(dependency):
+    """의존성 호출 정책 → botocore Config"""
+    policy = CALL_POLICIES[dependency]
+    return Config(
+        connect_timeout=policy['connect'],
+        read_timeout=policy['read'],
+        retries={'max_attempts': policy['attempts'], 'mode': 'standard'}
+    )
+
 
 # AWS 클라이언트
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-polly = boto3.client('polly', region_name='us-east-1')
-transcribe = boto3.client('transcribe', region_name='us-east-1')
-translate_client = boto3.client('translate', region_name='us-east-1')
-s3 = boto3.client('s3', region_name='us-east-1')
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-secretsmanager = boto3.client('secretsmanager', region_name='us-east-1')
+bedrock = boto3.client('bedrock-runtime', region_name='us-east-1', config=get_client_config('bedrock'))
+polly = boto3.client('polly', region_name='us-east-1', config=get_client_config('polly'))
+transcribe = boto3.client('transcribe', region_name='us-east-1', config=get_client_config('transcribe'))
+translate_client = boto3.client('translate', region_name='us-east-1', config=get_client_config('translate'))
+s3 = boto3.client('s3', region_name='us-east-1', config=get_client_config('s3'))
+dynamodb = boto3.resource('dynamodb', region_name='us-east-1', config=get_client_config('dynamodb'))
+secretsmanager = boto3.client('secretsmanager', region_name='us-east-1', config=get_client_config('secretsmanager'))
+sqs = boto3.client('sqs', region_name='us-east-1', config=get_client_config('sqs'))
+
+# 직접 서명(presigned URL)용 공유 세션 (자격증명 해석/갱신을 컨테이너 내에서 재사용)
+aws_session = boto3.Session()
 
 # ElevenLabs 설정
-ELEVENLABS_API_KEY = None  # 캐싱용
-
-def get_elevenlabs_api_key():
-    """ElevenLabs API 키를 Secrets Manager에서 가져오기 (캐싱)"""
-    global ELEVENLABS_API_KEY
-    if ELEVENLABS_API_KEY:
-        return ELEVENLABS_API_KEY
-    try:
-        response = secretsmanager.get_secret_value(SecretId='ElevenLabs/ApiKey')
-        ELEVENLABS_API_KEY = response['SecretString']
-        return ELEVENLABS_API_KEY
-    except Exception as e:
-        print(f"Failed to get ElevenLabs API key: {e}")
-        return None
+ELEVENLABS_API_BASE = os.environ.get('ELEVENLABS_API_BASE', 'https://api.elevenlabs.io')  # 로컬 목 서버 지정 가능
+ELEVENLABS_SECRET_ID = 'ElevenLabs/ApiKey'
 
 # 상수
 S3_BUCKET = 'eng-learning-audio'
@@ -47,6 +96,512 @@ CORS_HEADERS = {
 }
 
 
+# ============================================
+# 요청 시간 예산 (마감 시각 전파)
+# ============================================
+# 요청 시작 시 Lambda 남은 시간(API 요청은 API Gateway 29초 상한과 비교해 작은 값)에서
+# 폴백 응답용 여유를 뺀 마감 시각을 정하고, 모든 외부 호출이 이를 넘지 않게 함.
+# 남은 시간이 부족하면 호출/재시도를 시작하지 않고 DeadlineExceeded를 던져
+# 각 핸들러의 기존 폴백(Polly, 기본 분석 결과 등)으로 바로 넘어가게 함.
+
+API_GATEWAY_TIMEOUT_SECONDS = 29      # REST API 통합 타임아웃 (이후 응답은 클라이언트에 전달되지 않음)
+DEADLINE_RESERVE_SECONDS = 1.5        # 폴백 처리/응답 직렬화/계량 기록에 남겨둘 시간
+DEADLINE_MIN_CALL_SECONDS = 0.5       # 이보다 적게 남으면 새 호출을 시작하지 않음
+DEADLINE_MIN_RETRY_SECONDS = 2.0      # 이보다 적게 남으면 재시도하지 않음
+RETRY_BASE_DELAY = 0.2                # urllib 재시도 백오프 기본값 (초)
+RETRY_MAX_DELAY = 2.0
+
+REQUEST_DEADLINE = {'at': None}       # time.monotonic() 기준 마감 시각 (None이면 제한 없음)
+
+
+class DeadlineExceeded(Exception):
+    """요청 시간 예산 소진 (남은 시간 안에 호출을 끝낼 수 없음)"""
+
+
+def start_request_budget(context, limit=None):
+    """Lambda context의 남은 시간으로 요청 마감 시각 설정 (limit: 추가 상한 초)"""
+    remaining = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        remaining = context.get_remaining_time_in_millis() / 1000
+    if limit is not None:
+        remaining = limit if remaining is None else min(remaining, limit)
+    REQUEST_DEADLINE['at'] = None if remaining is None else time.monotonic() + remaining - DEADLINE_RESERVE_SECONDS
+
+
+def release_request_budget():
+    """응답 직전 기록 작업(계량 등)에 남겨둔 여유 시간 사용 허용"""
+    if REQUEST_DEADLINE['at'] is not None:
+        REQUEST_DEADLINE['at'] += DEADLINE_RESERVE_SECONDS
+
+
+def get_remaining_budget():
+    """마감까지 남은 초 (예산이 없으면 None)"""
+    deadline = REQUEST_DEADLINE['at']
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def get_call_timeout(dependency, limit=None):
+    """urllib 호출 타임아웃 = min(정책/지정 상한, 남은 예산), 예산 부족 시 DeadlineExceeded"""
+    timeout = limit or CALL_POLICIES[dependency]['read']
+    remaining = get_remaining_budget()
+    if remaining is None:
+        return timeout
+    if remaining < DEADLINE_MIN_CALL_SECONDS:
+        raise DeadlineExceeded(f'{dependency}: request budget exhausted')
+    return min(timeout, remaining)
+
+
+def call_with_retry(dependency, fn):
+    """urllib 호출 재시도 (429/5xx/연결 오류, full jitter 백오프, 예산 안에서만)"""
+    attempts = CALL_POLICIES[dependency]['attempts']
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except urllib.error.HTTPError as e:
+            if (e.code != 429 and e.code < 500) or attempt == attempts:
+                raise
+            error = e
+        except (urllib.error.URLError, TimeoutError) as e:
+            if attempt == attempts:
+                raise
+            error = e
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        remaining = get_remaining_budget()
+        if remaining is not None and remaining - delay < DEADLINE_MIN_RETRY_SECONDS:
+            raise error
+        print(f"[Retry] {dependency} attempt {attempt} failed ({error}), retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+
+def check_call_deadline(request=None, event_name='', **kwargs):
+    """botocore request-created (시도마다 호출): 남은 예산이 부족하면 호출/재시도 중단"""
+    remaining = get_remaining_budget()
+    if remaining is None:
+        return
+    retries = (getattr(request, 'context', None) or {}).get('retries') or {}
+    minimum = DEADLINE_MIN_RETRY_SECONDS if retries.get('attempt', 1) > 1 else DEADLINE_MIN_CALL_SECONDS
+    if remaining < minimum:
+        raise DeadlineExceeded(f"{event_name.split('.', 1)[-1]}: request budget exhausted ({remaining:.2f}s left)")
+
+
+def install_deadline_hooks():
+    """모든 AWS 클라이언트에 마감 시각 확인 훅 설치"""
+    clients = [bedrock, polly, transcribe, translate_client, s3, dynamodb.meta.client, secretsmanager, sqs]
+    for client in clients:
+        client.meta.events.register('request-created', check_call_deadline)
+
+
+install_deadline_hooks()
+
+
+# ============================================
+# 설정/비밀 값 제공자 (TTL 캐시 + 백그라운드 갱신)
+# ============================================
+# 비밀 값(Secrets Manager)과 운영 설정 문서(DynamoDB CONFIG 항목)를 컨테이너에 TTL 캐시.
+# 만료된 값은 그대로 반환하면서 백그라운드로 다시 읽고 (Lambda가 멈춰 있으면 다음 요청 때 이어서 완료),
+# 실패하면 이전 값을 유지하되 CONFIG_NEGATIVE_TTL_SECONDS 동안은 재조회하지 않음 (장애 시 호출 폭주 방지).
+# 설정 문서에 없는 키는 APP_CONFIG_DEFAULTS 사용 → 재배포 없이 모델/한도/음성 조정 가능.
+
+SECRET_TTL_SECONDS = 300              # 키 교체 후 최대 반영 지연 (401이면 즉시 무효화)
+APP_CONFIG_TTL_SECONDS = 60
+CONFIG_NEGATIVE_TTL_SECONDS = 30      # 조회 실패 후 재시도까지 대기
+CONFIG_MAX_STALE_SECONDS = 3600       # 이보다 오래된 값은 반환하지 않고 동기 갱신
+
+# 운영 설정 문서 (DynamoDB 항목의 최상위 속성 = 설정 키, dict 값은 기본값에 얕게 병합)
+APP_CONFIG_KEY = {'PK': 'CONFIG', 'SK': 'APP'}
+
+APP_CONFIG_DEFAULTS = {
+    'claudeModel': os.environ.get('CLAUDE_MODEL', 'anthropic.claude-3-haiku-20240307-v1:0'),
+    'usageLimits': {
+        'dailyChatCount': 50,
+        'dailyTtsCount': 100,
+        'dailyAnalyzeCount': 10
+    },
+    # ElevenLabs 음성 ID ('억양:성별', 자연스러운 음성)
+    # 여성: Rachel(따뜻), Bella(친근), Elli(밝음), Charlotte(부드러움)
+    # 남성: Adam(따뜻), Antoni(친근), Josh(차분)
+    'elevenlabsVoices': {
+        'us:female': 'EXAVITQu4vr4xnSDxMaL',   # Bella - 친근하고 따뜻
+        'us:male': 'pNInz6obpgDQGcFmaJgB',     # Adam - 따뜻하고 자연스러움
+        'uk:female': 'XB0fDUnXU5powFXDhCwa',   # Charlotte - 영국식 부드러움
+        'uk:male': 'TX3LPaxmHKxFdv7VOQHJ',     # Liam - 영국 남성
+        'au:female': 'EXAVITQu4vr4xnSDxMaL',   # Bella (호주 대체)
+        'au:male': 'pNInz6obpgDQGcFmaJgB',     # Adam (호주 대체)
+        'in:female': 'EXAVITQu4vr4xnSDxMaL',   # Bella (인도 대체)
+        'in:male': 'pNInz6obpgDQGcFmaJgB',     # Adam (인도 대체)
+    },
+    # 애인 스타일은 더 감성적인 음성 사용 (성별)
+    'loverVoices': {
+        'female': '21m00Tcm4TlvDq8ikWAM',      # Rachel - 따뜻하고 감성적
+        'male': 'ErXwobaYiN019PkySvjV',        # Antoni - 부드럽고 따뜻
+    },
+    # Polly 폴백 음성 ('억양:성별' → [음성, 엔진])
+    'pollyVoices': {
+        'us:female': ['Joanna', 'neural'], 'us:male': ['Matthew', 'neural'],
+        'uk:female': ['Amy', 'neural'], 'uk:male': ['Brian', 'neural'],
+        'au:female': ['Nicole', 'standard'], 'au:male': ['Russell', 'standard'],
+        'in:female': ['Aditi', 'standard'], 'in:male': ['Aditi', 'standard'],
+    },
+}
+
+CONFIG_CACHE = {}
+CONFIG_CACHE_LOCK = threading.Lock()
+CONFIG_REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+
+def refresh_cached(name, loader, ttl):
+    """loader로 값을 다시 읽어 캐시 (실패 시 이전 값 유지 + 부정 캐시)"""
+    now = time.time()
+    try:
+        entry = {'value': loader(), 'expiresAt': now + ttl, 'loadedAt': now}
+    except Exception as e:
+        print(f"[Config] Load failed ({name}): {str(e)}")
+        previous = CONFIG_CACHE.get(name) or {}
+        entry = {
+            'value': previous.get('value'),
+            'expiresAt': now + CONFIG_NEGATIVE_TTL_SECONDS,
+            'loadedAt': previous.get('loadedAt', 0)
+        }
+    with CONFIG_CACHE_LOCK:
+        CONFIG_CACHE[name] = entry
+    return entry['value']
+
+
+def get_cached(name, loader, ttl):
+    """TTL 캐시 조회 (만료됐지만 너무 오래되지 않은 값은 반환 + 백그라운드 갱신)"""
+    now = time.time()
+    with CONFIG_CACHE_LOCK:
+        entry = CONFIG_CACHE.get(name)
+        if entry and now < entry['expiresAt']:
+            return entry['value']
+        if entry and entry['value'] is not None and now - entry['loadedAt'] < CONFIG_MAX_STALE_SECONDS:
+            if not entry.get('refreshing'):
+                entry['refreshing'] = True
+                CONFIG_REFRESH_EXECUTOR.submit(refresh_cached, name, loader, ttl)
+            return entry['value']
+    return refresh_cached(name, loader, ttl)
+
+
+def invalidate_cached(name):
+    """캐시 항목 제거 (다음 조회 때 동기 재조회)"""
+    with CONFIG_CACHE_LOCK:
+        CONFIG_CACHE.pop(name, None)
+
+
+def get_secret(secret_id):
+    """Secrets Manager 문자열 비밀 값 (TTL 캐시, 조회 실패 시 None)"""
+    return get_cached(
+        f'secret:{secret_id}',
+        lambda: secretsmanager.get_secret_value(SecretId=secret_id)['SecretString'],
+        SECRET_TTL_SECONDS
+    )
+
+
+def get_elevenlabs_api_key():
+    """ElevenLabs API 키 (Secrets Manager, TTL 캐시)"""
+    return get_secret(ELEVENLABS_SECRET_ID)
+
+
+def invalidate_elevenlabs_api_key(error):
+    """ElevenLabs가 401을 반환하면 키가 교체된 것으로 보고 캐시 무효화"""
+    if isinstance(error, urllib.error.HTTPError) and error.code == 401:
+        print("[Config] ElevenLabs rejected API key, invalidating cache")
+        invalidate_cached(f'secret:{ELEVENLABS_SECRET_ID}')
+
+
+def load_app_config():
+    """DynamoDB 운영 설정 문서 (없으면 빈 dict → 전부 기본값)"""
+    item = get_table().get_item(Key=APP_CONFIG_KEY).get('Item') or {}
+    return {k: v for k, v in item.items() if k not in APP_CONFIG_KEY}
+
+
+def get_config(name):
+    """운영 설정 값 (설정 문서 → 기본값 순, dict는 기본값에 병합)"""
+    overrides = get_cached('config:app', load_app_config, APP_CONFIG_TTL_SECONDS) or {}
+    default = APP_CONFIG_DEFAULTS[name]
+    value = overrides.get(name, default)
+    if isinstance(default, dict) and isinstance(value, dict) and value is not default:
+        return {**default, **value}
+    return value
+
+
+# ============================================
+# 계측 (CloudWatch Embedded Metric Format)
+# ============================================
+# METRICS_ENABLED=true일 때만 botocore 이벤트 훅/urllib 핸들러를 설치하므로
+# 꺼져 있으면 호출 경로에 추가 비용 없음.
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'RingRing/Backend')
+
+# DynamoDB 소비 용량(RCU/WCU)을 응답에 포함시킬 작업 (읽기/쓰기 구분)
+CAPACITY_READ_OPERATIONS = {'GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems'}
+CAPACITY_WRITE_OPERATIONS = {'PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'}
+
+# HTTP 경로의 ID 세그먼트 (voiceId 등) → 지표 차원 수 폭증 방지용 치환
+METRICS_PATH_ID = re.compile(r'/(?=[A-Za-z0-9_-]*\d)[A-Za-z0-9_-]{12,}')
+
+# 호출마다 구간 수집기를 만들어 의존성 구간을 모음 (TTS/번역 워커 스레드는 bind_request_context로 전달).
+# 헤지에서 진 호출처럼 EMF 출력 뒤에 끝난 구간은 다음 호출 기록에 섞이지 않게 버림.
+METRICS_CONTEXT = threading.local()  # 스레드별 현재 호출의 구간 수집기
+METRICS_LOCK = threading.Lock()
+METRICS_STATE = {'coldStart': True}
+
+
+def start_span_collector():
+    """현재 스레드에 새 호출 구간 수집기 설정"""
+    collector = {'spans': [], 'closed': False}
+    METRICS_CONTEXT.collector = collector
+    return collector
+
+
+def get_span_collector():
+    return getattr(METRICS_CONTEXT, 'collector', None)
+
+
+def record_span(dependency, operation, duration_ms, request_bytes=0, response_bytes=0, ok=True, **extra):
+    """외부 호출 구간 기록 (호출 밖이거나 이미 출력된 호출이면 버림)"""
+    collector = get_span_collector()
+    if collector is None:
+        return
+    span = {
+        'dependency': dependency,
+        'operation': operation,
+        'durationMs': duration_ms,
+        'requestBytes': request_bytes,
+        'responseBytes': response_bytes,
+        'ok': ok,
+        **extra
+    }
+    with METRICS_LOCK:
+        if not collector['closed']:
+            collector['spans'].append(span)
+
+
+def on_aws_call_start(context=None, **kwargs):
+    """botocore before-call: 시작 시각 기록"""
+    if context is not None:
+        context['metricsStartedAt'] = time.perf_counter()
+
+
+def on_aws_call_end(http_response=None, parsed=None, model=None, context=None, **kwargs):
+    """botocore after-call: 서비스/작업별 소요 시간, 크기, DynamoDB 소비 용량 기록"""
+    started = (context or {}).get('metricsStartedAt')
+    if started is None or model is None:
+        return
+
+    extra = {}
+    consumed = (parsed or {}).get('ConsumedCapacity')
+    if consumed:
+        # BatchGet/Transact는 테이블별 리스트로 옴 (TOTAL 모드는 CapacityUnits만 제공)
+        entries = consumed if isinstance(consumed, list) else [consumed]
+        units = sum(float(c.get('CapacityUnits', 0)) for c in entries)
+        extra['capacityUnits'] = units
+        extra['readUnits'] = units if model.name in CAPACITY_READ_OPERATIONS else 0.0
+        extra['writeUnits'] = units if model.name in CAPACITY_WRITE_OPERATIONS else 0.0
+
+    headers = getattr(http_response, 'headers', {}) or {}
+    status = getattr(http_response, 'status_code', 200)
+    record_span(
+        model.service_model.service_name,
+        model.name,
+        round((time.perf_counter() - started) * 1000, 2),
+        int((context or {}).get('metricsRequestBytes', 0)),
+        int(headers.get('content-length') or 0),
+        status < 400,
+        **extra
+    )
+
+
+def on_aws_call_error(exception=None, context=None, event_name='', **kwargs):
+    """botocore after-call-error: 연결 실패/타임아웃 등 응답 없는 실패 기록"""
+    started = (context or {}).get('metricsStartedAt')
+    if started is None:
+        return
+    _, service, operation = (event_name.split('.', 2) + ['', ''])[:3]
+    record_span(service, operation, round((time.perf_counter() - started) * 1000, 2), ok=False,
+                error=type(exception).__name__)
+
+
+def on_aws_request_created(request=None, **kwargs):
+    """botocore request-created: 요청 본문 크기 기록"""
+    body = getattr(request, 'body', None)
+    context = getattr(request, 'context', None)
+    if context is not None and isinstance(body, (bytes, str)):
+        context['metricsRequestBytes'] = len(body)
+
+
+def request_consumed_capacity(params=None, model=None, **kwargs):
+    """DynamoDB 요청에 ReturnConsumedCapacity=TOTAL 추가 (RCU/WCU 측정용)"""
+    if params is not None and model is not None and \
+            model.name in CAPACITY_READ_OPERATIONS | CAPACITY_WRITE_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+class TimingHTTPHandler(urllib.request.BaseHandler):
+    """urllib 요청(ElevenLabs 등) 응답 헤더 도착까지 시간 기록"""
+    handler_order = 900  # HTTPErrorProcessor(1000)가 4xx/5xx를 예외로 바꾸기 전에 기록
+
+    def http_request(self, req):
+        req.metrics_started_at = time.perf_counter()
+        return req
+
+    def http_response(self, req, response):
+        started = getattr(req, 'metrics_started_at', None)
+        if started is not None:
+            data = req.data if isinstance(req.data, (bytes, bytearray)) else b''
+            host = req.host.split(':')[0]
+            record_span(
+                'elevenlabs' if host in ELEVENLABS_API_BASE else host,
+                f"{req.get_method()} {METRICS_PATH_ID.sub('/{id}', req.selector.split('?')[0])}",
+                round((time.perf_counter() - started) * 1000, 2),
+                int(req.headers.get('Content-length') or len(data)),
+                int(response.headers.get('Content-Length') or 0),
+                response.status < 400
+            )
+        return response
+
+    https_request = http_request
+    https_response = http_response
+
+
+def install_instrumentation():
+    """모든 AWS 클라이언트와 urllib에 계측 훅 설치"""
+    clients = [bedrock, polly, transcribe, translate_client, s3, dynamodb.meta.client, secretsmanager, sqs]
+    for client in clients:
+        events = client.meta.events
+        events.register('before-call', on_aws_call_start)
+        events.register('request-created', on_aws_request_created)
+        events.register('after-call', on_aws_call_end)
+        events.register('after-call-error', on_aws_call_error)
+    dynamodb.meta.client.meta.events.register('before-parameter-build.dynamodb', request_consumed_capacity)
+    urllib.request.install_opener(urllib.request.build_opener(TimingHTTPHandler()))
+
+
+def get_event_action(event):
+    """계측용 이벤트 종류 이름 (API 액션 / SQS / 예약 작업)"""
+    if event.get('httpMethod') == 'OPTIONS':
+        return 'OPTIONS'
+    if event.get('Records'):
+        return 'sqs_memory_jobs'
+    if event.get('task'):
+        return f"task:{event['task']}"
+    try:
+        return json.loads(event.get('body') or '{}').get('action', 'chat')
+    except (TypeError, ValueError):
+        return 'invalid'
+
+
+def emit_metrics(collector, action, duration_ms, request_bytes, response, cold_start):
+    """구간 수집기를 닫고 호출 단위 + 의존성 단위 EMF 로그 라인 출력"""
+    with METRICS_LOCK:
+        collector['closed'] = True
+        spans = collector['spans']
+    timestamp = int(time.time() * 1000)
+    status = response.get('statusCode', 200) if isinstance(response, dict) else 200
+    response_body = response.get('body') if isinstance(response, dict) else None
+
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': timestamp,
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Action'], ['Action', 'ColdStart']],
+                'Metrics': [
+                    {'Name': 'Duration', 'Unit': 'Milliseconds'},
+                    {'Name': 'RequestBytes', 'Unit': 'Bytes'},
+                    {'Name': 'ResponseBytes', 'Unit': 'Bytes'},
+                    {'Name': 'DependencyTime', 'Unit': 'Milliseconds'},
+                    {'Name': 'Errors', 'Unit': 'Count'}
+                ]
+            }]
+        },
+        'Action': action,
+        'ColdStart': 'cold' if cold_start else 'warm',
+        'Duration': duration_ms,
+        'RequestBytes': request_bytes,
+        'ResponseBytes': len(response_body) if isinstance(response_body, str) else 0,
+        'DependencyTime': round(sum(span['durationMs'] for span in spans), 2),
+        'Errors': 1 if status >= 500 else 0,
+        'StatusCode': status,
+        'DependencyCalls': len(spans)
+    }))
+
+    # 같은 의존성/작업은 합쳐서 한 줄로 (로그량 절약)
+    grouped = {}
+    for span in spans:
+        key = (span['dependency'], span['operation'])
+        group = grouped.setdefault(key, {
+            'calls': 0, 'durationMs': 0.0, 'requestBytes': 0, 'responseBytes': 0, 'errors': 0,
+            'readUnits': 0.0, 'writeUnits': 0.0, 'capacityUnits': 0.0
+        })
+        group['calls'] += 1
+        group['durationMs'] += span['durationMs']
+        group['requestBytes'] += span['requestBytes']
+        group['responseBytes'] += span['responseBytes']
+        group['errors'] += 0 if span['ok'] else 1
+        for unit in ('readUnits', 'writeUnits', 'capacityUnits'):
+            group[unit] += span.get(unit, 0.0)
+
+    for (dependency, operation), group in grouped.items():
+        print(json.dumps({
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Dependency'], ['Dependency', 'Operation'], ['Action', 'Dependency']],
+                    'Metrics': [
+                        {'Name': 'DependencyDuration', 'Unit': 'Milliseconds'},
+                        {'Name': 'DependencyCalls', 'Unit': 'Count'},
+                        {'Name': 'DependencyRequestBytes', 'Unit': 'Bytes'},
+                        {'Name': 'DependencyResponseBytes', 'Unit': 'Bytes'},
+                        {'Name': 'DependencyErrors', 'Unit': 'Count'},
+                        {'Name': 'ConsumedCapacityUnits', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            'Action': action,
+            'Dependency': dependency,
+            'Operation': operation,
+            'ColdStart': 'cold' if cold_start else 'warm',
+            'DependencyDuration': round(group['durationMs'], 2),
+            'DependencyCalls': group['calls'],
+            'DependencyRequestBytes': group['requestBytes'],
+            'DependencyResponseBytes': group['responseBytes'],
+            'DependencyErrors': group['errors'],
+            'ConsumedCapacityUnits': round(group['capacityUnits'], 2),
+            'ReadCapacityUnits': round(group['readUnits'], 2),
+            'WriteCapacityUnits': round(group['writeUnits'], 2)
+        }))
+
+
+def run_instrumented(event, context):
+    """route_event 실행 + 소요 시간/크기/콜드 스타트 측정 후 EMF 출력"""
+    cold_start = METRICS_STATE['coldStart']
+    METRICS_STATE['coldStart'] = False
+    action = get_event_action(event)
+    body = event.get('body')
+    request_bytes = len(body) if isinstance(body, str) else 0
+
+    collector = start_span_collector()
+    started = time.perf_counter()
+    response = None
+    try:
+        response = route_event(event, context)
+        return response
+    finally:
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        try:
+            emit_metrics(collector, action, duration_ms, request_bytes, response or {'statusCode': 500}, cold_start)
+        except Exception as e:
+            print(f"[Metrics] Emit error: {str(e)}")
+        METRICS_CONTEXT.collector = None
+
+
+if METRICS_ENABLED:
+    install_instrumentation()
+
+
 # ============================================
 # 공통 헬퍼 함수
 # ============================================
@@ -67,12 +622,30 @@ def get_now():
     return datetime.now(KST).isoformat()
 
 
+def json_default(value):
+    """표준 json/orjson이 모르는 타입 변환 (DynamoDB Decimal, datetime, set)"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps_json(body):
+    """응답 본문 직렬화 (orjson 있으면 사용, DynamoDB 항목을 그대로 넘겨도 안전)"""
+    if orjson is not None:
+        return orjson.dumps(body, default=json_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(body, default=json_default)
+
+
 def make_response(status_code, body):
     """표준 API 응답 생성"""
     return {
         'statusCode': status_code,
         'headers': CORS_HEADERS,
-        'body': json.dumps(body)
+        'body': dumps_json(body)
     }
 
 
@@ -86,12 +659,53 @@ def error_response(message, status_code=400):
     return make_response(status_code, {'error': message})
 
 
-def validate_required(body, *fields):
-    """필수 필드 검증. 누락된 필드가 있으면 에러 응답 반환, 없으면 None"""
-    missing = [f for f in fields if not body.get(f)]
-    if missing:
-        return error_response(f'{", ".join(missing)} {"is" if len(missing) == 1 else "are"} required')
-    return None
+# 응답 압축 (Accept-Encoding 협상)
+# REST API Gateway는 binaryMediaTypes에 */*(또는 application/json)가 등록되어 있어야
+# isBase64Encoded 본문을 바이너리로 디코딩해 전달하므로, 스테이지 설정 후 환경 변수로 켬.
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'false').lower() == 'true'
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+RESPONSE_GZIP_LEVEL = 5      # 6(기본) 대비 압축률 차이는 작고 CPU 시간은 짧음
+RESPONSE_BROTLI_QUALITY = 5  # 11(기본)은 Lambda CPU에서 수십 ms라 응답 지연이 더 커짐
+
+
+def get_accepted_encodings(event):
+    """Accept-Encoding 헤더 → 허용 인코딩 집합 (q=0 제외, 헤더 이름 대소문자 무시)"""
+    headers = event.get('headers') or {}
+    header = next((v for k, v in headers.items() if k.lower() == 'accept-encoding'), '') or ''
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if name and not re.match(r'\s*q\s*=\s*0(\.0*)?\s*$', params):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress_response(response, event):
+    """임계 크기 이상의 응답 본문을 br/gzip으로 압축해 base64로 반환 (줄어들 때만)"""
+    if not RESPONSE_COMPRESSION_ENABLED:
+        return response
+    body = response.get('body') if isinstance(response, dict) else None
+    if not isinstance(body, str) or len(body) < RESPONSE_COMPRESSION_MIN_BYTES or response.get('isBase64Encoded'):
+        return response
+
+    accepted = get_accepted_encodings(event)
+    raw = body.encode('utf-8')
+    if brotli is not None and 'br' in accepted:
+        encoding, compressed = 'br', brotli.compress(raw, quality=RESPONSE_BROTLI_QUALITY)
+    elif 'gzip' in accepted or '*' in accepted:
+        encoding, compressed = 'gzip', gzip.compress(raw, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    else:
+        return response
+
+    # 전송량은 압축 바이트 기준 (base64는 API Gateway가 디코딩해서 보냄)
+    if len(compressed) >= len(raw):
+        return response
+    return {
+        **response,
+        'headers': {**response.get('headers', {}), 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
 
 
 def get_user_id(body):
@@ -99,8 +713,265 @@ def get_user_id(body):
     return body.get('userId') or body.get('deviceId')
 
 
-# 모델 설정
-CLAUDE_MODEL = 'anthropic.claude-3-haiku-20240307-v1:0'
+# ============================================
+# 응답 DTO 투영 (DynamoDB 항목 → 응답 dict)
+# ============================================
+# (응답 필드, 항목 속성, 타입, 기본값) 목록을 import 시 한 번 투영 함수로 만들어 두고
+# 핸들러는 필드를 손으로 복사하는 대신 이 함수로 선택 + 타입 변환.
+# str 필드는 DynamoDB 값 그대로, 그 외 타입은 값(없으면 기본값)에 변환 적용 (Decimal → int 등).
+
+
+def make_dto(fields):
+    """필드 정의 → 투영 함수 item -> dict"""
+    fields = tuple(fields)
+
+    def project(item):
+        get = item.get
+        return {
+            field: get(attribute, default) if cast is str else cast(get(attribute) or default)
+            for field, attribute, cast, default in fields
+        }
+    return project
+
+
+SESSION_SUMMARY_DTO = make_dto((
+    ('sessionId', 'sessionId', str, None),
+    ('tutorName', 'tutorName', str, None),
+    ('topic', 'topic', str, 'daily'),
+    ('accent', 'accent', str, 'us'),
+    ('level', 'level', str, 'intermediate'),
+    ('startedAt', 'startedAt', str, None),
+    ('endedAt', 'endedAt', str, None),
+    ('duration', 'duration', int, 0),
+    ('turnCount', 'turnCount', int, 0),
+    ('wordCount', 'wordCount', int, 0),
+    ('status', 'status', str, None),
+))
+
+SESSION_DETAIL_DTO = make_dto((
+    ('sessionId', 'sessionId', str, None),
+    ('tutorName', 'tutorName', str, None),
+    ('startedAt', 'startedAt', str, None),
+    ('endedAt', 'endedAt', str, None),
+    ('duration', 'duration', int, 0),
+    ('turnCount', 'turnCount', int, 0),
+    ('wordCount', 'wordCount', int, 0),
+    ('status', 'status', str, None),
+))
+
+MESSAGE_DTO = make_dto((
+    ('role', 'role', str, None),
+    ('content', 'content', str, None),
+    ('translation', 'translation', str, None),
+    ('timestamp', 'timestamp', str, None),
+    ('turnNumber', 'turnNumber', int, 0),
+))
+
+
+def project_items(items, dto):
+    """여러 항목 투영 (목록 응답용)"""
+    return list(map(dto, items))
+
+
+# ============================================
+# 번역 캐시 (컨테이너 LRU + DynamoDB 영구 캐시)
+# ============================================
+
+TRANSLATION_CACHE_MAX_ENTRIES = 2000  # 컨테이너당 LRU 최대 항목 수
+TRANSLATION_CACHE_TTL_DAYS = 30       # DynamoDB 캐시 항목 보관 기간
+
+# 컨테이너 재사용 시 유지되는 LRU (key → 번역문)
+# translate_batch 워커 스레드가 동시에 접근하므로 LRU 갱신과 통계 증가는 TRANSLATION_CACHE_LOCK 안에서만
+TRANSLATION_CACHE = OrderedDict()
+TRANSLATION_CACHE_STATS = {'memoryHits': 0, 'dynamodbHits': 0, 'misses': 0}
+TRANSLATION_CACHE_LOCK = threading.Lock()
+
+
+def normalize_translation_text(text):
+    """캐시 키용 텍스트 정규화 (앞뒤 공백 제거, 연속 공백 축약)"""
+    return ' '.join(text.split())
+
+
+def get_translation_cache_key(text, source_lang, target_lang):
+    """(정규화 텍스트, 원본 언어, 대상 언어) 기반 캐시 키"""
+    raw = f'{source_lang}\n{target_lang}\n{normalize_translation_text(text)}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def remember_translation(cache_key, translation):
+    """LRU에 번역 저장 (최대 개수 초과 시 가장 오래된 항목 제거)"""
+    with TRANSLATION_CACHE_LOCK:
+        TRANSLATION_CACHE[cache_key] = translation
+        TRANSLATION_CACHE.move_to_end(cache_key)
+        while len(TRANSLATION_CACHE) > TRANSLATION_CACHE_MAX_ENTRIES:
+            TRANSLATION_CACHE.popitem(last=False)
+
+
+def recall_translation(cache_key):
+    """LRU 조회 (적중 시 최근 사용으로 갱신 + memoryHits 증가). 없으면 None"""
+    with TRANSLATION_CACHE_LOCK:
+        translation = TRANSLATION_CACHE.get(cache_key)
+        if translation is not None:
+            TRANSLATION_CACHE.move_to_end(cache_key)
+            TRANSLATION_CACHE_STATS['memoryHits'] += 1
+        return translation
+
+
+def count_translation_cache(stat, count=1):
+    """번역 캐시 통계 증가 (dynamodbHits / misses)"""
+    with TRANSLATION_CACHE_LOCK:
+        TRANSLATION_CACHE_STATS[stat] += count
+
+
+def get_translation_cache_stats():
+    """번역 캐시 적중률 통계"""
+    with TRANSLATION_CACHE_LOCK:
+        stats = dict(TRANSLATION_CACHE_STATS)
+        size = len(TRANSLATION_CACHE)
+    hits = stats['memoryHits'] + stats['dynamodbHits']
+    total = hits + stats['misses']
+    return {
+        **stats,
+        'size': size,
+        'hitRatio': round(hits / total, 3) if total else 0.0
+    }
+
+
+def get_cached_translation(cache_key):
+    """캐시 조회 (LRU → DynamoDB). 반환: (번역문, 계층) 또는 (None, None)"""
+    translation = recall_translation(cache_key)
+    if translation is not None:
+        return translation, 'memory'
+
+    try:
+        response = get_table().get_item(
+            Key={'PK': f'TRANSLATION#{cache_key}', 'SK': 'TRANSLATION'}
+        )
+        item = response.get('Item')
+        # TTL 삭제는 지연될 수 있으므로 만료 여부 직접 확인
+        if item and int(item.get('ttl', 0)) > int(time.time()):
+            remember_translation(cache_key, item['translation'])
+            count_translation_cache('dynamodbHits')
+            return item['translation'], 'dynamodb'
+    except Exception as e:
+        print(f"[TranslateCache] Lookup error: {str(e)}")
+
+    return None, None
+
+
+def store_translation(cache_key, text, source_lang, target_lang, translation):
+    """번역 결과를 LRU와 DynamoDB에 저장"""
+    remember_translation(cache_key, translation)
+    try:
+        get_table().put_item(Item={
+            'PK': f'TRANSLATION#{cache_key}',
+            'SK': 'TRANSLATION',
+            'type': 'TRANSLATION_CACHE',
+            'text': normalize_translation_text(text),
+            'sourceLang': source_lang,
+            'targetLang': target_lang,
+            'translation': translation,
+            'createdAt': get_now(),
+            'ttl': int((datetime.utcnow() + timedelta(days=TRANSLATION_CACHE_TTL_DAYS)).timestamp())
+        })
+    except Exception as e:
+        print(f"[TranslateCache] Store error: {str(e)}")
+
+
+def translate_with_cache(text, source_lang='en', target_lang='ko'):
+    """캐시를 거쳐 번역. 반환: (번역문, 계층: 'memory' | 'dynamodb' | None)"""
+    cache_key = get_translation_cache_key(text, source_lang, target_lang)
+    translation, tier = get_cached_translation(cache_key)
+    if translation is not None:
+        return translation, tier
+
+    count_translation_cache('misses')
+    # 정규화는 캐시 키에만 사용, 번역은 원문 그대로 요청
+    response = translate_client.translate_text(
+        Text=text,
+        SourceLanguageCode=source_lang,
+        TargetLanguageCode=target_lang
+    )
+    record_usage(translateCharacters=len(text))
+    translation = response['TranslatedText']
+    store_translation(cache_key, text, source_lang, target_lang, translation)
+    return translation, None
+
+
+TRANSLATE_BATCH_MAX_ITEMS = 100   # translate_batch 요청당 최대 텍스트 수
+TRANSLATE_BATCH_MAX_WORKERS = 8   # Amazon Translate 동시 호출 수
+
+
+def fetch_cached_translations(cache_keys):
+    """DynamoDB 캐시 일괄 조회 (BatchGetItem, 100개 단위). 반환: {key: 번역문}"""
+    found = {}
+    now_ts = int(time.time())
+    keys = list(cache_keys)
+
+    for i in range(0, len(keys), 100):
+        request_keys = [{'PK': f'TRANSLATION#{k}', 'SK': 'TRANSLATION'} for k in keys[i:i + 100]]
+        try:
+            # 미처리 키는 최대 3회까지 재요청
+            for _ in range(3):
+                response = dynamodb.batch_get_item(RequestItems={DYNAMODB_TABLE: {'Keys': request_keys}})
+                for item in response.get('Responses', {}).get(DYNAMODB_TABLE, []):
+                    if int(item.get('ttl', 0)) > now_ts:
+                        found[item['PK'].split('#', 1)[1]] = item['translation']
+                request_keys = response.get('UnprocessedKeys', {}).get(DYNAMODB_TABLE, {}).get('Keys', [])
+                if not request_keys:
+                    break
+        except Exception as e:
+            print(f"[TranslateCache] Batch lookup error: {str(e)}")
+
+    return found
+
+
+def translate_many_with_cache(texts, source_lang='en', target_lang='ko'):
+    """여러 텍스트를 중복 제거 후 캐시 조회, 미스만 병렬 번역. 반환: 입력 순서의 번역 리스트"""
+    keys = [get_translation_cache_key(t, source_lang, target_lang) for t in texts]
+    unique = {}
+    for key, text in zip(keys, texts):
+        unique.setdefault(key, text)
+
+    results = {}
+    for key in unique:
+        translation = recall_translation(key)
+        if translation is not None:
+            results[key] = translation
+
+    pending = [k for k in unique if k not in results]
+    if pending:
+        for key, translation in fetch_cached_translations(pending).items():
+            remember_translation(key, translation)
+            count_translation_cache('dynamodbHits')
+            results[key] = translation
+
+    misses = [k for k in unique if k not in results]
+    if misses:
+        count_translation_cache('misses', len(misses))
+
+        def translate_one(key):
+            text = unique[key]
+            response = translate_client.translate_text(
+                Text=text,
+                SourceLanguageCode=source_lang,
+                TargetLanguageCode=target_lang
+            )
+            record_usage(translateCharacters=len(text))
+            return key, response['TranslatedText']
+
+        with ThreadPoolExecutor(max_workers=min(TRANSLATE_BATCH_MAX_WORKERS, len(misses))) as executor:
+            futures = [executor.submit(bind_request_context(translate_one), k) for k in misses]
+            for future in futures:
+                try:
+                    key, translation = future.result()
+                    store_translation(key, unique[key], source_lang, target_lang, translation)
+                    results[key] = translation
+                except Exception as e:
+                    print(f"[TranslateBatch] Translate error: {str(e)}")
+
+    return [results.get(k) for k in keys], len(unique), len(misses)
+
 
 # 시스템 프롬프트 (링글 스타일)
 SYSTEM_PROMPT = """You are a friendly English conversation partner on a phone call.
@@ -179,9 +1050,14 @@ Return ONLY valid JSON, no other text."""
 # 액션 → 핸들러 매핑 (딕셔너리 디스패치)
 ACTION_HANDLERS = {
     'chat': 'handle_chat',
+    'speculate_chat': 'handle_speculate_chat',
+    'cancel_speculation': 'handle_cancel_speculation',
+    'get_speculation_stats': 'handle_get_speculation_stats',
     'tts': 'handle_tts',
+    'get_tts_stats': 'handle_get_tts_stats',
     'stt': 'handle_stt',
     'translate': 'handle_translate',
+    'translate_batch': 'handle_translate_batch',
     'analyze': 'handle_analyze',
     'save_settings': 'handle_save_settings',
     'get_settings': 'handle_get_settings',
@@ -192,6 +1068,8 @@ ACTION_HANDLERS = {
     'get_session_detail': 'handle_get_session_detail',
     'delete_session': 'handle_delete_session',
     'get_transcribe_url': 'handle_get_transcribe_url',
+    'get_transcribe_urls': 'handle_get_transcribe_urls',
+    'get_upload_url': 'handle_get_upload_url',
     # 펫 관련 핸들러
     'upload_pet_image': 'handle_upload_pet_image',
     'save_pet': 'handle_save_pet',
@@ -204,6 +1082,9 @@ ACTION_HANDLERS = {
     # 음성 클로닝 핸들러
     'clone_voice': 'handle_clone_voice',
     'tts_custom_voice': 'handle_tts_custom_voice',
+    # 첫 인사 사전 생성 핸들러
+    'prepare_greeting': 'handle_prepare_greeting',
+    'get_greeting': 'handle_get_greeting',
     # 사용자 메모리 핸들러
     'save_user_memory': 'handle_save_user_memory',
     'get_user_memory': 'handle_get_user_memory',
@@ -211,21 +1092,96 @@ ACTION_HANDLERS = {
     # 사용량 핸들러
     'get_usage': 'handle_get_usage',
     'increment_usage': 'handle_increment_usage',
+    'get_metering': 'handle_get_metering',
+}
+
+
+# 액션별 요청 스키마 (라우터가 import 시 액션별 검증 함수를 만들어 두고, 핸들러 실행 전 한 번 검사)
+#   identity: 'user' = userId 필수 (로그인 사용자 전용), 'device' = userId 또는 deviceId 필수
+#   fields: (필드, 타입, 필수 여부[, 허용 값]) — 타입(튜플이면 그중 하나)/허용 값은 값이 있을 때만 검사
+ACTION_SCHEMAS = {
+    'chat': {'fields': (
+        ('messages', list, False), ('settings', dict, False), ('speculationId', str, False),
+        ('speculationThreshold', (int, float), False))},
+    'speculate_chat': {'identity': 'user', 'fields': (
+        ('speculationId', str, True), ('messages', list, True), ('settings', dict, False))},
+    'cancel_speculation': {'identity': 'device'},
+    'get_speculation_stats': {'fields': (('days', int, False),)},
+    'tts': {'fields': (('text', str, False), ('settings', dict, False))},
+    'stt': {'fields': (('audio', str, False), ('s3Key', str, False))},
+    'translate': {'fields': (('text', str, False),)},
+    'translate_batch': {'fields': (('texts', list, False),)},
+    'analyze': {'fields': (('messages', list, False),)},
+    'save_settings': {'identity': 'device', 'fields': (('settings', dict, False),)},
+    'get_settings': {'identity': 'device'},
+    'start_session': {'identity': 'device', 'fields': (('sessionId', str, True), ('settings', dict, False))},
+    'end_session': {'identity': 'device', 'fields': (('sessionId', str, True),)},
+    'save_message': {'identity': 'device', 'fields': (('sessionId', str, True), ('message', dict, True))},
+    'get_sessions': {'identity': 'device'},
+    'get_session_detail': {'identity': 'device', 'fields': (('sessionId', str, True),)},
+    'delete_session': {'identity': 'device', 'fields': (('sessionId', str, True),)},
+    'get_transcribe_urls': {'fields': (('requests', list, False),)},
+    'get_upload_url': {'identity': 'device', 'fields': (('kind', str, False), ('contentType', str, False))},
+    'upload_pet_image': {'identity': 'device', 'fields': (('image', str, False), ('s3Key', str, False))},
+    'save_pet': {'identity': 'device'},
+    'get_pet': {'identity': 'device'},
+    'delete_pet': {'identity': 'device'},
+    'save_custom_tutor': {'identity': 'device', 'fields': (('tutor', dict, False),)},
+    'get_custom_tutor': {'identity': 'device'},
+    'delete_custom_tutor': {'identity': 'device'},
+    'clone_voice': {'identity': 'user', 'fields': (
+        ('voiceName', str, True), ('audio', str, False), ('s3Key', str, False))},
+    'tts_custom_voice': {'fields': (('text', str, False), ('voiceId', str, False), ('settings', dict, False))},
+    'prepare_greeting': {'identity': 'device', 'fields': (('settings', dict, False),)},
+    'get_greeting': {'identity': 'device', 'fields': (('settings', dict, False),)},
+    'save_user_memory': {'identity': 'user', 'fields': (('memory', dict, False),)},
+    'get_user_memory': {'identity': 'user'},
+    'extract_user_info': {'identity': 'user', 'fields': (('sessionId', str, False), ('messages', list, False))},
+    'get_usage': {'identity': 'device'},
+    'increment_usage': {'identity': 'device', 'fields': (('usageType', str, False, ('chat', 'tts', 'analyze')),)},
+    'get_metering': {'identity': 'device', 'fields': (('days', int, False), ('limit', int, False))},
+}
+
+
+# 예약 작업 → 실행 함수 매핑 (EventBridge 규칙 입력의 task 값)
+SCHEDULED_TASKS = {
+    'gc_voice_samples': 'run_voice_sample_gc',
 }
 
 
 def lambda_handler(event, context):
-    """Main Lambda handler - 딕셔너리 디스패치 패턴"""
+    """Main Lambda handler - 딕셔너리 디스패치 패턴 (METRICS_ENABLED면 계측)"""
+    if METRICS_ENABLED:
+        return run_instrumented(event, context)
+    return route_event(event, context)
+
+
+def route_event(event, context):
+    """이벤트 종류별 처리 (API 요청 / SQS / 예약 작업)"""
     if event.get('httpMethod') == 'OPTIONS':
         return make_response(200, '')
 
+    # SQS 이벤트 (메모리 추출 작업 큐)
+    if event.get('Records'):
+        start_request_budget(context)
+        return handle_memory_queue_event(event)
+
+    # EventBridge 예약 작업 (규칙 입력: {"task": "<작업명>"})
+    task = TASK_ROUTES.get(event.get('task'))
+    if task:
+        start_request_budget(context)
+        return task(event)
+
+    start_request_budget(context, API_GATEWAY_TIMEOUT_SECONDS)
     try:
-        body = json.loads(event.get('body', '{}'))
+        body = json.loads(event.get('body') or '{}')
+        if not isinstance(body, dict):
+            return error_response('Request body must be a JSON object')
         action = body.get('action', 'chat')
 
-        handler_name = ACTION_HANDLERS.get(action)
-        if handler_name:
-            return globals()[handler_name](body)
+        route = ROUTES.get(action)
+        if route:
+            return compress_response(route(body), event)
 
         return error_response('Invalid action')
 
@@ -238,12 +1194,12 @@ def lambda_handler(event, context):
 # 대화/분석 핸들러
 # ============================================
 
-def handle_chat(body):
-    """AI 대화 처리 (Bedrock Claude Haiku)"""
-    messages = body.get('messages', [])
-    settings = body.get('settings', {})
-    user_id = body.get('userId', '')
+# 대화 첫 턴 (메시지 없이 시작할 때 튜터 인사를 유도하는 사용자 발화)
+CHAT_OPENING_MESSAGE = "Hello, let's start our English practice session."
+
 
+def build_chat_system_prompt(settings, user_id=''):
+    """튜터 설정 + 사용자 메모리로 대화 시스템 프롬프트 구성"""
     accent_map = {'us': 'American English', 'uk': 'British English', 'au': 'Australian English', 'in': 'Indian English'}
     level_map = {'beginner': 'Beginner (use simple words and short sentences)', 'intermediate': 'Intermediate (normal conversation level)', 'advanced': 'Advanced (use complex vocabulary and idioms)'}
     topic_map = {'business': 'Business and workplace situations', 'daily': 'Daily life and casual conversation', 'travel': 'Travel and tourism', 'interview': 'Job interviews and professional settings'}
@@ -253,197 +1209,652 @@ def handle_chat(body):
     style_prompt = CONVERSATION_STYLE_PROMPTS.get(conversation_style, CONVERSATION_STYLE_PROMPTS['teacher'])
 
     # 사용자 메모리 조회 (이전 대화에서 기억한 정보)
-    user_memory_prompt = ""
-    if user_id:
-        try:
-            response = get_table().get_item(
-                Key={'PK': f'USER#{user_id}', 'SK': 'MEMORY'}
-            )
-            memory_item = response.get('Item')
-            if memory_item and memory_item.get('memory'):
-                memory = memory_item.get('memory')
-                memory_parts = []
-                if memory.get('name'):
-                    memory_parts.append(f"- Name: {memory['name']}")
-                if memory.get('job'):
-                    memory_parts.append(f"- Job: {memory['job']}")
-                if memory.get('company'):
-                    memory_parts.append(f"- Company: {memory['company']}")
-                if memory.get('hobbies'):
-                    memory_parts.append(f"- Hobbies: {', '.join(memory['hobbies'][:5])}")
-                if memory.get('location'):
-                    memory_parts.append(f"- Location: {memory['location']}")
-                if memory.get('family'):
-                    memory_parts.append(f"- Family: {memory['family']}")
-                if memory.get('recent_events'):
-                    memory_parts.append(f"- Recent events: {', '.join(memory['recent_events'][:3])}")
-                if memory.get('goals'):
-                    memory_parts.append(f"- Goals: {', '.join(memory['goals'][:3])}")
-                if memory.get('preferences'):
-                    memory_parts.append(f"- Preferences: {', '.join(memory['preferences'][:3])}")
-
-                if memory_parts:
-                    user_memory_prompt = f"""
-
-IMPORTANT - You remember these facts about this user from previous conversations:
-{chr(10).join(memory_parts)}
-
-Use this information naturally in conversation. For example, ask follow-up questions about their job, reference their hobbies, or ask about recent events they mentioned. This makes the conversation more personal and engaging."""
-        except Exception as e:
-            print(f"[Chat] Memory load error: {str(e)}")
+    user_memory_prompt = build_user_memory_prompt(user_id) if user_id else ""
 
-    system = SYSTEM_PROMPT.format(
+    return SYSTEM_PROMPT.format(
         accent=accent_map.get(settings.get('accent', 'us'), 'American English'),
         level=level_map.get(settings.get('level', 'intermediate'), 'Intermediate'),
         topic=topic_map.get(settings.get('topic', 'business'), 'Business'),
         conversation_style=style_prompt
     ) + user_memory_prompt
 
+
+def build_user_memory_prompt(user_id):
+    """사용자 메모리 → 시스템 프롬프트 추가 문구 (없으면 빈 문자열)"""
+    try:
+        response = get_table().get_item(
+            Key={'PK': f'USER#{user_id}', 'SK': 'MEMORY'}
+        )
+        memory_item = response.get('Item')
+        if memory_item and memory_item.get('memory'):
+            memory = memory_item.get('memory')
+            memory_parts = []
+            if memory.get('name'):
+                memory_parts.append(f"- Name: {memory['name']}")
+            if memory.get('job'):
+                memory_parts.append(f"- Job: {memory['job']}")
+            if memory.get('company'):
+                memory_parts.append(f"- Company: {memory['company']}")
+            if memory.get('hobbies'):
+                memory_parts.append(f"- Hobbies: {', '.join(memory['hobbies'][:5])}")
+            if memory.get('location'):
+                memory_parts.append(f"- Location: {memory['location']}")
+            if memory.get('family'):
+                memory_parts.append(f"- Family: {memory['family']}")
+            if memory.get('recent_events'):
+                memory_parts.append(f"- Recent events: {', '.join(memory['recent_events'][:3])}")
+            if memory.get('goals'):
+                memory_parts.append(f"- Goals: {', '.join(memory['goals'][:3])}")
+            if memory.get('preferences'):
+                memory_parts.append(f"- Preferences: {', '.join(memory['preferences'][:3])}")
+
+            if memory_parts:
+                return f"""
+
+IMPORTANT - You remember these facts about this user from previous conversations:
+{chr(10).join(memory_parts)}
+
+Use this information naturally in conversation. For example, ask follow-up questions about their job, reference their hobbies, or ask about recent events they mentioned. This makes the conversation more personal and engaging."""
+    except Exception as e:
+        print(f"[Chat] Memory load error: {str(e)}")
+    return ""
+
+
+def handle_chat(body):
+    """AI 대화 처리 (Bedrock Claude Haiku)
+
+    speculationId가 있으면 발화 중 미리 생성해 둔 응답(speculate_chat)을 확인해
+    최종 발화와 충분히 비슷하면 그대로 사용.
+    """
+    messages = body.get('messages', [])
+    settings = body.get('settings', {})
+    user_id = body.get('userId', '')  # 메모리/추측은 로그인 사용자(userId) 단위
+    translate_to = body.get('translateTo')
+    if not all(isinstance(m, dict) for m in messages):
+        return error_response('messages must be a list of objects')
+
+    if body.get('speculationId') and user_id and messages:
+        reply = commit_speculation(body)
+        if reply:
+            return success_response({**reply, 'role': 'assistant', 'speculated': True})
+
+    reply = generate_chat_reply(messages, settings, user_id, translate_to)
+    return success_response({**reply, 'role': 'assistant'})
+
+
+def generate_chat_reply(messages, settings, user_id='', translate_to=None):
+    """튜터 응답 생성 → {'message'} (translate_to가 있으면 'translation' 포함)"""
+    system = build_chat_system_prompt(settings, user_id)
+
     claude_messages = [{'role': m.get('role', 'user'), 'content': m.get('content', '')} for m in messages]
     if not claude_messages:
-        claude_messages = [{'role': 'user', 'content': "Hello, let's start our English practice session."}]
+        claude_messages = [{'role': 'user', 'content': CHAT_OPENING_MESSAGE}]
+
+    request_body = json.dumps({
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': 300,
+        'system': system,
+        'messages': claude_messages
+    })
+
+    # 번역 요청 시: 스트리밍으로 받으며 완성된 문장부터 병렬 번역 (클라이언트 translate 왕복 제거)
+    if translate_to:
+        message, translation = generate_chat_with_translation(request_body, translate_to)
+        return {'message': message, 'translation': translation}
 
     response = bedrock.invoke_model(
-        modelId=CLAUDE_MODEL,
+        modelId=get_config('claudeModel'),
         contentType='application/json',
         accept='application/json',
-        body=json.dumps({
-            'anthropic_version': 'bedrock-2023-05-31',
-            'max_tokens': 300,
-            'system': system,
-            'messages': claude_messages
-        })
+        body=request_body
     )
 
     result = json.loads(response['body'].read())
-    return success_response({'message': result['content'][0]['text'], 'role': 'assistant'})
+    record_bedrock_usage(result.get('usage'))
+    return {'message': result['content'][0]['text']}
 
 
-def handle_stt(body):
-    """음성→텍스트 변환 (AWS Transcribe)"""
-    audio_base64 = body.get('audio', '')
-    language = body.get('language', 'en-US')
+# ============================================
+# 다음 턴 추측 생성 (발화 중 부분 인식 결과로 미리 응답 생성)
+# ============================================
 
-    if not audio_base64:
-        return error_response('No audio data provided')
+SPECULATION_TTL_SECONDS = 300
+# 추측에 사용한 발화와 최종 발화의 단어 유사도가 이 이상이면 추측 응답 사용
+SPECULATION_COMMIT_THRESHOLD = float(os.environ.get('SPECULATION_COMMIT_THRESHOLD', '0.9'))
+SPECULATION_MIN_THRESHOLD = 0.6   # 요청으로 낮출 수 있는 하한 (너무 다른 발화에 엉뚱한 답 방지)
 
-    try:
-        audio_data = base64.b64decode(audio_base64)
-        job_name = f"stt-{int(time.time() * 1000)}"
-        s3_key = f"audio/{job_name}.webm"
 
-        s3.put_object(Bucket=S3_BUCKET, Key=s3_key, Body=audio_data, ContentType='audio/webm')
+def normalize_utterance(text):
+    """비교용 발화 정규화 → 단어 목록 (소문자, 구두점 제거)"""
+    return re.sub(r"[^\w\s']", ' ', (text or '').lower()).split()
 
-        transcribe.start_transcription_job(
-            TranscriptionJobName=job_name,
-            Media={'MediaFileUri': f's3://{S3_BUCKET}/{s3_key}'},
-            MediaFormat='webm',
-            LanguageCode=language,
-            Settings={'ShowSpeakerLabels': False, 'ChannelIdentification': False}
-        )
 
-        for _ in range(30):
-            status = transcribe.get_transcription_job(TranscriptionJobName=job_name)
-            job_status = status['TranscriptionJob']['TranscriptionJobStatus']
+def get_history_hash(messages):
+    """마지막 사용자 발화를 제외한 대화 기록 해시 (추측 시점과 같은 맥락인지 확인)"""
+    history = [(m.get('role', 'user'), m.get('content', '')) for m in messages]
+    return hashlib.sha256(json.dumps(history, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
 
-            if job_status == 'COMPLETED':
-                transcript_uri = status['TranscriptionJob']['Transcript']['TranscriptFileUri']
-                with urllib.request.urlopen(transcript_uri) as response:
-                    transcript_data = json.loads(response.read().decode())
 
-                transcript_text = transcript_data['results']['transcripts'][0]['transcript']
-                s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
-                transcribe.delete_transcription_job(TranscriptionJobName=job_name)
+def get_speculation_key(user_id, session_id):
+    """세션당 추측 하나만 유지 (새 추측이 이전 것을 덮어씀)"""
+    return {'PK': f'USER#{user_id}', 'SK': f'SPECULATION#{session_id or "default"}'}
 
-                return success_response({'transcript': transcript_text, 'success': True})
-            elif job_status == 'FAILED':
-                raise Exception('Transcription failed')
 
-            time.sleep(1)
+def record_speculation_metric(**counts):
+    """일별 추측 지표 원자적 누적 (generated / hits / misses / cancelled / latencySavedMs)"""
+    names = {f'#{k}': k for k in counts}
+    values = {f':{k}': v for k, v in counts.items()}
+    try:
+        get_table().update_item(
+            Key={'PK': 'METRICS', 'SK': f"SPECULATION#{get_now()[:10]}"},
+            UpdateExpression='ADD ' + ', '.join(f'#{k} :{k}' for k in counts),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except Exception as e:
+        print(f"[Speculation] Metric error: {str(e)}")
 
-        raise Exception('Transcription timeout')
 
+def handle_speculate_chat(body):
+    """부분 인식 발화로 다음 튜터 응답을 미리 생성해 저장 (최종 chat 요청에서 확정)"""
+    user_id = body['userId']
+    messages = body['messages']
+    if not all(isinstance(m, dict) for m in messages):
+        return error_response('messages must be a list of objects')
+    if messages[-1].get('role', 'user') != 'user':
+        return error_response('Last message must be the (partial) user utterance')
+
+    try:
+        started = time.time()
+        reply = generate_chat_reply(messages, body.get('settings', {}), user_id, body.get('translateTo'))
+        generation_ms = int((time.time() - started) * 1000)
+
+        get_table().put_item(Item={
+            **get_speculation_key(user_id, body.get('sessionId')),
+            'type': 'SPECULATION',
+            'speculationId': body['speculationId'],
+            'historyHash': get_history_hash(messages[:-1]),
+            'userText': messages[-1].get('content', ''),
+            'message': reply['message'],
+            'translation': reply.get('translation'),
+            'translateTo': body.get('translateTo'),
+            'generationMs': generation_ms,
+            'createdAt': get_now(),
+            'ttl': int(time.time()) + SPECULATION_TTL_SECONDS
+        })
+        record_speculation_metric(generated=1)
+        return success_response({'success': True, 'speculationId': body['speculationId'], 'generationMs': generation_ms})
     except Exception as e:
-        print(f"STT error: {str(e)}")
+        print(f"Speculate chat error: {str(e)}")
         return error_response(str(e), 500)
 
 
-def handle_tts(body):
-    """텍스트→음성 변환 (ElevenLabs)"""
-    text = body.get('text', '')
-    settings = body.get('settings', {})
-    accent = settings.get('accent', 'us')
-    gender = settings.get('gender', 'female')
-    conversation_style = settings.get('conversationStyle', 'teacher')
+def handle_cancel_speculation(body):
+    """진행 중인 추측 폐기 (사용자가 말을 이어가 추측이 빗나간 경우)"""
+    user_id = get_user_id(body)
 
-    # ElevenLabs 음성 ID 맵핑 (자연스러운 음성)
-    # 여성: Rachel(따뜻), Bella(친근), Elli(밝음), Charlotte(부드러움)
-    # 남성: Adam(따뜻), Antoni(친근), Josh(차분)
-    voice_map = {
-        ('us', 'female'): 'EXAVITQu4vr4xnSDxMaL',   # Bella - 친근하고 따뜻
-        ('us', 'male'): 'pNInz6obpgDQGcFmaJgB',     # Adam - 따뜻하고 자연스러움
-        ('uk', 'female'): 'XB0fDUnXU5powFXDhCwa',   # Charlotte - 영국식 부드러움
-        ('uk', 'male'): 'TX3LPaxmHKxFdv7VOQHJ',     # Liam - 영국 남성
-        ('au', 'female'): 'EXAVITQu4vr4xnSDxMaL',   # Bella (호주 대체)
-        ('au', 'male'): 'pNInz6obpgDQGcFmaJgB',     # Adam (호주 대체)
-        ('in', 'female'): 'EXAVITQu4vr4xnSDxMaL',   # Bella (인도 대체)
-        ('in', 'male'): 'pNInz6obpgDQGcFmaJgB',     # Adam (인도 대체)
-    }
+    key = get_speculation_key(user_id, body.get('sessionId'))
+    condition = {}
+    if body.get('speculationId'):
+        # 이미 더 새로운 추측으로 교체되었으면 지우지 않음
+        condition = {
+            'ConditionExpression': 'speculationId = :sid',
+            'ExpressionAttributeValues': {':sid': body['speculationId']}
+        }
+    try:
+        get_table().delete_item(Key=key, **condition)
+        record_speculation_metric(cancelled=1)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            return error_response(str(e), 500)
+    return success_response({'success': True})
 
-    # 애인 스타일은 더 감성적인 음성 사용
-    if conversation_style == 'lover':
-        if gender == 'female':
-            voice_id = '21m00Tcm4TlvDq8ikWAM'  # Rachel - 따뜻하고 감성적
-        else:
-            voice_id = 'ErXwobaYiN019PkySvjV'  # Antoni - 부드럽고 따뜻
-    else:
-        voice_id = voice_map.get((accent, gender), 'EXAVITQu4vr4xnSDxMaL')
+
+def commit_speculation(body):
+    """최종 발화와 추측을 비교해 맞으면 추측 응답 반환 (추측은 한 번만 사용)"""
+    messages = body['messages']
+    key = get_speculation_key(body['userId'], body.get('sessionId'))
 
     try:
-        api_key = get_elevenlabs_api_key()
-        if not api_key:
-            raise Exception("ElevenLabs API key not found")
+        item = get_table().delete_item(Key=key, ReturnValues='ALL_OLD').get('Attributes')
+    except Exception as e:
+        print(f"[Speculation] Lookup error: {str(e)}")
+        return None
 
-        # ElevenLabs API 호출 (v1 text-to-speech)
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}?output_format=mp3_44100_128"
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": api_key
-        }
-        data = json.dumps({
-            "text": text,
-            "model_id": "eleven_multilingual_v2"
-        }).encode('utf-8')
+    if not item or item.get('speculationId') != body['speculationId'] or int(item.get('ttl', 0)) < time.time():
+        record_speculation_metric(misses=1)
+        return None
 
-        req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-        with urllib.request.urlopen(req, timeout=30) as response:
-            audio_data = response.read()
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+    threshold = SPECULATION_COMMIT_THRESHOLD
+    if body.get('speculationThreshold') is not None:
+        # 타입은 ACTION_SCHEMAS에서 숫자로 검증됨
+        threshold = max(SPECULATION_MIN_THRESHOLD, min(1.0, float(body['speculationThreshold'])))
+
+    similarity = difflib.SequenceMatcher(
+        None, normalize_utterance(item.get('userText')), normalize_utterance(messages[-1].get('content'))
+    ).ratio()
+    same_context = item.get('historyHash') == get_history_hash(messages[:-1])
+    same_language = item.get('translateTo') == body.get('translateTo')
+
+    if not (same_context and same_language and similarity >= threshold):
+        print(f"[Speculation] Miss: similarity={similarity:.2f}, context={same_context}")
+        record_speculation_metric(misses=1)
+        return None
+
+    saved_ms = int(item.get('generationMs', 0))
+    print(f"[Speculation] Hit: similarity={similarity:.2f}, saved ~{saved_ms}ms")
+    record_speculation_metric(hits=1, latencySavedMs=saved_ms)
+
+    reply = {'message': item['message'], 'latencySavedMs': saved_ms}
+    if item.get('translation') is not None:
+        reply['translation'] = item['translation']
+    return reply
+
+
+def handle_get_speculation_stats(body):
+    """최근 N일 추측 지표 (적중률, 절약한 생성 시간)"""
+    days = max(1, min(body.get('days', 7), 90))  # 타입은 ACTION_SCHEMAS에서 정수로 검증됨
+    since = (datetime.now(timezone(timedelta(hours=9))) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    try:
+        response = get_table().query(
+            KeyConditionExpression='PK = :pk AND SK BETWEEN :from AND :to',
+            ExpressionAttributeValues={':pk': 'METRICS', ':from': f'SPECULATION#{since}', ':to': 'SPECULATION#9999'}
+        )
+        daily = []
+        totals = {'generated': 0, 'hits': 0, 'misses': 0, 'cancelled': 0, 'latencySavedMs': 0}
+        for item in response.get('Items', []):
+            day = {k: int(item.get(k, 0)) for k in totals}
+            for k, v in day.items():
+                totals[k] += v
+            daily.append({'date': item['SK'].split('#', 1)[1], **day})
+
+        attempts = totals['hits'] + totals['misses']
+        return success_response({
+            'success': True,
+            'totals': totals,
+            'hitRate': round(totals['hits'] / attempts, 3) if attempts else 0.0,
+            'avgLatencySavedMs': int(totals['latencySavedMs'] / totals['hits']) if totals['hits'] else 0,
+            'daily': daily
+        })
+    except Exception as e:
+        print(f"Get speculation stats error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+# 문장 경계 (마침표/물음표/느낌표 뒤 공백)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+def generate_chat_with_translation(request_body, target_lang):
+    """Bedrock 스트리밍 응답을 받으며 완성된 문장을 즉시 번역 작업으로 넘김. 반환: (응답, 번역)"""
+    response = bedrock.invoke_model_with_response_stream(
+        modelId=get_config('claudeModel'),
+        contentType='application/json',
+        accept='application/json',
+        body=request_body
+    )
+
+    parts, futures, pending = [], [], ''
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        for event in response['body']:
+            chunk = json.loads(event['chunk']['bytes']) if 'chunk' in event else {}
+            if chunk.get('type') == 'message_start':
+                record_bedrock_usage(chunk.get('message', {}).get('usage'))
+            elif chunk.get('type') == 'message_delta':
+                record_bedrock_usage(chunk.get('usage'))
+            if chunk.get('type') != 'content_block_delta':
+                continue
+            text = chunk['delta'].get('text', '')
+            parts.append(text)
+            pending += text
+
+            # 마지막 조각은 아직 이어질 수 있으므로 남겨둠
+            sentences = SENTENCE_BOUNDARY.split(pending)
+            for sentence in sentences[:-1]:
+                if sentence.strip():
+                    futures.append(executor.submit(bind_request_context(translate_with_cache), sentence, 'en', target_lang))
+            pending = sentences[-1]
+
+        if pending.strip():
+            futures.append(executor.submit(bind_request_context(translate_with_cache), pending, 'en', target_lang))
 
-        return success_response({
-            'audio': audio_base64,
-            'contentType': 'audio/mpeg',
-            'voice': voice_id,
-            'engine': 'elevenlabs'
-        })
-    except Exception as e:
-        print(f"ElevenLabs TTS error: {str(e)}, falling back to Polly")
-        # Polly 폴백
         try:
-            polly_voice_map = {
-                ('us', 'female'): ('Joanna', 'neural'), ('us', 'male'): ('Matthew', 'neural'),
-                ('uk', 'female'): ('Amy', 'neural'), ('uk', 'male'): ('Brian', 'neural'),
-                ('au', 'female'): ('Nicole', 'standard'), ('au', 'male'): ('Russell', 'standard'),
-                ('in', 'female'): ('Aditi', 'standard'), ('in', 'male'): ('Aditi', 'standard'),
+            translation = ' '.join(f.result()[0] for f in futures)
+        except Exception as e:
+            print(f"[Chat] Translation error: {str(e)}")
+            translation = None
+
+    return ''.join(parts), translation
+
+
+def get_transcribed_seconds(transcript_data):
+    """Transcribe 결과의 마지막 단어 끝 시각 → 과금 초 (작업당 최소 과금 시간 적용)"""
+    end_times = [float(item['end_time']) for item in transcript_data['results'].get('items', []) if item.get('end_time')]
+    return max(math.ceil(max(end_times, default=0)), TRANSCRIBE_MIN_BILLED_SECONDS)
+
+
+def handle_stt(body):
+    """음성→텍스트 변환 (AWS Transcribe)
+
+    get_upload_url로 S3에 직접 올린 s3Key 또는 base64 audio(이전 방식)를 받음
+    """
+    audio_base64 = body.get('audio', '')
+    language = body.get('language', 'en-US')
+    uploaded_key = body.get('s3Key')
+
+    if not audio_base64 and not uploaded_key:
+        return error_response('No audio data provided')
+    if uploaded_key and not is_owned_upload_key(uploaded_key, 'stt_audio', get_user_id(body)):
+        return error_response('Invalid s3Key', 403)
+
+    try:
+        job_name = f"stt-{int(time.time() * 1000)}"
+        if uploaded_key:
+            s3_key = uploaded_key
+        else:
+            s3_key = f"audio/{job_name}.webm"
+            s3.put_object(Bucket=S3_BUCKET, Key=s3_key, Body=base64.b64decode(audio_base64), ContentType='audio/webm')
+
+        transcribe.start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={'MediaFileUri': f's3://{S3_BUCKET}/{s3_key}'},
+            MediaFormat=s3_key.rsplit('.', 1)[-1],
+            LanguageCode=language,
+            Settings={'ShowSpeakerLabels': False, 'ChannelIdentification': False}
+        )
+
+        for _ in range(30):
+            status = transcribe.get_transcription_job(TranscriptionJobName=job_name)
+            job_status = status['TranscriptionJob']['TranscriptionJobStatus']
+
+            if job_status == 'COMPLETED':
+                transcript_uri = status['TranscriptionJob']['Transcript']['TranscriptFileUri']
+                with urllib.request.urlopen(transcript_uri, timeout=get_call_timeout('s3')) as response:
+                    transcript_data = json.loads(response.read().decode())
+
+                transcript_text = transcript_data['results']['transcripts'][0]['transcript']
+                record_usage(transcribeSeconds=get_transcribed_seconds(transcript_data))
+                s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+                transcribe.delete_transcription_job(TranscriptionJobName=job_name)
+
+                return success_response({'transcript': transcript_text, 'success': True})
+            elif job_status == 'FAILED':
+                raise Exception('Transcription failed')
+
+            remaining = get_remaining_budget()
+            if remaining is not None and remaining < 1 + DEADLINE_MIN_CALL_SECONDS:
+                break  # 다음 폴링 전에 예산 소진 → 기다리지 않고 바로 실패 응답
+            time.sleep(1)
+
+        raise Exception('Transcription timeout')
+
+    except Exception as e:
+        print(f"STT error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+# ============================================
+# TTS 프로바이더 라우터 (지연 기반 헤지 + 서킷 브레이커)
+# ============================================
+
+TTS_STATS_WINDOW = 50                 # 프로바이더별 최근 호출 표본 수
+TTS_HEDGE_MIN_SAMPLES = 10            # p95 계산에 필요한 최소 표본 (미만이면 기본 지연 사용)
+TTS_HEDGE_DEFAULT_DELAY = 2.0         # 표본 부족 시 헤지 대기 시간 (초)
+TTS_HEDGE_MIN_DELAY = 0.5             # p95가 아주 짧아도 최소 이만큼은 기다림
+TTS_CIRCUIT_FAILURE_THRESHOLD = 3     # 연속 실패 횟수 → 서킷 오픈
+TTS_CIRCUIT_COOLDOWN_SECONDS = 30     # 오픈 후 재시도(half-open)까지 대기
+ELEVENLABS_TTS_TIMEOUT = 15           # 헤지로 응답은 빠르게 나가므로 백그라운드 호출 상한만 둠
+
+TTS_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+TTS_STATS_LOCK = threading.Lock()
+TTS_PROVIDER_STATS = {}
+
+
+def get_tts_provider_state(provider):
+    """프로바이더 통계 상태 (없으면 생성, TTS_STATS_LOCK 안에서 호출)"""
+    state = TTS_PROVIDER_STATS.get(provider)
+    if state is None:
+        state = TTS_PROVIDER_STATS[provider] = {
+            'latencies': deque(maxlen=TTS_STATS_WINDOW),
+            'outcomes': deque(maxlen=TTS_STATS_WINDOW),
+            'calls': 0,
+            'errors': 0,
+            'wins': 0,
+            'consecutiveFailures': 0,
+            'openUntil': 0.0
+        }
+    return state
+
+
+def record_tts_call(provider, latency, ok):
+    """호출 결과 기록 + 연속 실패 시 서킷 오픈"""
+    with TTS_STATS_LOCK:
+        state = get_tts_provider_state(provider)
+        state['calls'] += 1
+        state['outcomes'].append(ok)
+        if ok:
+            state['latencies'].append(latency)
+            state['consecutiveFailures'] = 0
+            state['openUntil'] = 0.0
+        else:
+            state['errors'] += 1
+            state['consecutiveFailures'] += 1
+            if state['consecutiveFailures'] >= TTS_CIRCUIT_FAILURE_THRESHOLD:
+                state['openUntil'] = time.time() + TTS_CIRCUIT_COOLDOWN_SECONDS
+                print(f"[TTSRouter] Circuit open for {provider} ({state['consecutiveFailures']} failures)")
+
+
+def get_circuit_state(provider):
+    """closed / open / half_open (쿨다운이 지나면 한 번 시도 허용)"""
+    with TTS_STATS_LOCK:
+        state = get_tts_provider_state(provider)
+        if state['consecutiveFailures'] < TTS_CIRCUIT_FAILURE_THRESHOLD:
+            return 'closed'
+        if time.time() < state['openUntil']:
+            return 'open'
+        # half-open 시도 동안 다른 요청은 계속 폴백하도록 쿨다운 연장
+        state['openUntil'] = time.time() + TTS_CIRCUIT_COOLDOWN_SECONDS
+        return 'half_open'
+
+
+def percentile(values, pct):
+    """정렬된 표본의 nearest-rank 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def get_hedge_delay(provider):
+    """주 프로바이더 p95 지연 (표본 부족 시 기본값)"""
+    with TTS_STATS_LOCK:
+        latencies = list(get_tts_provider_state(provider)['latencies'])
+    if len(latencies) < TTS_HEDGE_MIN_SAMPLES:
+        return TTS_HEDGE_DEFAULT_DELAY
+    return max(TTS_HEDGE_MIN_DELAY, percentile(latencies, 95))
+
+
+def get_tts_provider_stats():
+    """프로바이더별 지표 (호출 수, 오류율, p50/p95, 서킷 상태, 승리 횟수)"""
+    stats = {}
+    now = time.time()
+    with TTS_STATS_LOCK:
+        for provider, state in TTS_PROVIDER_STATS.items():
+            outcomes = state['outcomes']
+            latencies = list(state['latencies'])
+            if state['consecutiveFailures'] < TTS_CIRCUIT_FAILURE_THRESHOLD:
+                circuit = 'closed'
+            else:
+                circuit = 'open' if now < state['openUntil'] else 'half_open'
+            stats[provider] = {
+                'calls': state['calls'],
+                'errors': state['errors'],
+                'wins': state['wins'],
+                'recentErrorRate': round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                'p50Ms': round(percentile(latencies, 50) * 1000) if latencies else None,
+                'p95Ms': round(percentile(latencies, 95) * 1000) if latencies else None,
+                'circuit': circuit
             }
-            polly_voice_id, engine = polly_voice_map.get((accent, gender), ('Joanna', 'neural'))
-            response = polly.synthesize_speech(Text=text, OutputFormat='mp3', VoiceId=polly_voice_id, Engine=engine)
-            audio_base64 = base64.b64encode(response['AudioStream'].read()).decode('utf-8')
-            return success_response({'audio': audio_base64, 'contentType': 'audio/mpeg', 'voice': polly_voice_id, 'engine': 'polly-fallback'})
-        except Exception as polly_error:
-            print(f"Polly fallback error: {str(polly_error)}")
-            return error_response(str(e), 500)
+    return stats
+
+
+def timed_tts_call(provider, fn):
+    """프로바이더 호출 + 지연/성공 기록 (헤지에서 진 호출도 통계에 반영)"""
+    started = time.time()
+    try:
+        audio = fn()
+    except Exception as e:
+        record_tts_call(provider, time.time() - started, False)
+        if isinstance(e, urllib.request.HTTPError) and e.code == 429:
+            penalize_global_bucket(provider)
+        if provider == 'elevenlabs':
+            invalidate_elevenlabs_api_key(e)
+        raise
+    record_tts_call(provider, time.time() - started, True)
+    return audio
+
+
+def route_tts(primary_fn, fallback_fn, primary='elevenlabs', fallback='polly'):
+    """주 프로바이더 호출, p95 안에 응답 없으면 폴백을 동시 호출해 먼저 온 결과 사용
+
+    Returns: {'audio', 'provider', 'latencyMs', 'hedged', 'route'}
+    """
+    started = time.time()
+
+    def done(provider, audio, hedged, route):
+        with TTS_STATS_LOCK:
+            get_tts_provider_state(provider)['wins'] += 1
+        return {
+            'audio': audio,
+            'provider': provider,
+            'latencyMs': int((time.time() - started) * 1000),
+            'hedged': hedged,
+            'route': route
+        }
+
+    circuit = get_circuit_state(primary)
+    if circuit == 'open':
+        return done(fallback, timed_tts_call(fallback, fallback_fn), False, 'circuit_open')
+    if RATE_LIMIT_ENABLED and check_rate_limit(primary, None, scopes=('global',)):
+        return done(fallback, timed_tts_call(fallback, fallback_fn), False, 'rate_limited')
+
+    # 남은 예산이 적으면 헤지 대기를 줄여 폴백이 끝날 시간을 확보
+    hedge_delay = get_hedge_delay(primary)
+    remaining = get_remaining_budget()
+    if remaining is not None:
+        hedge_delay = max(0, min(hedge_delay, remaining - CALL_POLICIES[fallback]['read']))
+
+    primary_future = TTS_EXECUTOR.submit(bind_request_context(timed_tts_call), primary, primary_fn)
+    finished, _ = wait([primary_future], timeout=hedge_delay)
+
+    if finished:
+        try:
+            return done(primary, primary_future.result(), False, circuit)
+        except Exception as e:
+            print(f"[TTSRouter] {primary} failed: {str(e)}, falling back to {fallback}")
+            return done(fallback, timed_tts_call(fallback, fallback_fn), False, 'failover')
+
+    # 헤지: 주 프로바이더가 p95를 넘기면 폴백도 호출하고 먼저 성공한 쪽 사용
+    fallback_future = TTS_EXECUTOR.submit(bind_request_context(timed_tts_call), fallback, fallback_fn)
+    futures = {primary_future: primary, fallback_future: fallback}
+    pending = set(futures)
+    last_error = None
+    while pending:
+        remaining = get_remaining_budget()
+        timeout = None if remaining is None else max(remaining, 0)
+        finished, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not finished:
+            raise DeadlineExceeded('tts: request budget exhausted')
+        for future in finished:
+            try:
+                audio = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            return done(futures[future], audio, True, 'hedge')
+    raise last_error
+
+
+def synthesize_elevenlabs(text, voice_id, timeout=ELEVENLABS_TTS_TIMEOUT):
+    """ElevenLabs TTS 호출 → MP3 바이트"""
+    api_key = get_elevenlabs_api_key()
+    if not api_key:
+        raise Exception("ElevenLabs API key not found")
+
+    # ElevenLabs API 호출 (v1 text-to-speech)
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}?output_format=mp3_44100_128"
+    headers = {
+        "Accept": "audio/mpeg",
+        "Content-Type": "application/json",
+        "xi-api-key": api_key
+    }
+    data = json.dumps({
+        "text": text,
+        "model_id": "eleven_multilingual_v2"
+    }).encode('utf-8')
+
+    req = urllib.request.Request(url, data=data, headers=headers, method='POST')
+    with urllib.request.urlopen(req, timeout=get_call_timeout('elevenlabs', timeout)) as response:
+        audio = response.read()
+    record_usage(elevenlabsCharacters=len(text))
+    return audio
+
+
+def synthesize_polly(text, voice_id, engine):
+    """Polly TTS 호출 → MP3 바이트"""
+    response = polly.synthesize_speech(Text=text, OutputFormat='mp3', VoiceId=voice_id, Engine=engine)
+    record_usage(**{f'polly{engine.capitalize()}Characters': len(text)})
+    return response['AudioStream'].read()
+
+
+def handle_get_tts_stats(body):
+    """TTS 프로바이더별 지연/오류/서킷 지표 조회"""
+    return success_response({'providers': get_tts_provider_stats()})
+
+
+def select_tts_voices(settings):
+    """설정 → (ElevenLabs 음성 ID, Polly 음성 ID, Polly 엔진)"""
+    accent = settings.get('accent', 'us')
+    gender = settings.get('gender', 'female')
+    conversation_style = settings.get('conversationStyle', 'teacher')
+
+    # 음성 맵은 운영 설정 문서에서 조정 가능 (APP_CONFIG_DEFAULTS 참고)
+    if conversation_style == 'lover':
+        lover_voices = get_config('loverVoices')
+        voice_id = lover_voices.get('female' if gender == 'female' else 'male')
+    else:
+        voice_id = get_config('elevenlabsVoices').get(f'{accent}:{gender}', 'EXAVITQu4vr4xnSDxMaL')
+
+    polly_voice_id, engine = get_config('pollyVoices').get(f'{accent}:{gender}', ['Joanna', 'neural'])
+    return voice_id, polly_voice_id, engine
+
+
+def handle_tts(body):
+    """텍스트→음성 변환 (ElevenLabs)"""
+    text = body.get('text', '')
+    voice_id, polly_voice_id, engine = select_tts_voices(body.get('settings', {}))
+
+    try:
+        # ElevenLabs 우선, 느리거나 장애 시 Polly (라우터가 헤지/서킷 판단)
+        result = route_tts(
+            lambda: synthesize_elevenlabs(text, voice_id), lambda: synthesize_polly(text, polly_voice_id, engine)
+        )
+    except Exception as e:
+        print(f"TTS error: {str(e)}")
+        return error_response(str(e), 500)
+
+    from_primary = result['provider'] == 'elevenlabs'
+    response = {
+        'audio': base64.b64encode(result['audio']).decode('utf-8'),
+        'contentType': 'audio/mpeg',
+        'voice': voice_id if from_primary else polly_voice_id,
+        'engine': 'elevenlabs' if from_primary else 'polly-fallback',
+        'latencyMs': result['latencyMs'],
+        'hedged': result['hedged'],
+        'route': result['route']
+    }
+    return success_response(response)
 
 
 def handle_translate(body):
@@ -456,15 +1867,16 @@ def handle_translate(body):
         return error_response('No text to translate')
 
     try:
-        response = translate_client.translate_text(
-            Text=text,
-            SourceLanguageCode=source_lang,
-            TargetLanguageCode=target_lang
-        )
+        translation, cache_tier = translate_with_cache(text, source_lang, target_lang)
+        cache_stats = get_translation_cache_stats()
+        print(f"[TranslateCache] tier={cache_tier or 'miss'} hitRatio={cache_stats['hitRatio']} size={cache_stats['size']}")
         return success_response({
-            'translation': response['TranslatedText'],
+            'translation': translation,
             'sourceLang': source_lang,
             'targetLang': target_lang,
+            'cached': cache_tier is not None,
+            'cacheTier': cache_tier,
+            'cacheHitRatio': cache_stats['hitRatio'],
             'success': True
         })
     except Exception as e:
@@ -472,6 +1884,45 @@ def handle_translate(body):
         return error_response(str(e), 500)
 
 
+def handle_translate_batch(body):
+    """여러 텍스트 일괄 번역 (대화 기록 화면용, 입력 순서 유지)"""
+    texts = body.get('texts', [])
+    source_lang = body.get('sourceLang', 'en')
+    target_lang = body.get('targetLang', 'ko')
+
+    if not isinstance(texts, list) or not texts:
+        return error_response('texts must be a non-empty list')
+    if len(texts) > TRANSLATE_BATCH_MAX_ITEMS:
+        return error_response(f'texts cannot exceed {TRANSLATE_BATCH_MAX_ITEMS} items')
+
+    try:
+        # 빈 텍스트는 번역하지 않고 빈 문자열로 반환
+        indexes = [i for i, t in enumerate(texts) if isinstance(t, str) and t.strip()]
+        translated, unique_count, miss_count = translate_many_with_cache(
+            [texts[i] for i in indexes], source_lang, target_lang
+        )
+
+        translations = [''] * len(texts)
+        for i, translation in zip(indexes, translated):
+            translations[i] = translation
+
+        cache_stats = get_translation_cache_stats()
+        print(f"[TranslateBatch] items={len(texts)} unique={unique_count} misses={miss_count} hitRatio={cache_stats['hitRatio']}")
+
+        return success_response({
+            'translations': translations,
+            'sourceLang': source_lang,
+            'targetLang': target_lang,
+            'uniqueCount': unique_count,
+            'translatedCount': miss_count,
+            'cacheHitRatio': cache_stats['hitRatio'],
+            'success': all(t is not None for t in translations)
+        })
+    except Exception as e:
+        print(f"Translate batch error: {str(e)}")
+        return error_response(str(e), 500)
+
+
 def handle_analyze(body):
     """대화 분석 (AI 기반 CAFP 점수, 문법, 필러 분석)"""
     messages = body.get('messages', [])
@@ -493,7 +1944,7 @@ def handle_analyze(body):
 
     try:
         response = bedrock.invoke_model(
-            modelId=CLAUDE_MODEL,
+            modelId=get_config('claudeModel'),
             contentType='application/json',
             accept='application/json',
             body=json.dumps({
@@ -504,6 +1955,7 @@ def handle_analyze(body):
         )
 
         result = json.loads(response['body'].read())
+        record_bedrock_usage(result.get('usage'))
         json_match = re.search(r'\{[\s\S]*\}', result['content'][0]['text'])
         if json_match:
             return success_response({'analysis': json.loads(json_match.group()), 'success': True})
@@ -533,8 +1985,6 @@ def handle_analyze(body):
 def handle_save_settings(body):
     """사용자 맞춤설정 저장"""
     device_id = get_user_id(body)
-    if not device_id:
-        return error_response('userId or deviceId is required')
     settings = body.get('settings', {})
 
     try:
@@ -558,8 +2008,6 @@ def handle_save_settings(body):
 def handle_get_settings(body):
     """사용자 맞춤설정 조회"""
     device_id = get_user_id(body)
-    if not device_id:
-        return error_response('userId or deviceId is required')
 
     try:
         response = get_table().get_item(Key={'PK': f'DEVICE#{device_id}', 'SK': 'SETTINGS'})
@@ -579,11 +2027,8 @@ def handle_get_settings(body):
 
 def handle_start_session(body):
     """새 대화 세션 시작"""
-    device_id = body.get('userId') or body.get('deviceId')
-    session_id = body.get('sessionId')
-
-    if not device_id or not session_id:
-        return error_response('userId/deviceId and sessionId are required')
+    device_id = get_user_id(body)
+    session_id = body['sessionId']
     settings = body.get('settings', {})
     tutor_name = body.get('tutorName', 'Gwen')
 
@@ -620,11 +2065,8 @@ def handle_start_session(body):
 
 def handle_end_session(body):
     """세션 종료 및 통계 업데이트 (GSI1로 세션 조회)"""
-    device_id = body.get('userId') or body.get('deviceId')
-    session_id = body.get('sessionId')
-
-    if not device_id or not session_id:
-        return error_response('userId/deviceId and sessionId are required')
+    device_id = get_user_id(body)
+    session_id = body['sessionId']
 
     try:
         table = get_table()
@@ -665,10 +2107,8 @@ def handle_end_session(body):
 def handle_save_message(body):
     """대화 메시지 저장"""
     device_id = get_user_id(body)
-    session_id = body.get('sessionId')
-    if not device_id or not session_id or not body.get('message'):
-        return error_response('userId/deviceId, sessionId, and message are required')
-    message = body.get('message', {})
+    session_id = body['sessionId']
+    message = body['message']
 
     try:
         now = get_now()
@@ -699,9 +2139,7 @@ def handle_save_message(body):
 def handle_get_sessions(body):
     """사용자의 세션 목록 조회 (날짜순 정렬, 페이지네이션 지원)"""
     # userId 또는 deviceId 지원 (userId 우선)
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
     limit = body.get('limit', 10)
     last_key = body.get('lastKey')
 
@@ -733,19 +2171,7 @@ def handle_get_sessions(body):
 
             for item in response.get('Items', []):
                 if item.get('type') == 'SESSION_META':
-                    sessions.append({
-                        'sessionId': item.get('sessionId'),
-                        'tutorName': item.get('tutorName'),
-                        'topic': item.get('topic', 'daily'),
-                        'accent': item.get('accent', 'us'),
-                        'level': item.get('level', 'intermediate'),
-                        'startedAt': item.get('startedAt'),
-                        'endedAt': item.get('endedAt'),
-                        'duration': int(item.get('duration', 0)),
-                        'turnCount': int(item.get('turnCount', 0)),
-                        'wordCount': int(item.get('wordCount', 0)),
-                        'status': item.get('status')
-                    })
+                    sessions.append(SESSION_SUMMARY_DTO(item))
                     if len(sessions) >= limit:
                         break
 
@@ -768,9 +2194,7 @@ def handle_get_sessions(body):
 def handle_get_session_detail(body):
     """특정 세션의 상세 정보 조회"""
     device_id = get_user_id(body)
-    session_id = body.get('sessionId')
-    if not device_id or not session_id:
-        return error_response('userId/deviceId and sessionId are required')
+    session_id = body['sessionId']
 
     try:
         response = get_table().query(
@@ -783,24 +2207,9 @@ def handle_get_session_detail(body):
         session_meta, messages = None, []
         for item in response.get('Items', []):
             if item.get('type') == 'SESSION_META':
-                session_meta = {
-                    'sessionId': item.get('sessionId'),
-                    'tutorName': item.get('tutorName'),
-                    'startedAt': item.get('startedAt'),
-                    'endedAt': item.get('endedAt'),
-                    'duration': int(item.get('duration', 0)),
-                    'turnCount': int(item.get('turnCount', 0)),
-                    'wordCount': int(item.get('wordCount', 0)),
-                    'status': item.get('status')
-                }
+                session_meta = SESSION_DETAIL_DTO(item)
             elif item.get('type') == 'MESSAGE':
-                messages.append({
-                    'role': item.get('role'),
-                    'content': item.get('content'),
-                    'translation': item.get('translation'),
-                    'timestamp': item.get('timestamp'),
-                    'turnNumber': int(item.get('turnNumber', 0))
-                })
+                messages.append(MESSAGE_DTO(item))
 
         messages.sort(key=lambda x: x.get('turnNumber', 0))
         return success_response({'session': session_meta, 'messages': messages})
@@ -812,9 +2221,7 @@ def handle_get_session_detail(body):
 def handle_delete_session(body):
     """세션 삭제 (GSI1으로 조회 + userId/deviceId 검증)"""
     device_id = get_user_id(body)
-    session_id = body.get('sessionId')
-    if not device_id or not session_id:
-        return error_response('userId/deviceId and sessionId are required')
+    session_id = body['sessionId']
 
     try:
         table = get_table()
@@ -846,42 +2253,278 @@ def handle_delete_session(body):
         return error_response(str(e), 500)
 
 
+# ============================================
+# 이미지 썸네일 (펫/커스텀 튜터)
+# ============================================
+
+IMAGE_VARIANT_SIZES = (64, 128, 512)  # 긴 변 기준 픽셀
+IMAGE_VARIANT_QUALITY = 80
+
+
+def get_image_variant_format():
+    """썸네일 포맷 (WebP 지원 시 WebP, 아니면 JPEG). 반환: (PIL 포맷, 확장자, Content-Type)"""
+    from PIL import features
+    if features.check('webp'):
+        return 'WEBP', 'webp', 'image/webp'
+    return 'JPEG', 'jpg', 'image/jpeg'
+
+
+def get_image_variant_key(s3_key, size, extension):
+    """원본 키에서 썸네일 키 도출 (pets/u/123.jpg → pets/u/123_128.webp)"""
+    return f"{s3_key.rsplit('.', 1)[0]}_{size}.{extension}"
+
+
+def create_image_variants(s3_key, image_data=None):
+    """원본 이미지로 크기별 썸네일 생성 후 S3에 저장. 반환: {크기: 키}"""
+    if Image is None:
+        return {}
+
+    if image_data is None:
+        image_data = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)['Body'].read()
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_data)))
+    pil_format, extension, content_type = get_image_variant_format()
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = {}
+    for size in IMAGE_VARIANT_SIZES:
+        # 원본보다 크거나 같은 썸네일은 만들지 않음 (원본 사용)
+        if size >= max(image.size):
+            break
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, format=pil_format, quality=IMAGE_VARIANT_QUALITY)
+
+        variant_key = get_image_variant_key(s3_key, size, extension)
+        s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=variant_key,
+            Body=buffer.getvalue(),
+            ContentType=content_type,
+            CacheControl='public, max-age=31536000, immutable'
+        )
+        variants[size] = variant_key
+
+    return variants
+
+
+def find_image_variants(s3_key):
+    """S3에 저장된 썸네일 조회. 반환: {'크기': 키} (DynamoDB 저장용 문자열 키)"""
+    stem = s3_key.rsplit('.', 1)[0]
+    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=f'{stem}_')
+    variants = {}
+    for obj in response.get('Contents', []):
+        size = obj['Key'][len(stem) + 1:].split('.', 1)[0]
+        if size.isdigit():
+            variants[size] = obj['Key']
+    return variants
+
+
+def parse_image_size(value):
+    """요청 imageSize → 양의 정수 픽셀 (정수/숫자 문자열이 아니면 None)"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if value > 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value) or None
+    return None
+
+
+def select_image_variant(s3_key, variants, requested_size):
+    """요청 크기 이상인 가장 작은 썸네일 키 (없거나 알 수 없는 크기면 원본)"""
+    requested = parse_image_size(requested_size)
+    if not requested or not variants:
+        return s3_key
+    candidates = sorted(
+        (int(size), key) for size, key in variants.items()
+        if str(size).isdigit() and int(size) in IMAGE_VARIANT_SIZES and int(size) >= requested
+    )
+    return candidates[0][1] if candidates else s3_key
+
+
+def get_stored_image_variants(s3_key):
+    """저장할 이미지 키의 썸네일 목록 조회 (키가 없으면 빈 dict)"""
+    if not s3_key:
+        return {}
+    try:
+        return find_image_variants(s3_key)
+    except Exception as e:
+        print(f"Image variant lookup warning: {str(e)}")
+        return {}
+
+
+# ============================================
+# 이미지 URL (S3 키 저장 + presigned URL 캐시)
+# ============================================
+
+PRESIGNED_URL_EXPIRES_IN = 12 * 60 * 60  # presigned URL 유효 시간
+PRESIGNED_URL_WINDOW = 6 * 60 * 60       # 서명 시각 정렬 단위 (같은 구간 내 동일 URL)
+
+# (S3 키, 서명 구간 시작) → URL. 구간이 바뀌면 새 URL로 교체
+PRESIGNED_URL_CACHE = {}
+
+
+def extract_s3_key(image_url):
+    """버킷 URL(또는 presigned URL)에서 S3 키 추출. 버킷 외부 URL이면 None"""
+    marker = f'{S3_BUCKET}.s3.amazonaws.com/'
+    if not image_url or marker not in image_url:
+        return None
+    return image_url.split(marker, 1)[1].split('?', 1)[0]
+
+
+def get_image_key(item):
+    """아이템의 이미지 S3 키 (imageKey 우선, 이전 아이템은 imageUrl에서 추출)"""
+    return item.get('imageKey') or extract_s3_key(item.get('imageUrl', ''))
+
+
+# (날짜, 리전, 서비스, 액세스 키) → SigV4 서명 키. 하루 단위로만 바뀌므로 재사용
+SIGNING_KEY_CACHE = {}
+
+
+def get_aws_credentials():
+    """공유 세션의 현재 자격증명 (임시 자격증명 만료 시 botocore가 갱신)"""
+    return aws_session.get_credentials().get_frozen_credentials()
+
+
+def get_signing_key(secret_key, date_stamp, region, service, access_key=None):
+    """SigV4 서명 키 도출 (access_key를 주면 캐시 사용)"""
+    cache_key = (date_stamp, region, service, access_key)
+    if access_key and cache_key in SIGNING_KEY_CACHE:
+        return SIGNING_KEY_CACHE[cache_key]
+
+    def sign(key, msg):
+        return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+    k_date = sign(('AWS4' + secret_key).encode('utf-8'), date_stamp)
+    k_region = sign(k_date, region)
+    k_service = sign(k_region, service)
+    k_signing = sign(k_service, 'aws4_request')
+
+    if access_key:
+        # 날짜가 바뀌면 이전 키 정리
+        for stale in [k for k in SIGNING_KEY_CACHE if k[0] != date_stamp]:
+            del SIGNING_KEY_CACHE[stale]
+        SIGNING_KEY_CACHE[cache_key] = k_signing
+    return k_signing
+
+
+def presign_s3_get_url(s3_key, signed_at, expires_in):
+    """S3 GetObject presigned URL 직접 서명 (서명 시각 지정 → 같은 입력이면 같은 URL)"""
+    credentials = get_aws_credentials()
+    region, service = 'us-east-1', 's3'
+    host = f'{S3_BUCKET}.s3.amazonaws.com'
+
+    amz_date = signed_at.strftime('%Y%m%dT%H%M%SZ')
+    date_stamp = signed_at.strftime('%Y%m%d')
+    credential_scope = f'{date_stamp}/{region}/{service}/aws4_request'
+
+    params = {
+        'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+        'X-Amz-Credential': f'{credentials.access_key}/{credential_scope}',
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(expires_in),
+        'X-Amz-SignedHeaders': 'host',
+    }
+    if credentials.token:
+        params['X-Amz-Security-Token'] = credentials.token
+
+    canonical_uri = '/' + quote(s3_key, safe='/~')
+    canonical_querystring = '&'.join(
+        f'{quote(k, safe="~")}={quote(v, safe="~")}' for k, v in sorted(params.items())
+    )
+    canonical_request = '\n'.join([
+        'GET', canonical_uri, canonical_querystring, f'host:{host}\n', 'host', 'UNSIGNED-PAYLOAD'
+    ])
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', amz_date, credential_scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+    ])
+    signing_key = get_signing_key(credentials.secret_key, date_stamp, region, service, credentials.access_key)
+    signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    return f'https://{host}{canonical_uri}?{canonical_querystring}&X-Amz-Signature={signature}'
+
+
+def get_presigned_image_url(s3_key):
+    """이미지 presigned URL (캐시 재사용)
+
+    서명 시각을 PRESIGNED_URL_WINDOW 단위로 내림해 같은 구간에서는 항상 같은 URL을
+    돌려주므로 클라이언트 이미지 캐시가 적중함. 반환 URL은 최소
+    (PRESIGNED_URL_EXPIRES_IN - PRESIGNED_URL_WINDOW)초 동안 유효.
+    """
+    now_ts = int(time.time())
+    window_start = now_ts - now_ts % PRESIGNED_URL_WINDOW
+    cache_key = (s3_key, window_start)
+
+    url = PRESIGNED_URL_CACHE.get(cache_key)
+    if url:
+        return url
+
+    # 지난 구간 URL 정리
+    for stale in [k for k in PRESIGNED_URL_CACHE if k[1] != window_start]:
+        del PRESIGNED_URL_CACHE[stale]
+
+    signed_at = datetime.fromtimestamp(window_start, timezone.utc)
+    url = presign_s3_get_url(s3_key, signed_at, PRESIGNED_URL_EXPIRES_IN)
+    PRESIGNED_URL_CACHE[cache_key] = url
+    return url
+
+
 # ============================================
 # 펫 캐릭터 핸들러
 # ============================================
 
 def handle_upload_pet_image(body):
-    """펫 이미지를 S3에 업로드하고 URL 반환"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id or not body.get('image'):
-        return error_response('userId/deviceId and image are required')
+    """펫 이미지를 S3에 업로드하고 URL 반환
+
+    get_upload_url로 이미 업로드한 경우 s3Key만 받아 확인 (Lambda는 이미지를 다루지 않음)
+    """
+    device_id = get_user_id(body)
+    uploaded_key = body.get('s3Key')
+    if not (body.get('image') or uploaded_key):
+        return error_response('image or s3Key is required')
+    if uploaded_key and not is_owned_upload_key(uploaded_key, 'pet_image', device_id):
+        return error_response('Invalid s3Key', 403)
     image_base64 = body.get('image', '')
 
     try:
-        # Base64 이미지 디코딩 (data:image/jpeg;base64, 부분 제거)
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
+        now = get_now()
 
-        image_data = base64.b64decode(image_base64)
+        if uploaded_key:
+            s3_key = uploaded_key
+        else:
+            # Base64 이미지 디코딩 (data:image/jpeg;base64, 부분 제거)
+            if ',' in image_base64:
+                image_base64 = image_base64.split(',')[1]
 
-        # S3에 업로드
-        now = get_now()
-        s3_key = f"pets/{device_id}/{int(time.time() * 1000)}.jpg"
+            image_data = base64.b64decode(image_base64)
 
-        s3.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=image_data,
-            ContentType='image/jpeg'
-        )
+            # S3에 업로드
+            s3_key = f"pets/{device_id}/{int(time.time() * 1000)}.jpg"
 
-        # S3 URL 생성 (get_pet에서 presigned URL로 변환됨)
+            s3.put_object(
+                Bucket=S3_BUCKET,
+                Key=s3_key,
+                Body=image_data,
+                ContentType='image/jpeg'
+            )
+
+        # 크기별 썸네일 생성 (실패해도 원본은 사용 가능)
+        try:
+            variants = create_image_variants(s3_key, None if uploaded_key else image_data)
+        except Exception as variant_error:
+            print(f"Image variant warning: {str(variant_error)}")
+            variants = {}
+
+        # S3 URL 생성 (저장 시 키만 보관, 조회 시 presigned URL로 변환됨)
         image_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
 
         return success_response({
             'success': True,
             'imageUrl': image_url,
             's3Key': s3_key,
+            'variantSizes': sorted(variants),
             'uploadedAt': now
         })
     except Exception as e:
@@ -891,11 +2534,13 @@ def handle_upload_pet_image(body):
 
 def handle_save_pet(body):
     """펫 정보를 DynamoDB에 저장"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
     pet_name = body.get('petName', '나의 반려동물')
     image_url = body.get('imageUrl', '')
+    # 버킷 이미지는 S3 키만 저장, 외부 URL만 그대로 저장
+    image_key = body.get('imageKey') or extract_s3_key(image_url)
+    if image_key and not is_owned_upload_key(image_key, 'pet_image', device_id):
+        return error_response('Invalid imageKey')
 
     try:
         now = get_now()
@@ -906,7 +2551,9 @@ def handle_save_pet(body):
             'type': 'PET_CHARACTER',
             'deviceId': device_id,
             'petName': pet_name,
-            'imageUrl': image_url,
+            'imageKey': image_key,
+            'imageUrl': None if image_key else image_url,
+            'imageVariants': get_stored_image_variants(image_key),
             'updatedAt': now,
             'createdAt': now,
             'ttl': get_ttl()
@@ -927,9 +2574,7 @@ def handle_save_pet(body):
 
 def handle_get_pet(body):
     """펫 정보를 DynamoDB에서 조회 (presigned URL 생성)"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
 
     try:
         response = get_table().get_item(
@@ -938,19 +2583,14 @@ def handle_get_pet(body):
         item = response.get('Item')
 
         if item:
-            image_url = item.get('imageUrl', '')
+            image_url = item.get('imageUrl') or ''
+            s3_key = get_image_key(item)
 
-            # S3 URL에서 presigned URL 생성 (1시간 유효)
-            if image_url and S3_BUCKET in image_url:
+            # 요청 크기에 맞는 썸네일의 presigned URL (캐시 재사용)
+            if s3_key:
                 try:
-                    # URL에서 S3 key 추출
-                    s3_key = image_url.split(f'{S3_BUCKET}.s3.amazonaws.com/')[1]
-                    # Presigned URL 생성 (3600초 = 1시간)
-                    image_url = s3.generate_presigned_url(
-                        'get_object',
-                        Params={'Bucket': S3_BUCKET, 'Key': s3_key},
-                        ExpiresIn=3600
-                    )
+                    s3_key = select_image_variant(s3_key, item.get('imageVariants'), body.get('imageSize'))
+                    image_url = get_presigned_image_url(s3_key)
                 except Exception as presign_error:
                     print(f"Presign URL error: {str(presign_error)}")
                     # 실패 시 원본 URL 유지
@@ -975,9 +2615,7 @@ def handle_get_pet(body):
 
 def handle_delete_pet(body):
     """펫 정보와 S3 이미지 삭제"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
 
     try:
         table = get_table()
@@ -989,12 +2627,13 @@ def handle_delete_pet(body):
         item = response.get('Item')
 
         if item:
-            # S3 이미지 삭제 (이미지 URL에서 키 추출)
-            image_url = item.get('imageUrl', '')
-            if image_url and S3_BUCKET in image_url:
+            # S3 이미지 및 썸네일 삭제
+            s3_key = get_image_key(item)
+            if s3_key:
                 try:
-                    s3_key = image_url.split(f'{S3_BUCKET}.s3.amazonaws.com/')[1]
                     s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+                    for variant_key in (item.get('imageVariants') or {}).values():
+                        s3.delete_object(Bucket=S3_BUCKET, Key=variant_key)
                 except Exception as s3_error:
                     print(f"S3 delete warning: {str(s3_error)}")
 
@@ -1017,11 +2656,14 @@ def handle_delete_pet(body):
 
 def handle_save_custom_tutor(body):
     """커스텀 튜터 정보를 DynamoDB에 저장"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
 
     tutor_data = body.get('tutor', {})
+    # 버킷 이미지는 S3 키만 저장, 외부 URL만 그대로 저장
+    image_key = tutor_data.get('imageKey') or extract_s3_key(tutor_data.get('image', ''))
+    # 튜터 이미지도 upload_pet_image/get_upload_url(pet_image)로 pets/{사용자}/ 아래에 올라감
+    if image_key and not is_owned_upload_key(image_key, 'pet_image', device_id):
+        return error_response('Invalid imageKey')
 
     try:
         now = get_now()
@@ -1032,7 +2674,9 @@ def handle_save_custom_tutor(body):
             'type': 'CUSTOM_TUTOR',
             'deviceId': device_id,
             'tutorName': tutor_data.get('name', '나만의 튜터'),
-            'imageUrl': tutor_data.get('image', ''),
+            'imageKey': image_key,
+            'imageUrl': None if image_key else tutor_data.get('image', ''),
+            'imageVariants': get_stored_image_variants(image_key),
             'conversationStyle': tutor_data.get('conversationStyle', 'teacher'),
             'accent': tutor_data.get('accent', 'us'),
             'gender': tutor_data.get('gender', 'female'),
@@ -1058,9 +2702,7 @@ def handle_save_custom_tutor(body):
 
 def handle_get_custom_tutor(body):
     """커스텀 튜터 정보를 DynamoDB에서 조회 (presigned URL 생성)"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
 
     try:
         response = get_table().get_item(
@@ -1069,17 +2711,14 @@ def handle_get_custom_tutor(body):
         item = response.get('Item')
 
         if item:
-            image_url = item.get('imageUrl', '')
+            image_url = item.get('imageUrl') or ''
+            s3_key = get_image_key(item)
 
-            # S3 URL에서 presigned URL 생성 (1시간 유효)
-            if image_url and S3_BUCKET in image_url:
+            # 요청 크기에 맞는 썸네일의 presigned URL (캐시 재사용)
+            if s3_key:
                 try:
-                    s3_key = image_url.split(f'{S3_BUCKET}.s3.amazonaws.com/')[1]
-                    image_url = s3.generate_presigned_url(
-                        'get_object',
-                        Params={'Bucket': S3_BUCKET, 'Key': s3_key},
-                        ExpiresIn=3600
-                    )
+                    s3_key = select_image_variant(s3_key, item.get('imageVariants'), body.get('imageSize'))
+                    image_url = get_presigned_image_url(s3_key)
                 except Exception as presign_error:
                     print(f"Presign URL error: {str(presign_error)}")
 
@@ -1112,9 +2751,7 @@ def handle_get_custom_tutor(body):
 
 def handle_delete_custom_tutor(body):
     """커스텀 튜터 정보 및 S3 이미지 삭제"""
-    device_id = body.get('userId') or body.get('deviceId')
-    if not device_id:
-        return error_response('userId or deviceId is required')
+    device_id = get_user_id(body)
 
     try:
         table = get_table()
@@ -1126,15 +2763,13 @@ def handle_delete_custom_tutor(body):
         item = response.get('Item')
 
         if item:
-            # S3 이미지 삭제 (이미지 URL에서 키 추출)
-            image_url = item.get('imageUrl', '')
-            if image_url and S3_BUCKET in image_url:
+            # S3 이미지 및 썸네일 삭제
+            s3_key = get_image_key(item)
+            if s3_key:
                 try:
-                    s3_key = image_url.split(f'{S3_BUCKET}.s3.amazonaws.com/')[1]
-                    # presigned URL 파라미터 제거
-                    if '?' in s3_key:
-                        s3_key = s3_key.split('?')[0]
                     s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+                    for variant_key in (item.get('imageVariants') or {}).values():
+                        s3.delete_object(Bucket=S3_BUCKET, Key=variant_key)
                 except Exception as s3_error:
                     print(f"S3 delete warning: {str(s3_error)}")
 
@@ -1152,205 +2787,436 @@ def handle_delete_custom_tutor(body):
 
 
 # ============================================
-# Transcribe Streaming 핸들러
+# S3 직접 업로드 (Presigned POST)
 # ============================================
 
-def handle_get_transcribe_url(body):
-    """AWS Transcribe Streaming용 Presigned WebSocket URL 생성"""
-    language = body.get('language', 'en-US')
-    sample_rate = body.get('sampleRate', 16000)
-
-    try:
-        # AWS 자격증명 가져오기 (Lambda 환경에서 자동 제공)
-        session = boto3.Session()
-        credentials = session.get_credentials()
-        access_key = credentials.access_key
-        secret_key = credentials.secret_key
-        session_token = credentials.token  # Lambda는 임시 자격증명 사용
-
-        region = 'us-east-1'
-        service = 'transcribe'
-        host = f'transcribestreaming.{region}.amazonaws.com'
-        endpoint = f'{host}:8443'
-
-        # 현재 시간 (UTC)
-        t = datetime.utcnow()
-        amz_date = t.strftime('%Y%m%dT%H%M%SZ')
-        date_stamp = t.strftime('%Y%m%d')
-
-        # Credential scope
-        credential_scope = f'{date_stamp}/{region}/{service}/aws4_request'
-        algorithm = 'AWS4-HMAC-SHA256'
-
-        # 모든 쿼리 파라미터 (알파벳 순서 - X-Amz-* 포함)
-        # Presigned URL에서는 서명 파라미터도 canonical querystring에 포함
-        all_params = {
-            'X-Amz-Algorithm': algorithm,
-            'X-Amz-Credential': f'{access_key}/{credential_scope}',
-            'X-Amz-Date': amz_date,
-            'X-Amz-Expires': '300',
-            'X-Amz-SignedHeaders': 'host',
-            'language-code': language,
-            'media-encoding': 'pcm',
-            'sample-rate': str(sample_rate),
-        }
-
-        # Security Token 추가 (Lambda 임시 자격증명)
-        if session_token:
-            all_params['X-Amz-Security-Token'] = session_token
-
-        # Canonical Query String (알파벳 순서, 서명 제외)
-        canonical_querystring = '&'.join([
-            f'{quote(k, safe="")}={quote(str(v), safe="")}'
-            for k, v in sorted(all_params.items())
-        ])
+UPLOAD_URL_EXPIRES_IN = 300  # 업로드 정책 유효 시간 (초)
+
+# 업로드 종류별 키 접두사, 허용 Content-Type(→확장자), 최대 크기
+UPLOAD_TARGETS = {
+    'pet_image': {
+        'prefix': 'pets',
+        'contentTypes': {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'},
+        'maxBytes': 10 * 1024 * 1024
+    },
+    'voice_sample': {
+        'prefix': 'voice-samples',
+        'contentTypes': {'audio/webm': 'webm', 'audio/mpeg': 'mp3', 'audio/mp4': 'mp4', 'audio/wav': 'wav'},
+        'maxBytes': 20 * 1024 * 1024
+    },
+    'stt_audio': {
+        'prefix': 'audio',
+        'contentTypes': {'audio/webm': 'webm', 'audio/mpeg': 'mp3', 'audio/mp4': 'mp4', 'audio/wav': 'wav'},
+        'maxBytes': 10 * 1024 * 1024
+    },
+}
 
-        # Canonical Headers
-        canonical_headers = f'host:{endpoint}\n'
-        signed_headers = 'host'
-
-        # Payload Hash (빈 문자열의 SHA256)
-        payload_hash = hashlib.sha256(b'').hexdigest()
-
-        # Canonical Request
-        canonical_request = '\n'.join([
-            'GET',
-            '/stream-transcription-websocket',
-            canonical_querystring,
-            canonical_headers,
-            signed_headers,
-            payload_hash
-        ])
 
-        # String to Sign
-        string_to_sign = '\n'.join([
-            algorithm,
-            amz_date,
-            credential_scope,
-            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
-        ])
+def is_owned_upload_key(s3_key, kind, user_id):
+    """업로드 키가 해당 종류/사용자의 경로인지 확인 (다른 사용자 객체 참조 방지)"""
+    target = UPLOAD_TARGETS[kind]
+    prefix = f"{target['prefix']}/{user_id}/"
+    extension = s3_key.rsplit('.', 1)[-1]
+    return bool(user_id) and s3_key.startswith(prefix) and '..' not in s3_key \
+        and extension in target['contentTypes'].values()
 
-        # Signing Key 생성
-        def sign(key, msg):
-            return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
 
-        k_date = sign(('AWS4' + secret_key).encode('utf-8'), date_stamp)
-        k_region = sign(k_date, region)
-        k_service = sign(k_region, service)
-        k_signing = sign(k_service, 'aws4_request')
+def handle_get_upload_url(body):
+    """S3 직접 업로드용 Presigned POST 발급 (Content-Type/크기 조건 포함)"""
+    user_id = get_user_id(body)
+    kind = body.get('kind')
+    content_type = body.get('contentType', '')
 
-        # Signature 계산
-        signature = hmac.new(k_signing, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    target = UPLOAD_TARGETS.get(kind)
+    if not target:
+        return error_response(f'kind must be one of: {", ".join(UPLOAD_TARGETS)}')
+    # "audio/webm;codecs=opus" 같은 파라미터 제거
+    content_type = content_type.split(';')[0].strip().lower()
+    extension = target['contentTypes'].get(content_type)
+    if not extension:
+        return error_response(f'Unsupported contentType for {kind}: {content_type}')
 
-        # 최종 URL 생성 (서명 추가)
-        signed_url = (
-            f'wss://{endpoint}/stream-transcription-websocket'
-            f'?{canonical_querystring}'
-            f'&X-Amz-Signature={signature}'
+    try:
+        s3_key = f"{target['prefix']}/{user_id}/{int(time.time() * 1000)}.{extension}"
+        post = s3.generate_presigned_post(
+            Bucket=S3_BUCKET,
+            Key=s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, target['maxBytes']]
+            ],
+            ExpiresIn=UPLOAD_URL_EXPIRES_IN
         )
-
         return success_response({
-            'url': signed_url,
-            'region': region,
-            'language': language,
-            'sampleRate': sample_rate,
-            'expiresIn': 300
-        })
+            'success': True,
+            'url': post['url'],
+            'fields': post['fields'],
+            's3Key': s3_key,
+            'maxBytes': target['maxBytes'],
+            'expiresIn': UPLOAD_URL_EXPIRES_IN
+        })
+    except Exception as e:
+        print(f"Get upload URL error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+# ============================================
+# Transcribe Streaming 핸들러
+# ============================================
+
+TRANSCRIBE_URL_EXPIRES_IN = 300  # Transcribe Streaming presigned URL 최대 유효 시간
+TRANSCRIBE_URL_BATCH_MAX = 50    # get_transcribe_urls 요청당 최대 개수
+
+
+def build_transcribe_url(language='en-US', sample_rate=16000, signed_at=None, credentials=None):
+    """Transcribe Streaming WebSocket presigned URL 생성 (서명 키 캐시 사용)"""
+    credentials = credentials or get_aws_credentials()
+    access_key = credentials.access_key
+    session_token = credentials.token  # Lambda는 임시 자격증명 사용
+
+    region = 'us-east-1'
+    service = 'transcribe'
+    host = f'transcribestreaming.{region}.amazonaws.com'
+    endpoint = f'{host}:8443'
+
+    # 현재 시간 (UTC)
+    t = signed_at or datetime.utcnow()
+    amz_date = t.strftime('%Y%m%dT%H%M%SZ')
+    date_stamp = t.strftime('%Y%m%d')
+
+    # Credential scope
+    credential_scope = f'{date_stamp}/{region}/{service}/aws4_request'
+    algorithm = 'AWS4-HMAC-SHA256'
+
+    # 모든 쿼리 파라미터 (알파벳 순서 - X-Amz-* 포함)
+    # Presigned URL에서는 서명 파라미터도 canonical querystring에 포함
+    all_params = {
+        'X-Amz-Algorithm': algorithm,
+        'X-Amz-Credential': f'{access_key}/{credential_scope}',
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(TRANSCRIBE_URL_EXPIRES_IN),
+        'X-Amz-SignedHeaders': 'host',
+        'language-code': language,
+        'media-encoding': 'pcm',
+        'sample-rate': str(sample_rate),
+    }
+
+    # Security Token 추가 (Lambda 임시 자격증명)
+    if session_token:
+        all_params['X-Amz-Security-Token'] = session_token
+
+    # Canonical Query String (알파벳 순서, 서명 제외)
+    canonical_querystring = '&'.join([
+        f'{quote(k, safe="")}={quote(str(v), safe="")}'
+        for k, v in sorted(all_params.items())
+    ])
+
+    # Canonical Headers
+    canonical_headers = f'host:{endpoint}\n'
+    signed_headers = 'host'
+
+    # Payload Hash (빈 문자열의 SHA256)
+    payload_hash = hashlib.sha256(b'').hexdigest()
+
+    # Canonical Request
+    canonical_request = '\n'.join([
+        'GET',
+        '/stream-transcription-websocket',
+        canonical_querystring,
+        canonical_headers,
+        signed_headers,
+        payload_hash
+    ])
+
+    # String to Sign
+    string_to_sign = '\n'.join([
+        algorithm,
+        amz_date,
+        credential_scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+    ])
+
+    # Signing Key (날짜/리전/서비스/액세스 키별 캐시)
+    k_signing = get_signing_key(credentials.secret_key, date_stamp, region, service, access_key)
+
+    # Signature 계산
+    signature = hmac.new(k_signing, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    # 최종 URL 생성 (서명 추가)
+    return (
+        f'wss://{endpoint}/stream-transcription-websocket'
+        f'?{canonical_querystring}'
+        f'&X-Amz-Signature={signature}'
+    )
+
+
+def issue_transcribe_urls(specs):
+    """여러 Transcribe URL 일괄 발급 (예약 통화 직전 알림 발송 등)
+
+    specs: [{'language': 'en-US', 'sampleRate': 16000}, ...]
+    자격증명 조회와 서명 키 도출은 한 번만 수행. URL은 발급 시점부터 300초 유효.
+    """
+    credentials = get_aws_credentials()
+    signed_at = datetime.utcnow()
+    expires_at = int(signed_at.replace(tzinfo=timezone.utc).timestamp()) + TRANSCRIBE_URL_EXPIRES_IN
+    return [
+        {
+            'url': build_transcribe_url(spec.get('language', 'en-US'), spec.get('sampleRate', 16000), signed_at, credentials),
+            'language': spec.get('language', 'en-US'),
+            'sampleRate': spec.get('sampleRate', 16000),
+            'expiresAt': expires_at
+        }
+        for spec in specs
+    ]
+
+
+def handle_get_transcribe_url(body):
+    """AWS Transcribe Streaming용 Presigned WebSocket URL 생성"""
+    language = body.get('language', 'en-US')
+    sample_rate = body.get('sampleRate', 16000)
+
+    try:
+        return success_response({
+            'url': build_transcribe_url(language, sample_rate),
+            'region': 'us-east-1',
+            'language': language,
+            'sampleRate': sample_rate,
+            'expiresIn': TRANSCRIBE_URL_EXPIRES_IN
+        })
 
     except Exception as e:
         print(f"Get transcribe URL error: {str(e)}")
         return error_response(str(e), 500)
 
 
+def handle_get_transcribe_urls(body):
+    """Transcribe Streaming URL 일괄 발급"""
+    specs = body.get('requests', [])
+    if not isinstance(specs, list) or not specs:
+        return error_response('requests must be a non-empty list')
+    if len(specs) > TRANSCRIBE_URL_BATCH_MAX:
+        return error_response(f'requests cannot exceed {TRANSCRIBE_URL_BATCH_MAX} items')
+
+    try:
+        return success_response({
+            'urls': issue_transcribe_urls(specs),
+            'region': 'us-east-1',
+            'expiresIn': TRANSCRIBE_URL_EXPIRES_IN
+        })
+    except Exception as e:
+        print(f"Get transcribe URLs error: {str(e)}")
+        return error_response(str(e), 500)
+
+
 # ============================================
 # 음성 클로닝 핸들러 (ElevenLabs)
 # ============================================
 
+VOICE_SAMPLE_FFMPEG_PATH = os.environ.get('FFMPEG_PATH', '/opt/bin/ffmpeg')  # ffmpeg Lambda 레이어
+VOICE_SAMPLE_RATE = 44100
+VOICE_SAMPLE_SILENCE_DB = -45      # 이 값보다 조용한 구간을 무음으로 간주
+VOICE_SAMPLE_FFMPEG_TIMEOUT = 30
+MULTIPART_CHUNK_SIZE = 64 * 1024
+
+# 확장자 → 오디오 Content-Type (업로드 원본 그대로 보낼 때 사용)
+AUDIO_CONTENT_TYPES = {'webm': 'audio/webm', 'mp3': 'audio/mpeg', 'mp4': 'audio/mp4', 'wav': 'audio/wav'}
+
+
+def preprocess_voice_sample(s3_key):
+    """ffmpeg로 앞뒤/긴 무음 제거, 모노 44.1kHz MP3로 변환. 반환: 변환 파일 경로 (불가 시 None)"""
+    if not os.path.exists(VOICE_SAMPLE_FFMPEG_PATH):
+        return None
+
+    source_fd, source_path = tempfile.mkstemp(dir='/tmp', suffix='.' + s3_key.rsplit('.', 1)[-1])
+    output_fd, output_path = tempfile.mkstemp(dir='/tmp', suffix='.mp3')
+    os.close(source_fd)
+    os.close(output_fd)
+    try:
+        # 디스크로 스트리밍 다운로드 (메모리에 전체 버퍼를 만들지 않음)
+        s3.download_file(S3_BUCKET, s3_key, source_path)
+        silence = f'{VOICE_SAMPLE_SILENCE_DB}dB'
+        subprocess.run(
+            [
+                VOICE_SAMPLE_FFMPEG_PATH, '-hide_banner', '-loglevel', 'error', '-y', '-i', source_path,
+                '-af', f'silenceremove=start_periods=1:start_threshold={silence}'
+                       f':stop_periods=-1:stop_duration=1:stop_threshold={silence}',
+                '-ac', '1', '-ar', str(VOICE_SAMPLE_RATE), '-codec:a', 'libmp3lame', '-b:a', '128k',
+                output_path
+            ],
+            check=True, capture_output=True, timeout=VOICE_SAMPLE_FFMPEG_TIMEOUT
+        )
+        if os.path.getsize(output_path) == 0:
+            raise ValueError('empty output')
+        return output_path
+    except Exception as e:
+        print(f"[CloneVoice] Preprocess skipped: {str(e)}")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+
+
+def open_voice_sample(s3_key):
+    """클로닝 업로드용 샘플 스트림 (전처리 결과 우선, 실패 시 S3 원본 스트림)"""
+    processed_path = preprocess_voice_sample(s3_key)
+    if processed_path:
+        return {
+            'stream': open(processed_path, 'rb'),
+            'length': os.path.getsize(processed_path),
+            'filename': 'voice_sample.mp3',
+            'contentType': 'audio/mpeg',
+            'processed': True,
+            'path': processed_path
+        }
+
+    extension = s3_key.rsplit('.', 1)[-1]
+    obj = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
+    return {
+        'stream': obj['Body'],
+        'length': obj['ContentLength'],
+        'filename': f'voice_sample.{extension}',
+        'contentType': AUDIO_CONTENT_TYPES.get(extension, 'application/octet-stream'),
+        'processed': False,
+        'path': None
+    }
+
+
+def close_voice_sample(sample):
+    """샘플 스트림 닫기 및 임시 파일 삭제"""
+    sample['stream'].close()
+    if sample['path'] and os.path.exists(sample['path']):
+        os.remove(sample['path'])
+
+
+def build_multipart_parts(boundary, fields, file_field, filename, content_type):
+    """multipart/form-data 본문에서 파일 앞/뒤 부분 생성. 반환: (head bytes, tail bytes)"""
+    body_parts = []
+    for name, value in fields.items():
+        body_parts.append(f'--{boundary}')
+        body_parts.append(f'Content-Disposition: form-data; name="{name}"')
+        body_parts.append('')
+        body_parts.append(str(value))
+
+    body_parts.append(f'--{boundary}')
+    body_parts.append(f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"')
+    body_parts.append(f'Content-Type: {content_type}')
+    body_parts.append('')
+
+    head = ('\r\n'.join(body_parts) + '\r\n').encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return head, tail
+
+
+def iter_multipart_body(head, stream, tail):
+    """multipart 본문을 청크 단위로 생성 (파일은 stream에서 순차적으로 읽음)"""
+    yield head
+    while True:
+        chunk = stream.read(MULTIPART_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+    yield tail
+
+
 def handle_clone_voice(body):
     """사용자 음성을 ElevenLabs에 업로드하여 음성 클로닝"""
-    validation_error = validate_required(body, 'userId', 'audio', 'voiceName')
-    if validation_error:
-        return validation_error
-
-    user_id = body.get('userId')
+    user_id = body['userId']
     audio_base64 = body.get('audio', '')
+    uploaded_key = body.get('s3Key')
     voice_name = body.get('voiceName', 'Custom Voice')
 
+    if not audio_base64 and not uploaded_key:
+        return error_response('audio or s3Key is required')
+    if uploaded_key and not is_owned_upload_key(uploaded_key, 'voice_sample', user_id):
+        return error_response('Invalid s3Key', 403)
+
     try:
         api_key = get_elevenlabs_api_key()
         if not api_key:
             raise Exception("ElevenLabs API key not found")
 
-        # Base64 오디오 디코딩
-        if ',' in audio_base64:
-            audio_base64 = audio_base64.split(',')[1]
-
-        audio_data = base64.b64decode(audio_base64)
-
-        print(f"[CloneVoice] Audio size: {len(audio_data)} bytes, user: {user_id[:8]}")
-
-        # 오디오를 임시 S3에 저장
         now = get_now()
-        s3_key = f"voice-samples/{user_id}/{int(time.time() * 1000)}.webm"
 
-        s3.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=audio_data,
-            ContentType='audio/webm'
-        )
+        if uploaded_key:
+            # get_upload_url로 업로드된 샘플 사용
+            s3_key = uploaded_key
+        else:
+            # Base64 오디오 디코딩
+            if ',' in audio_base64:
+                audio_base64 = audio_base64.split(',')[1]
+
+            # 오디오를 임시 S3에 저장 (이후 업로드 방식과 같은 경로로 처리)
+            s3_key = f"voice-samples/{user_id}/{int(time.time() * 1000)}.webm"
+
+            s3.put_object(
+                Bucket=S3_BUCKET,
+                Key=s3_key,
+                Body=base64.b64decode(audio_base64),
+                ContentType='audio/webm'
+            )
+
+        # 같은 샘플로 이미 만든 음성이 있으면 재사용 (ElevenLabs 호출/슬롯 절약)
+        content_hash = get_voice_sample_hash(s3_key)
+        current_voice = get_table().get_item(Key={'PK': f'USER#{user_id}', 'SK': 'CUSTOM_VOICE'}).get('Item')
+        if current_voice and current_voice.get('voiceId') and current_voice.get('contentHash') == content_hash:
+            print(f"[CloneVoice] Reusing voice {current_voice['voiceId']} for identical sample")
+            if current_voice.get('s3Key') != s3_key:
+                s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+            return success_response({
+                'success': True,
+                'voiceId': current_voice['voiceId'],
+                'voiceName': current_voice.get('voiceName', voice_name),
+                'createdAt': current_voice.get('createdAt'),
+                'reused': True
+            })
 
-        # ElevenLabs Add Voice API 호출
-        # 올바른 multipart/form-data 형식
-        import uuid
-        boundary = f'----WebKitFormBoundary{uuid.uuid4().hex[:16]}'
+        # 계정 음성 슬롯이 거의 찼으면 가장 오래 사용하지 않은 음성부터 정리
+        # (교체될 본인 음성은 클로닝 성공 후 해제되므로 여유분으로 계산)
+        replacing = bool(current_voice and current_voice.get('voiceId'))
+        ensure_voice_slot_available(exclude_user_id=user_id, pending_release=int(replacing))
 
         # 고유한 음성 이름 생성
         unique_voice_name = f'{voice_name}_{user_id[:8]}_{int(time.time())}'
 
-        # multipart body 구성
-        body_parts = []
-
-        # name 필드
-        body_parts.append(f'--{boundary}')
-        body_parts.append('Content-Disposition: form-data; name="name"')
-        body_parts.append('')
-        body_parts.append(unique_voice_name)
-
-        # files 필드 (바이너리 데이터는 별도 처리)
-        body_parts.append(f'--{boundary}')
-        body_parts.append('Content-Disposition: form-data; name="files"; filename="voice_sample.mp3"')
-        body_parts.append('Content-Type: audio/mpeg')
-        body_parts.append('')
-
-        # 텍스트 파트를 CRLF로 연결
-        text_part = '\r\n'.join(body_parts) + '\r\n'
-
-        # 바이너리 데이터와 종료 boundary
-        end_part = f'\r\n--{boundary}--\r\n'
+        # 전처리된(또는 원본) 샘플을 메모리에 올리지 않고 스트리밍 업로드
+        sample = open_voice_sample(s3_key)
+        try:
+            print(f"[CloneVoice] Sample: {sample['length']} bytes, {sample['contentType']}, "
+                  f"processed={sample['processed']}, user: {user_id[:8]}")
 
-        # 전체 body 조합
-        full_body = text_part.encode('utf-8') + audio_data + end_part.encode('utf-8')
+            # ElevenLabs Add Voice API 호출 (multipart/form-data)
+            boundary = f'----WebKitFormBoundary{uuid.uuid4().hex[:16]}'
+            head, tail = build_multipart_parts(
+                boundary, {'name': unique_voice_name}, 'files', sample['filename'], sample['contentType']
+            )
 
-        url = "https://api.elevenlabs.io/v1/voices/add"
-        headers = {
-            "Accept": "application/json",
-            "xi-api-key": api_key,
-            "Content-Type": f"multipart/form-data; boundary={boundary}"
-        }
+            url = f"{ELEVENLABS_API_BASE}/v1/voices/add"
+            headers = {
+                "Accept": "application/json",
+                "xi-api-key": api_key,
+                "Content-Type": f"multipart/form-data; boundary={boundary}",
+                "Content-Length": str(len(head) + sample['length'] + len(tail))
+            }
 
-        req = urllib.request.Request(url, data=full_body, headers=headers, method='POST')
+            req = urllib.request.Request(
+                url, data=iter_multipart_body(head, sample['stream'], tail), headers=headers, method='POST'
+            )
 
-        with urllib.request.urlopen(req, timeout=60) as response:
-            result = json.loads(response.read().decode('utf-8'))
-            voice_id = result.get('voice_id')
+            with urllib.request.urlopen(req, timeout=get_call_timeout('elevenlabs', 60)) as response:
+                result = json.loads(response.read().decode('utf-8'))
+                voice_id = result.get('voice_id')
+        finally:
+            close_voice_sample(sample)
 
         print(f"[CloneVoice] Success! Voice ID: {voice_id}")
 
         if not voice_id:
             raise Exception("Failed to create voice clone")
 
-        # DynamoDB에 사용자 음성 ID 저장
+        # DynamoDB에 사용자 음성 ID 저장 + 음성 레지스트리 등록
         get_table().put_item(Item={
             'PK': f'USER#{user_id}',
             'SK': 'CUSTOM_VOICE',
@@ -1359,10 +3225,18 @@ def handle_clone_voice(body):
             'voiceId': voice_id,
             'voiceName': voice_name,
             's3Key': s3_key,
+            'contentHash': content_hash,
             'createdAt': now,
             'updatedAt': now,
             'ttl': get_ttl()
         })
+        register_voice(voice_id, user_id, s3_key, content_hash)
+
+        # 이전 음성은 교체되었으므로 ElevenLabs/S3에서 정리
+        if current_voice and current_voice.get('voiceId'):
+            retire_voice(current_voice['voiceId'], current_voice.get('s3Key'))
+            unlink_voice(user_id, current_voice['voiceId'], replacement_id=voice_id)
+        delete_orphan_voice_samples(user_id, keep_key=s3_key)
 
         return success_response({
             'success': True,
@@ -1380,8 +3254,54 @@ def handle_clone_voice(body):
         return error_response(str(e), 500)
 
 
+def synthesize_custom_voice(text, voice_id):
+    """클로닝된 음성으로 ElevenLabs TTS 호출 → MP3 바이트"""
+    api_key = get_elevenlabs_api_key()
+    if not api_key:
+        raise Exception("ElevenLabs API key not found")
+
+    # ElevenLabs Text-to-Speech API 호출
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}?output_format=mp3_44100_128"
+    headers = {
+        "Accept": "audio/mpeg",
+        "Content-Type": "application/json",
+        "xi-api-key": api_key
+    }
+    data = json.dumps({
+        "text": text,
+        "model_id": "eleven_multilingual_v2",
+        "voice_settings": {
+            "stability": 0.5,
+            "similarity_boost": 0.8,
+            "style": 0.5,
+            "use_speaker_boost": True
+        }
+    }).encode('utf-8')
+
+    req = urllib.request.Request(url, data=data, headers=headers, method='POST')
+
+    with urllib.request.urlopen(req, timeout=get_call_timeout('elevenlabs')) as response:
+        audio_data = response.read()
+
+    record_usage(elevenlabsCharacters=len(text))
+    touch_voice(voice_id)
+    return audio_data
+
+
+def is_voice_not_found(error):
+    """ElevenLabs 응답이 음성 없음(삭제/한도 정리된 음성)인지"""
+    if not isinstance(error, urllib.error.HTTPError):
+        return False
+    if error.code == 404:
+        return True
+    try:
+        return b'voice_not_found' in (error.read() or b'')
+    except Exception:
+        return False
+
+
 def handle_tts_custom_voice(body):
-    """클로닝된 음성으로 TTS 생성 (ElevenLabs)"""
+    """클로닝된 음성으로 TTS 생성 (ElevenLabs, 음성이 삭제되었으면 기본 Polly 음성)"""
     text = body.get('text', '')
     voice_id = body.get('voiceId', '')
 
@@ -1391,33 +3311,7 @@ def handle_tts_custom_voice(body):
         return error_response('No voice ID provided')
 
     try:
-        api_key = get_elevenlabs_api_key()
-        if not api_key:
-            raise Exception("ElevenLabs API key not found")
-
-        # ElevenLabs Text-to-Speech API 호출
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}?output_format=mp3_44100_128"
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": api_key
-        }
-        data = json.dumps({
-            "text": text,
-            "model_id": "eleven_multilingual_v2",
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.8,
-                "style": 0.5,
-                "use_speaker_boost": True
-            }
-        }).encode('utf-8')
-
-        req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-
-        with urllib.request.urlopen(req, timeout=30) as response:
-            audio_data = response.read()
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        audio_base64 = base64.b64encode(synthesize_custom_voice(text, voice_id)).decode('utf-8')
 
         return success_response({
             'audio': audio_base64,
@@ -1426,8 +3320,389 @@ def handle_tts_custom_voice(body):
             'engine': 'elevenlabs-custom'
         })
 
+    except urllib.error.HTTPError as e:
+        if not is_voice_not_found(e):
+            print(f"Custom voice TTS error: {str(e)}")
+            invalidate_elevenlabs_api_key(e)
+            return error_response(str(e), 500)
+        # 한도 정리/교체로 삭제된 음성 → 남은 참조를 정리하고 기본 음성으로 응답
+        print(f"[Voice] {voice_id} not found, falling back to Polly")
+        user_id = get_user_id(body)
+        if user_id:
+            try:
+                unlink_voice(user_id, voice_id)
+            except Exception as unlink_error:
+                print(f"[Voice] Unlink {voice_id} failed: {str(unlink_error)}")
+        _, polly_voice_id, engine = select_tts_voices(body.get('settings') or {})
+        try:
+            audio = synthesize_polly(text, polly_voice_id, engine)
+        except Exception as polly_error:
+            print(f"Custom voice fallback error: {str(polly_error)}")
+            return error_response(str(polly_error), 500)
+        return success_response({
+            'audio': base64.b64encode(audio).decode('utf-8'),
+            'contentType': 'audio/mpeg',
+            'voice': polly_voice_id,
+            'engine': 'polly-fallback',
+            'voiceUnavailable': True
+        })
     except Exception as e:
         print(f"Custom voice TTS error: {str(e)}")
+        invalidate_elevenlabs_api_key(e)
+        return error_response(str(e), 500)
+
+
+# ============================================
+# 음성 클론 수명 관리 (재사용 / 교체 / 슬롯 정리)
+# ============================================
+
+VOICE_QUOTA_HEADROOM = 2              # 계정 음성 한도까지 남겨둘 여유 슬롯
+VOICE_TOUCH_INTERVAL_SECONDS = 3600   # lastUsedAt 갱신 최소 간격 (쓰기 절약)
+VOICE_SAMPLE_GC_MIN_AGE_DAYS = 1      # 이보다 최근 샘플은 업로드 중일 수 있어 정리하지 않음
+
+# 컨테이너 내 마지막 lastUsedAt 갱신 시각 (voiceId → epoch)
+VOICE_TOUCHED_AT = {}
+
+
+def elevenlabs_request(method, path, timeout=None):
+    """ElevenLabs JSON API 호출 (빈 응답이면 {}, GET/DELETE는 일시 오류 시 재시도)"""
+    api_key = get_elevenlabs_api_key()
+    if not api_key:
+        raise Exception("ElevenLabs API key not found")
+
+    def send():
+        req = urllib.request.Request(
+            f'{ELEVENLABS_API_BASE}{path}',
+            headers={"Accept": "application/json", "xi-api-key": api_key},
+            method=method
+        )
+        with urllib.request.urlopen(req, timeout=get_call_timeout('elevenlabs', timeout)) as response:
+            return response.read()
+
+    try:
+        raw = call_with_retry('elevenlabs', send) if method in ('GET', 'DELETE') else send()
+    except urllib.error.HTTPError as e:
+        invalidate_elevenlabs_api_key(e)
+        raise
+    return json.loads(raw) if raw else {}
+
+
+def get_voice_sample_hash(s3_key):
+    """샘플 내용 해시 (단일 PUT/POST 업로드의 ETag = 내용 MD5, 다운로드 불필요)"""
+    return s3.head_object(Bucket=S3_BUCKET, Key=s3_key)['ETag'].strip('"')
+
+
+def register_voice(voice_id, user_id, s3_key, content_hash):
+    """음성 레지스트리 등록 (GSI1: ELEVENLABS_VOICE / lastUsedAt 순으로 LRU 조회)"""
+    now = get_now()
+    get_table().put_item(Item={
+        'PK': f'VOICE#{voice_id}',
+        'SK': 'VOICE',
+        'GSI1PK': 'ELEVENLABS_VOICE',
+        'GSI1SK': now,
+        'type': 'VOICE_REGISTRY',
+        'voiceId': voice_id,
+        'userId': user_id,
+        's3Key': s3_key,
+        'contentHash': content_hash,
+        'lastUsedAt': now,
+        'createdAt': now
+    })
+    VOICE_TOUCHED_AT[voice_id] = time.time()
+
+
+def touch_voice(voice_id):
+    """음성 사용 시각 갱신 (컨테이너당 VOICE_TOUCH_INTERVAL_SECONDS마다 최대 1회)"""
+    if time.time() - VOICE_TOUCHED_AT.get(voice_id, 0) < VOICE_TOUCH_INTERVAL_SECONDS:
+        return
+    VOICE_TOUCHED_AT[voice_id] = time.time()
+    try:
+        now = get_now()
+        get_table().update_item(
+            Key={'PK': f'VOICE#{voice_id}', 'SK': 'VOICE'},
+            UpdateExpression='SET lastUsedAt = :now, GSI1SK = :now',
+            ConditionExpression='attribute_exists(PK)',
+            ExpressionAttributeValues={':now': now}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"[Voice] Touch error: {str(e)}")
+
+
+def retire_voice(voice_id, s3_key=None):
+    """ElevenLabs 음성, 샘플, 레지스트리 삭제 (이미 없는 음성은 무시)"""
+    try:
+        elevenlabs_request('DELETE', f'/v1/voices/{voice_id}')
+    except urllib.request.HTTPError as e:
+        if e.code != 404:
+            raise
+    if s3_key:
+        s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+    get_table().delete_item(Key={'PK': f'VOICE#{voice_id}', 'SK': 'VOICE'})
+    VOICE_TOUCHED_AT.pop(voice_id, None)
+    print(f"[Voice] Retired {voice_id}")
+
+
+def unlink_voice(user_id, voice_id, replacement_id=None):
+    """삭제된 음성을 가리키는 사용자 항목 정리 (커스텀 음성 + 커스텀 튜터 voiceId)
+
+    replacement_id가 있으면 커스텀 튜터를 새 음성으로 옮기고, 없으면(한도 정리) voiceId 제거.
+    이미 다른 음성을 가리키는 항목은 건드리지 않음.
+    """
+    table = get_table()
+    condition = {'ConditionExpression': 'voiceId = :vid'}
+    updates = []
+    if replacement_id:
+        updates.append(({'PK': f'DEVICE#{user_id}', 'SK': 'CUSTOM_TUTOR'},
+                        'SET voiceId = :new, updatedAt = :now', {':new': replacement_id}))
+    else:
+        updates += [
+            ({'PK': f'USER#{user_id}', 'SK': 'CUSTOM_VOICE'}, 'REMOVE voiceId SET evictedAt = :now', {}),
+            ({'PK': f'DEVICE#{user_id}', 'SK': 'CUSTOM_TUTOR'}, 'REMOVE voiceId SET updatedAt = :now', {}),
+        ]
+    for key, expression, values in updates:
+        try:
+            table.update_item(
+                Key=key, UpdateExpression=expression, **condition,
+                ExpressionAttributeValues={':now': get_now(), ':vid': voice_id, **values}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+
+def ensure_voice_slot_available(exclude_user_id=None, pending_release=0):
+    """계정 음성 한도 근접 시 가장 오래 사용하지 않은 음성부터 제거
+
+    pending_release: 새 음성 생성 후 곧 해제될 슬롯 수 (교체 대상 음성)
+    """
+    try:
+        subscription = elevenlabs_request('GET', '/v1/user/subscription')
+    except Exception as e:
+        print(f"[Voice] Subscription lookup failed: {str(e)}")
+        return
+
+    voice_limit = int(subscription.get('voice_limit', 0))
+    used = int(subscription.get('voice_slots_used', 0))
+    to_free = used - pending_release - (voice_limit - VOICE_QUOTA_HEADROOM)
+    if not voice_limit or to_free <= 0:
+        return
+
+    table = get_table()
+    response = table.query(
+        IndexName='GSI1',
+        KeyConditionExpression='GSI1PK = :pk',
+        ExpressionAttributeValues={':pk': 'ELEVENLABS_VOICE'},
+        ScanIndexForward=True,  # lastUsedAt 오래된 순
+        Limit=to_free + 5
+    )
+    candidates = [v for v in response.get('Items', []) if v.get('userId') != exclude_user_id][:to_free]
+
+    for voice in candidates:
+        try:
+            retire_voice(voice['voiceId'], voice.get('s3Key'))
+            # 소유자의 커스텀 음성/튜터 연결 해제 (다음 TTS는 기본 음성 사용)
+            unlink_voice(voice['userId'], voice['voiceId'])
+        except Exception as e:
+            print(f"[Voice] Evict {voice.get('voiceId')} failed: {str(e)}")
+
+    print(f"[Voice] Slots used {used}/{voice_limit}, evicted {len(candidates)}")
+
+
+def delete_orphan_voice_samples(user_id, keep_key=None):
+    """사용자의 현재 샘플 외 오래된 샘플 삭제 (실패/중단된 클로닝 잔여물, 업로드 중인 최근 샘플은 유지)"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=VOICE_SAMPLE_GC_MIN_AGE_DAYS)
+    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=f'voice-samples/{user_id}/')
+    orphans = [
+        {'Key': obj['Key']} for obj in response.get('Contents', [])
+        if obj['Key'] != keep_key and obj['LastModified'] < cutoff
+    ]
+    if orphans:
+        s3.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': orphans, 'Quiet': True})
+    return len(orphans)
+
+
+def run_voice_sample_gc(event=None):
+    """예약 작업: 레지스트리에서 참조하지 않는 오래된 voice-samples/ 객체 삭제"""
+    table = get_table()
+    referenced = set()
+    query_params = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :pk',
+        'ExpressionAttributeValues': {':pk': 'ELEVENLABS_VOICE'}
+    }
+    while True:
+        response = table.query(**query_params)
+        referenced.update(v['s3Key'] for v in response.get('Items', []) if v.get('s3Key'))
+        if not response.get('LastEvaluatedKey'):
+            break
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=VOICE_SAMPLE_GC_MIN_AGE_DAYS)
+    deleted = 0
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=S3_BUCKET, Prefix='voice-samples/'):
+        orphans = [
+            {'Key': obj['Key']} for obj in page.get('Contents', [])
+            if obj['Key'] not in referenced and obj['LastModified'] < cutoff
+        ]
+        if orphans:
+            s3.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': orphans, 'Quiet': True})
+            deleted += len(orphans)
+
+    print(f"[Voice] Sample GC: referenced={len(referenced)}, deleted={deleted}")
+    return {'referenced': len(referenced), 'deleted': deleted}
+
+
+# ============================================
+# 첫 인사 사전 생성 (예약 전화 수신 즉시 재생)
+# ============================================
+
+GREETING_TTL_SECONDS = 24 * 3600     # 사전 생성한 인사 유효 시간 (예약 시각 기준)
+GREETING_URL_EXPIRES_IN = 900        # 인사 오디오 presigned URL 유효 시간
+# 인사 내용/음성에 영향을 주는 설정 (바뀌면 사전 생성분을 쓰지 않음)
+GREETING_SETTING_KEYS = ('accent', 'gender', 'level', 'topic', 'conversationStyle', 'voiceId', 'tutorId')
+
+
+def load_call_settings(user_id):
+    """저장된 튜터 설정 (커스텀 튜터 선택 시 커스텀 튜터 음성/스타일 반영)"""
+    table = get_table()
+    item = table.get_item(Key={'PK': f'DEVICE#{user_id}', 'SK': 'SETTINGS'}).get('Item') or {}
+    settings = dict(item.get('settings') or {})
+
+    if settings.get('tutorId') == 'custom-tutor':
+        tutor = table.get_item(Key={'PK': f'DEVICE#{user_id}', 'SK': 'CUSTOM_TUTOR'}).get('Item') or {}
+        for key in ('conversationStyle', 'accent', 'gender', 'voiceId'):
+            if tutor.get(key):
+                settings[key] = tutor[key]
+    return settings
+
+
+def get_greeting_fingerprint(settings):
+    """인사 관련 설정 해시 (사전 생성분과 통화 시점 설정 비교용)"""
+    relevant = {key: settings.get(key) for key in GREETING_SETTING_KEYS if settings.get(key)}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def generate_greeting(user_id, settings):
+    """첫 인사 문장 + 번역 + 음성 생성 (통화 화면의 첫 턴과 같은 프롬프트 사용)"""
+    response = bedrock.invoke_model(
+        modelId=get_config('claudeModel'),
+        contentType='application/json',
+        accept='application/json',
+        body=json.dumps({
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': 300,
+            'system': build_chat_system_prompt(settings, user_id),
+            'messages': [{'role': 'user', 'content': CHAT_OPENING_MESSAGE}]
+        })
+    )
+    result = json.loads(response['body'].read())
+    record_bedrock_usage(result.get('usage'))
+    message = result['content'][0]['text']
+
+    # 번역과 음성 합성은 서로 독립적이므로 동시에 진행
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        translation_future = executor.submit(bind_request_context(translate_with_cache), message, 'en', 'ko')
+
+        voice_id, polly_voice_id, engine = select_tts_voices(settings)
+        audio, tts_engine = None, None
+        if settings.get('voiceId'):
+            try:
+                audio, tts_engine = synthesize_custom_voice(message, settings['voiceId']), 'elevenlabs-custom'
+            except Exception as e:
+                print(f"[Greeting] Custom voice failed: {str(e)}, using default voice")
+        if audio is None:
+            result = route_tts(
+                lambda: synthesize_elevenlabs(message, voice_id),
+                lambda: synthesize_polly(message, polly_voice_id, engine)
+            )
+            audio = result['audio']
+            tts_engine = 'elevenlabs' if result['provider'] == 'elevenlabs' else 'polly-fallback'
+
+        try:
+            translation = translation_future.result()[0]
+        except Exception as e:
+            print(f"[Greeting] Translation failed: {str(e)}")
+            translation = ''
+
+    return {'message': message, 'translation': translation, 'audio': audio, 'engine': tts_engine}
+
+
+def handle_prepare_greeting(body):
+    """예약 전화용 첫 인사 사전 생성 (S3 오디오 + DynamoDB 저장)
+
+    settings를 보내지 않으면 서버에 저장된 설정/커스텀 튜터를 사용.
+    scheduledFor(epoch ms)를 주면 그 시각 기준으로 유효 시간을 계산.
+    persist=false면 바로 쓸 인사이므로 get_greeting용으로 저장하지 않음.
+    """
+    user_id = get_user_id(body)
+
+    try:
+        settings = body.get('settings') or load_call_settings(user_id)
+        fingerprint = get_greeting_fingerprint(settings)
+        scheduled_for = int(body.get('scheduledFor') or 0) // 1000
+        expires_at = max(int(time.time()), scheduled_for) + GREETING_TTL_SECONDS
+
+        greeting = generate_greeting(user_id, settings)
+        audio_key = f'greetings/{user_id}/{fingerprint}.mp3'
+        s3.put_object(Bucket=S3_BUCKET, Key=audio_key, Body=greeting['audio'], ContentType='audio/mpeg')
+
+        if body.get('persist', True):
+            get_table().put_item(Item={
+                'PK': f'USER#{user_id}',
+                'SK': f'GREETING#{fingerprint}',
+                'type': 'GREETING',
+                'message': greeting['message'],
+                'translation': greeting['translation'],
+                'audioKey': audio_key,
+                'engine': greeting['engine'],
+                'createdAt': get_now(),
+                'ttl': expires_at
+            })
+        print(f"[Greeting] Prepared for {user_id[:8]} ({fingerprint}), engine={greeting['engine']}")
+
+        return success_response({
+            'success': True,
+            'greeting': {
+                'message': greeting['message'],
+                'translation': greeting['translation'],
+                'audioUrl': presign_s3_get_url(audio_key, datetime.now(timezone.utc), GREETING_URL_EXPIRES_IN),
+                'engine': greeting['engine'],
+                'fingerprint': fingerprint
+            },
+            'expiresAt': expires_at
+        })
+    except Exception as e:
+        print(f"Prepare greeting error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+def handle_get_greeting(body):
+    """사전 생성된 첫 인사 조회 (한 번 사용하면 삭제, 설정이 바뀌었으면 없음)"""
+    user_id = get_user_id(body)
+
+    try:
+        settings = body.get('settings') or load_call_settings(user_id)
+        fingerprint = get_greeting_fingerprint(settings)
+        key = {'PK': f'USER#{user_id}', 'SK': f'GREETING#{fingerprint}'}
+
+        # 조회와 동시에 삭제 (같은 인사를 두 번 재생하지 않도록)
+        item = get_table().delete_item(Key=key, ReturnValues='ALL_OLD').get('Attributes')
+        if not item or int(item.get('ttl', 0)) < int(time.time()):
+            return success_response({'success': True, 'greeting': None})
+
+        return success_response({
+            'success': True,
+            'greeting': {
+                'message': item['message'],
+                'translation': item.get('translation', ''),
+                'audioUrl': presign_s3_get_url(item['audioKey'], datetime.now(timezone.utc), GREETING_URL_EXPIRES_IN),
+                'engine': item.get('engine'),
+                'fingerprint': fingerprint
+            }
+        })
+    except Exception as e:
+        print(f"Get greeting error: {str(e)}")
         return error_response(str(e), 500)
 
 
@@ -1461,39 +3736,11 @@ Return ONLY valid JSON, no other text."""
 
 def handle_save_user_memory(body):
     """사용자 메모리 저장 (기존 메모리와 병합)"""
-    validation_error = validate_required(body, 'userId')
-    if validation_error:
-        return validation_error
-
-    user_id = body.get('userId')
+    user_id = body['userId']
     new_memory = body.get('memory', {})
 
     try:
-        table = get_table()
-        now = get_now()
-
-        # 기존 메모리 조회
-        response = table.get_item(
-            Key={'PK': f'USER#{user_id}', 'SK': 'MEMORY'}
-        )
-        existing_item = response.get('Item')
-        existing_memory = existing_item.get('memory', {}) if existing_item else {}
-
-        # 메모리 병합 (새 정보로 업데이트, 리스트는 합치기)
-        merged_memory = merge_memory(existing_memory, new_memory)
-
-        # 저장
-        table.put_item(Item={
-            'PK': f'USER#{user_id}',
-            'SK': 'MEMORY',
-            'type': 'USER_MEMORY',
-            'userId': user_id,
-            'memory': merged_memory,
-            'updatedAt': now,
-            'ttl': get_ttl() + (365 * 24 * 60 * 60)  # 1년 추가 (총 약 1.25년)
-        })
-
-        print(f"[Memory] Saved for user {user_id[:8]}: {list(merged_memory.keys())}")
+        merged_memory, now = save_merged_memory(user_id, new_memory)
 
         return success_response({
             'success': True,
@@ -1508,11 +3755,7 @@ def handle_save_user_memory(body):
 
 def handle_get_user_memory(body):
     """사용자 메모리 조회"""
-    validation_error = validate_required(body, 'userId')
-    if validation_error:
-        return validation_error
-
-    user_id = body.get('userId')
+    user_id = body['userId']
 
     try:
         response = get_table().get_item(
@@ -1539,89 +3782,383 @@ def handle_get_user_memory(body):
 
 
 def handle_extract_user_info(body):
-    """대화에서 사용자 정보 추출 (AI 사용)"""
-    validation_error = validate_required(body, 'userId', 'messages')
-    if validation_error:
-        return validation_error
+    """대화에서 사용자 정보 추출 작업을 큐에 등록 (비동기)
 
-    user_id = body.get('userId')
+    sessionId가 있으면 세션 워터마크 이후의 새 메시지만 처리하며, 작업은
+    MEMORY_EXTRACTION_DEBOUNCE_SECONDS 지연 후 실행되어 연속 요청이 한 번으로 합쳐짐.
+    큐가 설정되지 않은 환경에서는 로컬 큐로 즉시 처리하고 추출 결과를 반환.
+    """
+    user_id = body['userId']
+    session_id = body.get('sessionId')
     messages = body.get('messages', [])
 
-    if len(messages) < 2:
+    if not session_id and len(messages) < 2:
         return success_response({
             'success': True,
             'extracted': {},
             'message': 'Not enough conversation to extract info'
         })
 
+    # 세션 기반 작업은 DynamoDB에서 메시지를 다시 읽으므로 본문에 싣지 않음
+    job = {'userId': user_id, 'sessionId': session_id} if session_id else {'userId': user_id, 'messages': messages}
+
     try:
-        # 대화 내용 포맷팅
-        conversation_text = format_conversation_for_analysis(messages)
+        enqueue_memory_job(job)
+        if MEMORY_EXTRACTION_QUEUE_URL:
+            return success_response({'success': True, 'queued': True})
 
-        # Claude로 정보 추출
-        prompt = USER_INFO_EXTRACTION_PROMPT.format(conversation=conversation_text)
+        results = drain_local_memory_queue()
+        return success_response({
+            'success': True,
+            'queued': False,
+            'extracted': results[-1] if results else {}
+        })
 
-        response = bedrock.invoke_model(
-            modelId=CLAUDE_MODEL,
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 1000,
-                'messages': [{'role': 'user', 'content': prompt}]
-            })
+    except Exception as e:
+        print(f"Extract user info error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+# ============================================
+# 메모리 추출 작업 큐 (SQS / 로컬 대체 큐)
+# ============================================
+
+# 설정 시 SQS로 비동기 처리, 미설정 시 프로세스 내 로컬 큐 사용 (테스트/로컬 실행용)
+MEMORY_EXTRACTION_QUEUE_URL = os.environ.get('MEMORY_EXTRACTION_QUEUE_URL')
+MEMORY_EXTRACTION_DEBOUNCE_SECONDS = 30   # SQS 전달 지연 (연속 요청 합치기)
+MEMORY_CONTEXT_MESSAGES = 2               # 새 메시지 앞에 붙이는 문맥 메시지 수
+MEMORY_SAVE_MAX_RETRIES = 5
+
+LOCAL_MEMORY_QUEUE = deque()
+
+
+def enqueue_memory_job(job):
+    """메모리 추출 작업 등록"""
+    if MEMORY_EXTRACTION_QUEUE_URL:
+        sqs.send_message(
+            QueueUrl=MEMORY_EXTRACTION_QUEUE_URL,
+            MessageBody=json.dumps(job),
+            DelaySeconds=MEMORY_EXTRACTION_DEBOUNCE_SECONDS
         )
+    else:
+        LOCAL_MEMORY_QUEUE.append(job)
+
+
+def drain_local_memory_queue():
+    """로컬 큐의 작업을 모두 처리. 반환: 작업별 추출 결과 리스트"""
+    results = []
+    while LOCAL_MEMORY_QUEUE:
+        results.append(process_memory_job(LOCAL_MEMORY_QUEUE.popleft()))
+    return results
 
-        result = json.loads(response['body'].read())
-        extracted_text = result['content'][0]['text']
 
-        # JSON 파싱
+def handle_memory_queue_event(event):
+    """SQS 배치 처리 (실패한 메시지만 재시도되도록 부분 실패 보고)"""
+    failures = []
+    for record in event.get('Records', []):
+        job = {}
+        accumulator = start_metering(record.get('messageId'))
         try:
-            # JSON 블록 추출 시도
-            if '```json' in extracted_text:
-                extracted_text = extracted_text.split('```json')[1].split('```')[0]
-            elif '```' in extracted_text:
-                extracted_text = extracted_text.split('```')[1].split('```')[0]
+            job = json.loads(record['body'])
+            process_memory_job(job)
+        except Exception as e:
+            print(f"[Memory] Job failed {record.get('messageId')}: {str(e)}")
+            failures.append({'itemIdentifier': record.get('messageId')})
+        finally:
+            flush_usage(accumulator, job.get('userId'), job.get('sessionId'), 'memory_job')
+    return {'batchItemFailures': failures}
+
+
+def get_session_meta(session_id):
+    """GSI1로 세션 메타 아이템 조회"""
+    response = get_table().query(
+        IndexName='GSI1',
+        KeyConditionExpression='GSI1PK = :pk AND GSI1SK = :sk',
+        ExpressionAttributeValues={':pk': f'SESSION#{session_id}', ':sk': 'META'}
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+
+def get_session_messages(session_id):
+    """GSI1로 세션 메시지를 시간순 조회"""
+    table = get_table()
+    query_params = {
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :pk AND begins_with(GSI1SK, :msg)',
+        'ExpressionAttributeValues': {':pk': f'SESSION#{session_id}', ':msg': 'MSG#'},
+        'ScanIndexForward': True
+    }
+    messages = []
+    while True:
+        response = table.query(**query_params)
+        messages.extend(
+            {'role': item.get('role', 'user'), 'content': item.get('content', '')}
+            for item in response.get('Items', [])
+        )
+        if not response.get('LastEvaluatedKey'):
+            return messages
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
-            extracted_info = json.loads(extracted_text.strip())
-        except json.JSONDecodeError:
-            print(f"[Memory] JSON parse failed: {extracted_text[:200]}")
-            extracted_info = {}
 
-        # null 값 필터링
-        extracted_info = {k: v for k, v in extracted_info.items() if v is not None and v != [] and v != ''}
+def advance_memory_watermark(session_meta, watermark, new_watermark):
+    """세션 워터마크를 조건부로 전진. 다른 작업이 먼저 처리했으면 False"""
+    try:
+        get_table().update_item(
+            Key={'PK': session_meta['PK'], 'SK': session_meta['SK']},
+            UpdateExpression='SET memoryWatermark = :new',
+            ConditionExpression='attribute_not_exists(memoryWatermark) OR memoryWatermark = :old',
+            ExpressionAttributeValues={':new': new_watermark, ':old': watermark}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def process_memory_job(job):
+    """메모리 추출 작업 처리: 새 메시지만 추출 → 병합 저장과 워터마크 전진을 한 트랜잭션으로 기록
+
+    저장이 실패하면 워터마크도 그대로라서 SQS 재시도 때 같은 턴을 다시 처리함.
+    """
+    user_id = job['userId']
+    session_id = job.get('sessionId')
+    session_meta, watermark = None, 0
+
+    if session_id:
+        session_meta = get_session_meta(session_id)
+        if not session_meta:
+            print(f"[Memory] Session not found: {session_id}")
+            return {}
+        watermark = int(session_meta.get('memoryWatermark', 0))
+        messages = get_session_messages(session_id)
+    else:
+        messages = job.get('messages', [])
 
-        print(f"[Memory] Extracted for {user_id[:8]}: {list(extracted_info.keys())}")
+    new_messages = messages[watermark:]
+    if not any(m.get('role', 'user') == 'user' for m in new_messages):
+        return {}
 
-        # 추출된 정보가 있으면 자동 저장
-        if extracted_info:
-            save_body = {'userId': user_id, 'memory': extracted_info}
-            handle_save_user_memory(save_body)
+    context_start = max(0, watermark - MEMORY_CONTEXT_MESSAGES)
+    extracted_info = extract_user_info_from_messages(messages[context_start:])
 
-        return success_response({
-            'success': True,
-            'extracted': extracted_info
+    if not extracted_info:
+        # 추출할 정보가 없어도 처리한 구간은 넘김 (저장할 것이 없으므로 순서 문제 없음)
+        if session_meta:
+            advance_memory_watermark(session_meta, watermark, len(messages))
+        return {}
+
+    watermark_update = (session_meta, watermark, len(messages)) if session_meta else None
+    if save_merged_memory(user_id, extracted_info, watermark_update) is None:
+        # 같은 구간을 다른 작업이 이미 처리함 → 병합하지 않음
+        print(f"[Memory] Watermark moved for session {session_id}, skipping")
+        return {}
+
+    return extracted_info
+
+
+def extract_user_info_from_messages(messages):
+    """Claude로 대화에서 사용자 정보 추출"""
+    conversation_text = format_conversation_for_analysis(messages)
+    prompt = USER_INFO_EXTRACTION_PROMPT.format(conversation=conversation_text)
+
+    response = bedrock.invoke_model(
+        modelId=get_config('claudeModel'),
+        contentType='application/json',
+        accept='application/json',
+        body=json.dumps({
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': 1000,
+            'messages': [{'role': 'user', 'content': prompt}]
         })
+    )
 
-    except Exception as e:
-        print(f"Extract user info error: {str(e)}")
-        return error_response(str(e), 500)
+    result = json.loads(response['body'].read())
+    record_bedrock_usage(result.get('usage'))
+    extracted_text = result['content'][0]['text']
+
+    # JSON 파싱
+    try:
+        # JSON 블록 추출 시도
+        if '```json' in extracted_text:
+            extracted_text = extracted_text.split('```json')[1].split('```')[0]
+        elif '```' in extracted_text:
+            extracted_text = extracted_text.split('```')[1].split('```')[0]
+
+        extracted_info = json.loads(extracted_text.strip())
+    except json.JSONDecodeError:
+        print(f"[Memory] JSON parse failed: {extracted_text[:200]}")
+        extracted_info = {}
+
+    # null 값 필터링
+    return {k: v for k, v in extracted_info.items() if v is not None and v != [] and v != ''}
+
+
+def save_merged_memory(user_id, new_memory, watermark_update=None):
+    """버전 조건부 쓰기로 메모리 병합 저장 (충돌 시 다시 읽고 병합). 반환: (병합 메모리, 저장 시각)
+
+    watermark_update=(세션 메타, 이전 워터마크, 새 워터마크)면 세션 워터마크 전진과 함께
+    TransactWriteItems로 기록하고, 워터마크가 이미 움직였으면 저장하지 않고 None 반환.
+    """
+    table = get_table()
+    key = {'PK': f'USER#{user_id}', 'SK': 'MEMORY'}
+
+    for attempt in range(MEMORY_SAVE_MAX_RETRIES):
+        existing_item = table.get_item(Key=key, ConsistentRead=True).get('Item')
+        existing_memory = existing_item.get('memory', {}) if existing_item else {}
+        memory_stats = existing_item.get('memoryStats', {}) if existing_item else {}
+        version = int(existing_item.get('version', 0)) if existing_item else 0
+
+        merged_memory = merge_memory(existing_memory, new_memory, memory_stats)
+        now = get_now()
+
+        if version:
+            condition = {'ConditionExpression': '#v = :v', 'ExpressionAttributeValues': {':v': version}}
+        else:
+            condition = {'ConditionExpression': 'attribute_not_exists(#v)'}
+
+        item = {
+            **key,
+            'type': 'USER_MEMORY',
+            'userId': user_id,
+            'memory': merged_memory,
+            'memoryStats': memory_stats,
+            'version': version + 1,
+            'updatedAt': now,
+            'ttl': get_ttl() + (365 * 24 * 60 * 60)  # 1년 추가 (총 약 1.25년)
+        }
+        try:
+            if watermark_update:
+                if not put_memory_with_watermark(item, condition, *watermark_update):
+                    return None
+            else:
+                table.put_item(Item=item, ExpressionAttributeNames={'#v': 'version'}, **condition)
+            print(f"[Memory] Saved for user {user_id[:8]} v{version + 1}: {list(merged_memory.keys())}")
+            return merged_memory, now
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            print(f"[Memory] Version conflict for user {user_id[:8]} (attempt {attempt + 1}), retrying merge")
+
+    raise Exception('Memory save conflict: retries exhausted')
+
+
+DYNAMO_SERIALIZER = TypeSerializer()
+
+
+def to_attribute_values(values):
+    """dict → 저수준 클라이언트용 DynamoDB 속성 값 (트랜잭션용)"""
+    return {k: DYNAMO_SERIALIZER.serialize(v) for k, v in values.items()}
+
+
+def put_memory_with_watermark(item, condition, session_meta, watermark, new_watermark):
+    """메모리 저장 + 세션 워터마크 전진을 한 트랜잭션으로 기록. 워터마크가 이미 움직였으면 False
+
+    메모리 버전 충돌은 ConditionalCheckFailedException으로 바꿔 던져 호출부의 재병합 루프가 처리.
+    """
+    put = {
+        'TableName': DYNAMODB_TABLE,
+        'Item': to_attribute_values(item),
+        'ConditionExpression': condition['ConditionExpression'],
+        'ExpressionAttributeNames': {'#v': 'version'}
+    }
+    if condition.get('ExpressionAttributeValues'):
+        put['ExpressionAttributeValues'] = to_attribute_values(condition['ExpressionAttributeValues'])
+
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': put},
+            {'Update': {
+                'TableName': DYNAMODB_TABLE,
+                'Key': to_attribute_values({'PK': session_meta['PK'], 'SK': session_meta['SK']}),
+                'UpdateExpression': 'SET memoryWatermark = :new',
+                'ConditionExpression': 'attribute_not_exists(memoryWatermark) OR memoryWatermark = :old',
+                'ExpressionAttributeValues': to_attribute_values({':new': new_watermark, ':old': watermark})
+            }}
+        ])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = [r.get('Code') for r in e.response.get('CancellationReasons', [])]
+        if len(reasons) > 1 and reasons[1] == 'ConditionalCheckFailed':
+            return False
+        if reasons and reasons[0] == 'ConditionalCheckFailed':
+            raise ClientError(
+                {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Memory version conflict'}},
+                'TransactWriteItems'
+            )
+        raise
+
+
+MEMORY_LIST_MAX_ITEMS = 20        # 리스트 필드당 최대 보관 개수
+MEMORY_RECENCY_HALF_LIFE_DAYS = 30  # 최근성 가중치 반감기
+
+
+def normalize_memory_value(value):
+    """리스트 항목 중복 판별용 키 (대소문자/공백/끝 구두점 무시)"""
+    if not isinstance(value, str):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return ' '.join(value.casefold().split()).rstrip('.!?,;')
 
 
-def merge_memory(existing, new):
-    """기존 메모리와 새 메모리 병합"""
+def score_memory_value(stat, now_ts):
+    """빈도 × 최근성 감쇠 점수 (자주, 최근에 언급될수록 높음)"""
+    age_days = max(0, now_ts - int(stat.get('lastSeen', now_ts))) / 86400
+    return int(stat.get('count', 1)) * 0.5 ** (age_days / MEMORY_RECENCY_HALF_LIFE_DAYS)
+
+
+def merge_memory(existing, new, stats=None):
+    """기존 메모리와 새 메모리 병합
+
+    리스트 필드는 정규화 키로 순서를 유지하며 중복 제거하고, 항목별 언급 횟수와
+    마지막 언급 시각(stats[field][key] = {'count', 'lastSeen'})으로 점수를 매겨
+    상위 MEMORY_LIST_MAX_ITEMS개를 점수순으로 보관. stats는 제자리에서 갱신됨.
+    """
     merged = existing.copy()
+    stats = stats if stats is not None else {}
+    now_ts = int(time.time())
 
     for key, value in new.items():
         if value is None or value == '' or value == []:
             continue
 
-        if key not in merged:
-            merged[key] = value
-        elif isinstance(value, list) and isinstance(merged[key], list):
-            # 리스트: 중복 제거하며 합치기
-            combined = merged[key] + [v for v in value if v not in merged[key]]
-            merged[key] = combined[-20:]  # 최대 20개 유지
+        if isinstance(value, list) and isinstance(merged.get(key), list):
+            field_stats = stats.setdefault(key, {})
+            by_norm = {}
+
+            # 기존 항목 먼저 (순서 유지), 통계가 없는 과거 항목은 1회 언급으로 간주
+            for v in merged[key]:
+                norm = normalize_memory_value(v)
+                if norm not in by_norm:
+                    by_norm[norm] = v
+                    field_stats.setdefault(norm, {'count': 1, 'lastSeen': now_ts})
+
+            # 새 항목: 같은 호출 안의 중복은 한 번만 집계, 표기는 처음 값 유지
+            new_norms = {}
+            for v in value:
+                new_norms.setdefault(normalize_memory_value(v), v)
+            for norm, v in new_norms.items():
+                by_norm.setdefault(norm, v)
+                stat = field_stats.setdefault(norm, {'count': 0, 'lastSeen': now_ts})
+                stat['count'] = int(stat['count']) + 1
+                stat['lastSeen'] = now_ts
+
+            # 점수 동률이면 나중에 추가된 항목 우선
+            order = {n: i for i, n in enumerate(by_norm)}
+            ranked = sorted(by_norm, key=lambda n: (score_memory_value(field_stats[n], now_ts), order[n]), reverse=True)
+            kept = ranked[:MEMORY_LIST_MAX_ITEMS]
+            merged[key] = [by_norm[n] for n in kept]
+            stats[key] = {n: field_stats[n] for n in kept}
+        elif isinstance(value, list) and key not in merged:
+            # 새 리스트 필드: 중복 제거 후 통계 초기화
+            by_norm = {}
+            for v in value:
+                by_norm.setdefault(normalize_memory_value(v), v)
+            kept = list(by_norm)[:MEMORY_LIST_MAX_ITEMS]
+            merged[key] = [by_norm[n] for n in kept]
+            stats[key] = {n: {'count': 1, 'lastSeen': now_ts} for n in kept}
         else:
             # 단일 값: 새 값으로 대체
             merged[key] = value
@@ -1652,9 +4189,7 @@ def get_kst_date():
 
 def handle_get_usage(body):
     """사용자 사용량 조회"""
-    user_id = body.get('userId') or body.get('deviceId')
-    if not user_id:
-        return error_response('userId or deviceId is required')
+    user_id = get_user_id(body)
 
     today = get_kst_date()
 
@@ -1664,12 +4199,8 @@ def handle_get_usage(body):
         )
         item = response.get('Item')
 
-        # 기본 사용량 및 제한
-        default_limits = {
-            'dailyChatCount': 50,
-            'dailyTtsCount': 100,
-            'dailyAnalyzeCount': 10
-        }
+        # 기본 사용량 및 제한 (운영 설정 문서에서 조정 가능)
+        default_limits = get_config('usageLimits')
 
         if item:
             usage = {
@@ -1700,12 +4231,9 @@ def handle_get_usage(body):
 
 def handle_increment_usage(body):
     """사용량 증가"""
-    user_id = body.get('userId') or body.get('deviceId')
+    user_id = get_user_id(body)
     usage_type = body.get('usageType', 'chat')
 
-    if not user_id:
-        return error_response('userId or deviceId is required')
-
     today = get_kst_date()
     count_field = f'{usage_type}Count'
 
@@ -1738,3 +4266,507 @@ def handle_increment_usage(body):
     except Exception as e:
         print(f"Increment usage error: {str(e)}")
         return error_response(str(e), 500)
+
+
+# ============================================
+# 사용량/비용 계량 (토큰, TTS/번역 문자 수, Transcribe 초)
+# ============================================
+# 요청마다 계량 누적기를 만들어 외부 과금 단위를 모았다가 응답 직전에
+# 사용자 일별 항목과 세션 항목에 ADD로 원자적 누적 (요청당 최대 2회 쓰기, 기록 없으면 쓰기 없음).
+# 워커 스레드로 넘기는 함수는 bind_request_context로 요청의 누적기를 묶어 전달.
+# 헤지에서 진 TTS 호출처럼 집계가 끝난 뒤 도착한 기록은 다른 요청에 넘기지 않고 버림.
+
+METERING_ENABLED = os.environ.get('METERING_ENABLED', 'true').lower() == 'true'
+
+# 추정 단가 (USD / 단위) — 세션·프롬프트 간 비용 비교용이며 청구 금액과 다를 수 있음
+METERING_UNIT_PRICES = {
+    'inputTokens': 0.25 / 1_000_000,              # Claude 3 Haiku 입력 토큰
+    'outputTokens': 1.25 / 1_000_000,             # Claude 3 Haiku 출력 토큰
+    'elevenlabsCharacters': 0.22 / 1000,          # ElevenLabs Creator 플랜 기준
+    'pollyNeuralCharacters': 16.0 / 1_000_000,
+    'pollyStandardCharacters': 4.0 / 1_000_000,
+    'translateCharacters': 15.0 / 1_000_000,
+    'transcribeSeconds': 0.024 / 60,
+}
+TRANSCRIBE_MIN_BILLED_SECONDS = 15  # 배치 Transcribe 작업당 최소 과금 시간
+
+METERING_CONTEXT = threading.local()  # 스레드별 현재 요청의 계량 누적기
+METERING_LOCK = threading.Lock()
+
+
+def start_metering(request_id=None):
+    """현재 스레드에 새 요청 계량 누적기 설정"""
+    accumulator = {'requestId': request_id or uuid.uuid4().hex, 'records': [], 'closed': False}
+    METERING_CONTEXT.accumulator = accumulator
+    return accumulator
+
+
+def get_metering_accumulator():
+    return getattr(METERING_CONTEXT, 'accumulator', None)
+
+
+def bind_request_context(fn):
+    """워커 스레드에서 실행할 함수에 현재 요청의 계량 누적기와 계측 구간 수집기를 묶음"""
+    accumulator, collector = get_metering_accumulator(), get_span_collector()
+
+    def run(*args, **kwargs):
+        previous = get_metering_accumulator(), get_span_collector()
+        METERING_CONTEXT.accumulator, METRICS_CONTEXT.collector = accumulator, collector
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            METERING_CONTEXT.accumulator, METRICS_CONTEXT.collector = previous
+    return run
+
+
+def record_usage(**amounts):
+    """과금 단위를 현재 요청 누적기에 기록 (요청 밖이거나 이미 집계된 요청이면 버림)"""
+    accumulator = get_metering_accumulator()
+    if not METERING_ENABLED or accumulator is None:
+        return
+    record = {k: int(v) for k, v in amounts.items() if v}
+    with METERING_LOCK:
+        if accumulator['closed']:
+            print(f"[Metering] Dropped late usage for request {accumulator['requestId']}: {record}")
+            return
+        accumulator['records'].append(record)
+
+
+def record_bedrock_usage(usage):
+    """Bedrock 응답(또는 스트림 이벤트)의 usage 블록 기록"""
+    if usage:
+        record_usage(inputTokens=usage.get('input_tokens', 0), outputTokens=usage.get('output_tokens', 0))
+
+
+def estimate_cost_micro_usd(totals):
+    """단위 합계 → 추정 비용 (마이크로 USD 정수, DynamoDB 숫자 누적용)"""
+    return int(round(sum(METERING_UNIT_PRICES.get(k, 0) * v for k, v in totals.items()) * 1_000_000))
+
+
+def flush_usage(accumulator, user_id, session_id, action):
+    """요청 누적기를 닫고 기록을 사용자 일별 항목(액션별 분해 포함)과 세션 항목에 원자적으로 누적"""
+    with METERING_LOCK:
+        accumulator['closed'] = True
+        records = accumulator['records']
+    if get_metering_accumulator() is accumulator:
+        METERING_CONTEXT.accumulator = None
+    totals = {}
+    for record in records:
+        for key, value in record.items():
+            totals[key] = totals.get(key, 0) + value
+    if not totals:
+        return None
+    if not user_id:
+        print(f"[Metering] Dropped usage without user ({action}): {totals}")
+        return None
+
+    totals['costMicroUsd'] = estimate_cost_micro_usd(totals)
+    names = {'#ttl': 'ttl', '#type': 'type', '#requests': 'requests'}
+    values = {':one': 1, ':now': get_now(), ':ttl': get_ttl()}
+    additions = ['#requests :one']
+    for index, (key, value) in enumerate(totals.items()):
+        names[f'#t{index}'] = key
+        names[f'#a{index}'] = f'{action}.{key}'  # 점은 속성 이름의 일부 (중첩 경로 아님)
+        values[f':v{index}'] = value
+        additions += [f'#t{index} :v{index}', f'#a{index} :v{index}']
+
+    table = get_table()
+    try:
+        table.update_item(
+            Key={'PK': f'DEVICE#{user_id}', 'SK': f'METER#{get_kst_date()}'},
+            UpdateExpression='SET #type = :type, updatedAt = :now, #ttl = :ttl ADD ' + ', '.join(additions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={**values, ':type': 'USAGE_METER'}
+        )
+        if session_id:
+            session_additions = ['#requests :one'] + [f'#t{i} :v{i}' for i in range(len(totals))]
+            table.update_item(
+                Key={'PK': f'DEVICE#{user_id}', 'SK': f'METER_SESSION#{session_id}'},
+                UpdateExpression='SET #type = :type, sessionId = :sid, updatedAt = :now, #ttl = :ttl ADD '
+                                 + ', '.join(session_additions),
+                ExpressionAttributeNames={k: v for k, v in names.items() if not k.startswith('#a')},
+                ExpressionAttributeValues={**values, ':type': 'SESSION_METER', ':sid': session_id}
+            )
+    except Exception as e:
+        print(f"[Metering] Flush error: {str(e)}")
+    return totals
+
+
+def handle_get_metering(body):
+    """최근 N일 계량 합계(액션별 분해)와 비용 상위 세션 조회"""
+    user_id = get_user_id(body)
+
+    days = max(1, min(body.get('days', 7), 90))  # 타입은 ACTION_SCHEMAS에서 정수로 검증됨
+    limit = max(1, min(body.get('limit', 10), 100))
+    since = (datetime.now(timezone(timedelta(hours=9))) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    fields = list(METERING_UNIT_PRICES) + ['requests', 'costMicroUsd']
+
+    try:
+        table = get_table()
+        response = table.query(
+            KeyConditionExpression='PK = :pk AND SK BETWEEN :from AND :to',
+            ExpressionAttributeValues={':pk': f'DEVICE#{user_id}', ':from': f'METER#{since}', ':to': 'METER#9999'}
+        )
+        daily, totals, by_action = [], dict.fromkeys(fields, 0), {}
+        for item in response.get('Items', []):
+            day = {k: int(item.get(k, 0)) for k in fields}
+            for key, value in day.items():
+                totals[key] += value
+            for name, value in item.items():
+                if '.' in name:
+                    action, key = name.split('.', 1)
+                    by_action.setdefault(action, {})
+                    by_action[action][key] = by_action[action].get(key, 0) + int(value)
+            daily.append({'date': item['SK'].split('#', 1)[1], **day})
+
+        sessions = []
+        query_params = {
+            'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :prefix)',
+            'ExpressionAttributeValues': {':pk': f'DEVICE#{user_id}', ':prefix': 'METER_SESSION#'}
+        }
+        while True:
+            page = table.query(**query_params)
+            sessions.extend(
+                {'sessionId': item.get('sessionId'), 'updatedAt': item.get('updatedAt'),
+                 **{k: int(item.get(k, 0)) for k in fields}}
+                for item in page.get('Items', []) if item.get('updatedAt', '') >= since
+            )
+            if not page.get('LastEvaluatedKey'):
+                break
+            query_params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+        sessions.sort(key=lambda s: s['costMicroUsd'], reverse=True)
+
+        return success_response({
+            'success': True,
+            'totals': totals,
+            'estimatedCostUsd': round(totals['costMicroUsd'] / 1_000_000, 4),
+            'byAction': by_action,
+            'daily': daily,
+            'topSessions': sessions[:limit]
+        })
+    except Exception as e:
+        print(f"Get metering error: {str(e)}")
+        return error_response(str(e), 500)
+
+
+# ============================================
+# 요청 속도 제한 (사용자별 / 전체 토큰 버킷)
+# ============================================
+# GCRA(토큰 버킷과 동일한 동작)로 버킷 상태를 TAT(다음 토큰이 비는 시각, ms) 하나로 저장하고,
+# DynamoDB 조건부 UpdateItem 한 번으로 원자적으로 토큰 소비 (읽기 없이 허용, 거부 시에만 조회).
+# 컨테이너는 마지막으로 본 TAT를 기억함. TAT는 늘어나기만 하므로 캐시 값으로 이미 초과가
+# 확실하면 DynamoDB 호출 없이 바로 거부 (반복 호출 루프를 싸게 차단).
+# 모든 요청이 공유하는 전체 버킷은 쓰기 한 번에 토큰 여러 개를 미리 받아 컨테이너에서 나눠 씀
+# (허용 요청 대부분이 DynamoDB 쓰기 없이 통과 → 제한기 항목 자체가 핫 파티션이 되지 않음).
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+
+# 자원별 (버킷 용량, 초당 충전 토큰)
+RATE_LIMITS = {
+    'bedrock': {'user': (10, 0.5), 'global': (50, 16.0)},      # 전체: Haiku on-demand 분당 ~1,000회
+    'tts': {'user': (20, 1.0)},
+    'elevenlabs': {'user': (20, 1.0), 'global': (30, 10.0)},   # 전체 초과 시 tts는 Polly로 우회
+}
+
+# 액션 → 소비하는 자원 (사용자 버킷 기준)
+RATE_LIMITED_ACTIONS = {
+    'chat': ('bedrock',),
+    'speculate_chat': ('bedrock',),
+    'analyze': ('bedrock',),
+    'extract_user_info': ('bedrock',),
+    'prepare_greeting': ('bedrock',),
+    'tts': ('tts',),
+    'tts_custom_voice': ('elevenlabs',),
+}
+
+BEDROCK_THROTTLE_CODES = {'ThrottlingException', 'TooManyRequestsException', 'ServiceQuotaExceededException'}
+UPSTREAM_THROTTLE_PENALTY_SECONDS = 2.0  # 상위 서비스 스로틀링 시 전체 버킷을 비워둘 시간
+RATE_LIMIT_BUCKET_TTL_SECONDS = 86400
+RATE_LIMIT_LEASE_TOKENS = 5         # 전체 버킷에서 한 번에 받아두는 토큰 수
+RATE_LIMIT_LEASE_SECONDS = 1.0      # 받아둔 토큰을 쓸 수 있는 시간 (지나면 버림 → 버스트 제한 유지)
+
+RATE_LIMIT_TAT = {}       # 버킷 키 → 마지막으로 본 TAT(ms) (컨테이너 캐시)
+RATE_LIMIT_LEASES = {}    # 전체 버킷 키 → {'tokens': 남은 토큰, 'expires': 만료 ms} (컨테이너 몫)
+RATE_LIMIT_LOCK = threading.Lock()
+RATE_LIMIT_REQUEST = {}   # 현재 요청 중 상위 스로틀링 감지 여부
+
+
+def get_bucket_params(capacity, rate):
+    """(용량, 초당 충전) → (토큰 간격 ms, 버스트 허용 ms)"""
+    interval = int(1000 / rate)
+    return interval, interval * (capacity - 1)
+
+
+def try_consume_token(bucket, capacity, rate, tokens=1):
+    """버킷에서 토큰 tokens개를 한 번에 소비. 반환: 재시도까지 남은 초 (0이면 허용)"""
+    interval, tolerance = get_bucket_params(capacity, rate)
+    now = int(time.time() * 1000)
+    cached = RATE_LIMIT_TAT.get(bucket, 0)
+    if cached - now > tolerance:
+        return (cached - tolerance - now) / 1000
+
+    key = {'PK': f'RATELIMIT#{bucket}', 'SK': 'BUCKET'}
+    values = {':now': now, ':ttl': now // 1000 + RATE_LIMIT_BUCKET_TTL_SECONDS}
+    attempts = [
+        # 버킷이 가득 참 (TAT가 과거) → TAT = now + 간격
+        {'UpdateExpression': 'SET tat = :next, #ttl = :ttl',
+         'ConditionExpression': 'attribute_not_exists(tat) OR tat <= :now',
+         'ExpressionAttributeValues': {**values, ':next': now + interval * tokens}},
+        # 토큰 일부 소비된 상태 → TAT += 간격 (버스트 허용 범위 안에서만)
+        {'UpdateExpression': 'SET tat = tat + :interval, #ttl = :ttl',
+         'ConditionExpression': 'tat > :now AND tat <= :limit',
+         'ExpressionAttributeValues': {
+             **values, ':interval': interval * tokens, ':limit': now + tolerance - interval * (tokens - 1)}},
+    ]
+    if cached > now:
+        attempts.reverse()  # 최근에 소비된 버킷이면 두 번째 경우가 먼저 맞을 가능성이 큼
+
+    table = get_table()
+    for attempt in attempts:
+        try:
+            response = table.update_item(
+                Key=key, ExpressionAttributeNames={'#ttl': 'ttl'}, ReturnValues='UPDATED_NEW', **attempt
+            )
+            RATE_LIMIT_TAT[bucket] = int(response['Attributes']['tat'])
+            return 0
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    # 두 조건 모두 실패 = TAT가 버스트 허용 범위 밖 → 거부 (정확한 재시도 시간을 위해 조회)
+    item = table.get_item(Key=key, ConsistentRead=True).get('Item') or {}
+    tat = int(item.get('tat', now + tolerance + interval))
+    RATE_LIMIT_TAT[bucket] = tat
+    return max(tat - tolerance - now, interval) / 1000
+
+
+def take_global_token(bucket, capacity, rate):
+    """전체 버킷 토큰 1개 (컨테이너 몫이 남았으면 쓰기 없이 허용). 반환: 재시도까지 남은 초"""
+    now = int(time.time() * 1000)
+    with RATE_LIMIT_LOCK:
+        lease = RATE_LIMIT_LEASES.get(bucket)
+        if lease and lease['tokens'] > 0 and lease['expires'] > now:
+            lease['tokens'] -= 1
+            return 0
+
+    size = min(RATE_LIMIT_LEASE_TOKENS, capacity)
+    retry_after = try_consume_token(bucket, capacity, rate, size)
+    if retry_after and size > 1:
+        # 여러 개는 안 되지만 한 개는 남았을 수 있음 (한도 근처에서 덜 허용하지 않게)
+        size = 1
+        retry_after = try_consume_token(bucket, capacity, rate)
+    if not retry_after:
+        with RATE_LIMIT_LOCK:
+            RATE_LIMIT_LEASES[bucket] = {'tokens': size - 1, 'expires': now + int(RATE_LIMIT_LEASE_SECONDS * 1000)}
+    return retry_after
+
+
+def check_rate_limit(resource, user_id, scopes=('user', 'global')):
+    """자원의 사용자/전체 버킷 확인. 반환: None(허용) 또는 (범위, 재시도 초)"""
+    limits = RATE_LIMITS.get(resource, {})
+    for scope in scopes:
+        if scope not in limits or (scope == 'user' and not user_id):
+            continue
+        try:
+            if scope == 'user':
+                bucket = f'{resource}#USER#{user_id}'
+                retry_after = try_consume_token(bucket, *limits[scope])
+            else:
+                bucket = f'{resource}#GLOBAL'
+                retry_after = take_global_token(bucket, *limits[scope])
+        except Exception as e:
+            # 제한 저장소 장애 시 요청은 통과 (제한기 때문에 서비스가 멈추지 않게)
+            print(f"[RateLimit] Check error ({bucket}): {str(e)}")
+            continue
+        if retry_after:
+            return scope, retry_after
+    return None
+
+
+def penalize_global_bucket(resource, seconds=UPSTREAM_THROTTLE_PENALTY_SECONDS):
+    """상위 서비스 스로틀링 → 전체 버킷을 seconds 동안 비움 (이미 더 길게 비어 있으면 유지)"""
+    limits = RATE_LIMITS.get(resource, {})
+    if 'global' not in limits:
+        return
+    _, tolerance = get_bucket_params(*limits['global'])
+    bucket = f'{resource}#GLOBAL'
+    now = int(time.time() * 1000)
+    until = now + tolerance + int(seconds * 1000)
+    RATE_LIMIT_TAT[bucket] = max(RATE_LIMIT_TAT.get(bucket, 0), until)
+    with RATE_LIMIT_LOCK:
+        RATE_LIMIT_LEASES.pop(bucket, None)
+    try:
+        get_table().update_item(
+            Key={'PK': f'RATELIMIT#{bucket}', 'SK': 'BUCKET'},
+            UpdateExpression='SET tat = :until, #ttl = :ttl',
+            ConditionExpression='attribute_not_exists(tat) OR tat < :until',
+            ExpressionAttributeNames={'#ttl': 'ttl'},
+            ExpressionAttributeValues={':until': until, ':ttl': now // 1000 + RATE_LIMIT_BUCKET_TTL_SECONDS}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"[RateLimit] Penalize error ({bucket}): {str(e)}")
+
+
+def rate_limited_response(scope, retry_after):
+    """429 응답 (Retry-After 헤더 + 본문에도 retryAfter, 브라우저는 헤더를 못 읽을 수 있음)"""
+    seconds = max(1, math.ceil(retry_after))
+    response = error_response('Too many requests', 429)
+    response['headers'] = {
+        **response['headers'], 'Retry-After': str(seconds), 'Access-Control-Expose-Headers': 'Retry-After'
+    }
+    response['body'] = dumps_json({'error': 'Too many requests', 'scope': scope, 'retryAfter': seconds})
+    return response
+
+
+def check_action_rate_limit(action, body):
+    """요청 처리 전 액션의 자원 버킷 확인. 반환: 429 응답 또는 None"""
+    RATE_LIMIT_REQUEST.clear()
+    if not RATE_LIMIT_ENABLED:
+        return None
+    for resource in RATE_LIMITED_ACTIONS.get(action, ()):
+        limited = check_rate_limit(resource, get_user_id(body))
+        if limited:
+            print(f"[RateLimit] {action} limited: {resource}/{limited[0]}, retry after {limited[1]:.1f}s")
+            return rate_limited_response(*limited)
+    return None
+
+
+def convert_upstream_throttle(response):
+    """요청 중 Bedrock 스로틀링이 있었고 핸들러가 5xx를 냈으면 500 대신 429로 응답"""
+    if RATE_LIMIT_REQUEST.get('throttled') and isinstance(response, dict) and response.get('statusCode', 200) >= 500:
+        return rate_limited_response('global', UPSTREAM_THROTTLE_PENALTY_SECONDS)
+    return response
+
+
+def is_throttling_error(error):
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in BEDROCK_THROTTLE_CODES
+
+
+def on_bedrock_after_call(parsed=None, **kwargs):
+    """botocore after-call: Bedrock 스로틀링 응답을 전체 버킷에 반영 (재시도 소진 후 1회 호출됨)"""
+    code = ((parsed or {}).get('Error') or {}).get('Code')
+    if code in BEDROCK_THROTTLE_CODES:
+        RATE_LIMIT_REQUEST['throttled'] = True
+        print(f"[RateLimit] Bedrock throttled ({code}), backing off global bucket")
+        penalize_global_bucket('bedrock')
+
+
+bedrock.meta.events.register('after-call.bedrock-runtime', on_bedrock_after_call)
+
+
+# ============================================
+# API 라우터 (핸들러 바인딩 + 요청 스키마 + 미들웨어)
+# ============================================
+# 모든 핸들러가 정의된 뒤 import 시 한 번: ACTION_HANDLERS 이름 → 함수, ACTION_SCHEMAS → 검증 함수(make_validator),
+# API_MIDDLEWARE → 액션별 호출 체인으로 묶어 ROUTES에 저장 (요청마다 globals() 조회/조립 없음).
+# 미들웨어는 (action, body, call_next) -> 응답 함수, 앞에 있을수록 바깥에서 실행.
+
+SCHEMA_TYPE_NAMES = {
+    str: 'a string', list: 'a list', dict: 'an object', int: 'an integer', bool: 'a boolean', (int, float): 'a number'
+}
+IDENTITY_MESSAGES = {'user': 'userId is required', 'device': 'userId or deviceId is required'}
+
+
+def check_identity(body, identity):
+    if identity == 'user':
+        return bool(body.get('userId'))
+    return bool(body.get('userId') or body.get('deviceId'))
+
+
+def matches_type(value, cast):
+    """isinstance 검사 + bool 제외 (bool은 int의 하위 클래스라 숫자 필드에 true/false가 통과함)"""
+    return isinstance(value, cast) and (cast is bool or not isinstance(value, bool))
+
+
+def make_validator(schema):
+    """스키마 → 검증 함수 body -> 에러 메시지 (통과하면 None)
+
+    누락 필드는 모아서 '<필드> is required' 형식, 타입/선택지 오류는 첫 필드에서 바로 반환.
+    """
+    identity = schema.get('identity')
+    fields = tuple(schema.get('fields', ()))
+
+    def validate(body):
+        if identity and not check_identity(body, identity):
+            return IDENTITY_MESSAGES[identity]
+        missing = []
+        for field, cast, is_required, *choices in fields:
+            value = body.get(field)
+            if is_required and not value:
+                missing.append(field)
+            elif value is not None and not matches_type(value, cast):
+                return f'{field} must be {SCHEMA_TYPE_NAMES[cast]}'
+            if choices and value is not None and value not in choices[0]:
+                return f'{field} must be one of: {", ".join(choices[0])}'
+        if missing:
+            return f'{", ".join(missing)} {"is" if len(missing) == 1 else "are"} required'
+        return None
+    return validate
+
+
+ACTION_VALIDATORS = {action: make_validator(ACTION_SCHEMAS.get(action, {})) for action in ACTION_HANDLERS}
+
+
+def timing_middleware(action, body, call_next):
+    """핸들러 처리 시간을 Server-Timing 헤더로 전달 (브라우저 개발자 도구/클라이언트 측정용)"""
+    started = time.perf_counter()
+    response = call_next(body)
+    if isinstance(response, dict) and 'headers' in response:
+        duration_ms = (time.perf_counter() - started) * 1000
+        response['headers'] = {**response['headers'], 'Server-Timing': f'app;desc="{action}";dur={duration_ms:.1f}'}
+    return response
+
+
+def metering_middleware(action, body, call_next):
+    """요청 계량 누적기를 만들고 모은 과금 단위를 응답 직전에 한 번 기록"""
+    accumulator = start_metering()
+    try:
+        return call_next(body)
+    finally:
+        if accumulator['records']:
+            release_request_budget()
+        flush_usage(accumulator, get_user_id(body), body.get('sessionId'), action)
+
+
+def auth_middleware(action, body, call_next):
+    """사용자 식별자/요청 스키마 검증 (핸들러는 검증된 필드가 있다고 가정)"""
+    error = ACTION_VALIDATORS[action](body)
+    if error:
+        return error_response(error)
+    return call_next(body)
+
+
+def rate_limit_middleware(action, body, call_next):
+    """자원 토큰 버킷 확인 + 상위 스로틀링으로 실패한 응답을 429로 변환"""
+    limited = check_action_rate_limit(action, body)
+    if limited:
+        return limited
+    try:
+        response = call_next(body)
+    except Exception as e:
+        # 핸들러가 잡지 않은 스로틀링 예외도 500이 아닌 429로
+        if RATE_LIMIT_REQUEST.get('throttled') or is_throttling_error(e):
+            print(f"[RateLimit] {action} failed by upstream throttling: {str(e)}")
+            return rate_limited_response('global', UPSTREAM_THROTTLE_PENALTY_SECONDS)
+        raise
+    return convert_upstream_throttle(response)
+
+
+API_MIDDLEWARE = [timing_middleware, metering_middleware, auth_middleware, rate_limit_middleware]
+
+
+def bind_middleware(middleware, action, call_next):
+    return lambda body: middleware(action, body, call_next)
+
+
+def build_route(action, handler, middleware=API_MIDDLEWARE):
+    """핸들러 + 미들웨어 체인 → body를 받는 단일 함수"""
+    route = handler
+    for hook in reversed(middleware):
+        route = bind_middleware(hook, action, route)
+    return route
+
+
+ROUTES = {action: build_route(action, globals()[name]) for action, name in ACTION_HANDLERS.items()}
+TASK_ROUTES = {task: globals()[name] for task, name in SCHEDULED_TASKS.items()}
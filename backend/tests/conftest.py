@@ -0,0 +1,34 @@
+"""공통 픽스처: benchmarks/stubs.py의 인메모리 AWS 대역을 설치한 lambda_function"""
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIDTEST')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'test-secret')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+import lambda_function  # noqa: E402
+import stubs  # noqa: E402
+
+
+@pytest.fixture
+def env():
+    environment = stubs.install_stubs(lambda_function)
+    lambda_function.RATE_LIMIT_ENABLED = False
+    yield environment
+    environment.shutdown()
+
+
+def call(body):
+    """API 요청 → (상태 코드, 응답 바디)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_function.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    return response['statusCode'], json.loads(response['body'])
@@ -0,0 +1,35 @@
+"""펫/커스텀 튜터 이미지 키 소유권 검증 테스트"""
+import pytest
+
+from conftest import call
+
+OTHER_USER_KEYS = [
+    'voice-samples/victim/sample.webm',
+    'pets/victim/photo.jpg',
+    'pets/owner/../victim/photo.jpg',
+    'greetings/owner/hello.mp3',
+]
+
+
+@pytest.mark.parametrize('image_key', OTHER_USER_KEYS)
+def test_save_pet_rejects_foreign_key(env, image_key):
+    status, payload = call({'action': 'save_pet', 'userId': 'owner', 'imageKey': image_key})
+    assert status == 400
+    assert payload['error'] == 'Invalid imageKey'
+
+
+@pytest.mark.parametrize('image_key', OTHER_USER_KEYS)
+def test_save_custom_tutor_rejects_foreign_key(env, image_key):
+    status, _ = call({'action': 'save_custom_tutor', 'userId': 'owner', 'tutor': {'imageKey': image_key}})
+    assert status == 400
+
+
+def test_save_pet_rejects_foreign_bucket_url(env):
+    url = 'https://eng-learning-audio.s3.amazonaws.com/voice-samples/victim/sample.webm'
+    status, _ = call({'action': 'save_pet', 'userId': 'owner', 'imageUrl': url})
+    assert status == 400
+
+
+def test_save_pet_accepts_own_key_and_external_url(env):
+    assert call({'action': 'save_pet', 'userId': 'owner', 'imageKey': 'pets/owner/1.jpg'})[0] == 200
+    assert call({'action': 'save_pet', 'userId': 'owner', 'imageUrl': 'https://example.com/cat.png'})[0] == 200
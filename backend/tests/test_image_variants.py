@@ -0,0 +1,28 @@
+"""썸네일 선택 테스트"""
+import pytest
+
+import lambda_function
+
+ORIGINAL = 'pets/owner/photo.jpg'
+VARIANTS = {'64': 'pets/owner/photo_64.webp', '128': 'pets/owner/photo_128.webp', '512': 'pets/owner/photo_512.webp'}
+
+
+@pytest.mark.parametrize('requested, expected', [
+    (100, VARIANTS['128']),
+    ('64', VARIANTS['64']),
+    (512, VARIANTS['512']),
+    (1024, ORIGINAL),
+])
+def test_selects_smallest_variant_at_least_requested(requested, expected):
+    assert lambda_function.select_image_variant(ORIGINAL, VARIANTS, requested) == expected
+
+
+@pytest.mark.parametrize('requested', ['large', '1e3', '-64', -64, 0, 64.5, True, [64], {'size': 64}])
+def test_unrecognised_size_falls_back_to_original(requested):
+    assert lambda_function.select_image_variant(ORIGINAL, VARIANTS, requested) == ORIGINAL
+
+
+def test_ignores_unknown_stored_variant_sizes():
+    variants = {**VARIANTS, '96': 'pets/owner/photo_96.webp', 'big': 'pets/owner/photo_big.webp'}
+    assert lambda_function.select_image_variant(ORIGINAL, variants, 80) == VARIANTS['128']
+
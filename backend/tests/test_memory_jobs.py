@@ -0,0 +1,69 @@
+"""메모리 추출 작업 재시도 테스트 (benchmarks/stubs.py 인메모리 대역 사용)
+
+실행: python -m pytest backend/tests
+"""
+import contextlib
+import io
+
+import pytest
+
+import lambda_function
+import stubs
+from conftest import call
+
+USER_ID = 'memory-user'
+SESSION_ID = 'memory-session'
+
+
+def seed_session():
+    call({'action': 'start_session', 'userId': USER_ID, 'sessionId': SESSION_ID, 'settings': {}})
+    for role, content in (('user', 'I went hiking with my friends.'), ('assistant', 'Where did you go?'),
+                          ('user', 'We went to Bukhansan.')):
+        status, _ = call({'action': 'save_message', 'userId': USER_ID, 'sessionId': SESSION_ID,
+                          'message': {'role': role, 'content': content}})
+        assert status == 200
+
+
+def get_watermark():
+    meta = lambda_function.get_session_meta(SESSION_ID)
+    return int(meta.get('memoryWatermark', 0))
+
+
+def get_memory():
+    item = lambda_function.get_table().get_item(Key={'PK': f'USER#{USER_ID}', 'SK': 'MEMORY'}).get('Item')
+    return item and item['memory']
+
+
+def test_failed_save_keeps_watermark_and_retry_reprocesses(env, monkeypatch):
+    seed_session()
+    job = {'userId': USER_ID, 'sessionId': SESSION_ID}
+
+    def throttled(**kwargs):
+        raise stubs.client_error('ProvisionedThroughputExceededException', 'TransactWriteItems')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(env.dynamodb.meta.client, 'transact_write_items', throttled)
+        with pytest.raises(Exception), contextlib.redirect_stdout(io.StringIO()):
+            lambda_function.process_memory_job(job)
+
+    assert get_watermark() == 0
+    assert get_memory() is None
+
+    # SQS 재시도: 같은 턴을 다시 추출해 저장하고 워터마크 전진
+    with contextlib.redirect_stdout(io.StringIO()):
+        extracted = lambda_function.process_memory_job(job)
+    assert extracted
+    assert get_watermark() == 3
+    assert get_memory()
+
+
+def test_moved_watermark_skips_merge(env):
+    seed_session()
+    meta = lambda_function.get_session_meta(SESSION_ID)
+    # 추출 도중 다른 작업이 같은 구간을 먼저 처리한 상황
+    lambda_function.advance_memory_watermark(meta, 0, 3)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        saved = lambda_function.save_merged_memory(USER_ID, {'name': 'Kim'}, (meta, 0, 3))
+    assert saved is None
+    assert get_memory() is None
@@ -0,0 +1,72 @@
+"""요청별 계량 누적기 테스트
+
+실행: python -m pytest backend/tests
+"""
+import contextlib
+import io
+import threading
+
+import pytest
+
+import lambda_function
+from conftest import call
+
+USER_ID = 'meter-user'
+
+
+def get_meter():
+    key = {'PK': f'DEVICE#{USER_ID}', 'SK': f'METER#{lambda_function.get_kst_date()}'}
+    return lambda_function.get_table().get_item(Key=key).get('Item') or {}
+
+
+def flush(accumulator):
+    with contextlib.redirect_stdout(io.StringIO()):
+        lambda_function.flush_usage(accumulator, USER_ID, None, 'test')
+
+
+def test_worker_records_go_to_bound_request(env):
+    first = lambda_function.start_metering('first')
+    worker = threading.Thread(target=lambda_function.bind_request_context(lambda: lambda_function.record_usage(ttsChars=10)))
+    second = lambda_function.start_metering('second')
+    worker.start()
+    worker.join()
+    assert first['records'] == [{'ttsChars': 10}]
+    assert second['records'] == []
+
+
+def test_late_record_after_flush_is_dropped(env):
+    accumulator = lambda_function.start_metering('early')
+    lambda_function.record_usage(ttsChars=5)
+    late = lambda_function.bind_request_context(lambda: lambda_function.record_usage(ttsChars=7))
+    flush(accumulator)
+
+    next_request = lambda_function.start_metering('next')
+    with contextlib.redirect_stdout(io.StringIO()):
+        late()
+    flush(next_request)
+
+    assert accumulator['records'] == [{'ttsChars': 5}]
+    assert next_request['records'] == []
+    assert int(get_meter()['ttsChars']) == 5
+
+
+@pytest.mark.parametrize('field, value', [('days', 'week'), ('limit', 'all'), ('limit', [5]), ('days', 7.5)])
+def test_get_metering_rejects_non_integer_params(env, field, value):
+    status, body = call({'action': 'get_metering', 'userId': USER_ID, field: value})
+    assert status == 400
+    assert field in body['error']
+
+
+def test_get_metering_clamps_limit(env):
+    for index in range(3):
+        accumulator = lambda_function.start_metering(f'req-{index}')
+        lambda_function.record_usage(ttsChars=index + 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            lambda_function.flush_usage(accumulator, USER_ID, f'session-{index}', 'test')
+
+    status, body = call({'action': 'get_metering', 'userId': USER_ID, 'limit': -1})
+    assert status == 200
+    assert len(body['topSessions']) == 1
+    status, body = call({'action': 'get_metering', 'userId': USER_ID, 'days': -5, 'limit': 1000})
+    assert status == 200
+    assert len(body['topSessions']) == 3
@@ -0,0 +1,43 @@
+"""호출별 계측 구간 수집 테스트 (늦게 끝난 구간은 다음 호출 기록에 섞이지 않음)
+
+실행: python -m pytest backend/tests
+"""
+import contextlib
+import io
+import json
+import threading
+
+import lambda_function
+
+
+def emit(collector):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        lambda_function.emit_metrics(collector, 'chat', 1.0, 0, {'statusCode': 200}, False)
+    return json.loads(output.getvalue().splitlines()[0])
+
+
+def test_worker_spans_are_counted_for_their_invocation():
+    collector = lambda_function.start_span_collector()
+    worker = threading.Thread(target=lambda_function.bind_request_context(
+        lambda: lambda_function.record_span('bedrock', 'InvokeModel', 12.5)))
+    worker.start()
+    worker.join()
+    assert emit(collector)['DependencyCalls'] == 1
+
+
+def test_late_span_after_emit_is_dropped():
+    collector = lambda_function.start_span_collector()
+    late = lambda_function.bind_request_context(lambda: lambda_function.record_span('elevenlabs', 'POST', 900.0))
+    assert emit(collector)['DependencyCalls'] == 0
+
+    next_invocation = lambda_function.start_span_collector()
+    late()
+    assert collector['spans'] == []
+    assert emit(next_invocation)['DependencyCalls'] == 0
+
+
+def test_span_outside_invocation_is_ignored():
+    lambda_function.METRICS_CONTEXT.collector = None
+    lambda_function.record_span('s3', 'GetObject', 3.0)
+    assert lambda_function.get_span_collector() is None
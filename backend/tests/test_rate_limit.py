@@ -0,0 +1,59 @@
+"""요청 속도 제한 테스트 (상위 스로틀링 → 429, 전체 버킷 토큰 미리 받기)
+
+실행: python -m pytest backend/tests
+"""
+import contextlib
+import io
+
+from botocore.exceptions import ClientError
+
+import lambda_function
+from conftest import call
+
+USER_ID = 'limit-user'
+
+
+def throttling_error(*args, **kwargs):
+    raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, 'InvokeModel')
+
+
+def test_unhandled_bedrock_throttle_returns_429(env, monkeypatch):
+    monkeypatch.setattr(env.bedrock, 'invoke_model', throttling_error)
+    status, body = call({'action': 'chat', 'userId': USER_ID,
+                         'messages': [{'role': 'user', 'content': 'Hello there.'}]})
+    assert status == 429
+    assert body['retryAfter'] >= 1
+
+
+def test_throttle_response_has_retry_after_header(env, monkeypatch):
+    monkeypatch.setattr(env.bedrock, 'invoke_model', throttling_error)
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_function.ROUTES['chat']({'userId': USER_ID, 'messages': []})
+    assert response['statusCode'] == 429
+    assert int(response['headers']['Retry-After']) >= 1
+
+
+def test_global_bucket_writes_are_batched(env, monkeypatch):
+    lambda_function.RATE_LIMIT_TAT.clear()
+    lambda_function.RATE_LIMIT_LEASES.clear()
+    consumed = []
+    original = lambda_function.try_consume_token
+
+    def counting(bucket, *args):
+        consumed.append(bucket)
+        return original(bucket, *args)
+
+    monkeypatch.setattr(lambda_function, 'try_consume_token', counting)
+    for _ in range(lambda_function.RATE_LIMIT_LEASE_TOKENS):
+        assert lambda_function.check_rate_limit('bedrock', None, scopes=('global',)) is None
+    assert consumed == ['bedrock#GLOBAL']
+
+
+def test_global_bucket_still_limits_with_leases(env):
+    lambda_function.RATE_LIMIT_TAT.clear()
+    lambda_function.RATE_LIMIT_LEASES.clear()
+    capacity, _ = lambda_function.RATE_LIMITS['elevenlabs']['global']
+    results = [lambda_function.check_rate_limit('elevenlabs', None, scopes=('global',))
+               for _ in range(capacity + 5)]
+    allowed = [r for r in results if r is None]
+    assert capacity <= len(allowed) < capacity + 5
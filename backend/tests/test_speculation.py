@@ -0,0 +1,51 @@
+"""추측 응답 확정 입력 검증 테스트
+
+실행: python -m pytest backend/tests
+"""
+import pytest
+
+from conftest import call
+
+USER_ID = 'speculation-user'
+MESSAGES = [{'role': 'user', 'content': 'I like hiking.'}]
+
+
+def speculate():
+    status, _ = call({'action': 'speculate_chat', 'userId': USER_ID, 'sessionId': 's1',
+                      'speculationId': 'spec-1', 'messages': MESSAGES})
+    assert status == 200
+
+
+@pytest.mark.parametrize('threshold', ['high', [0.9], {'value': 0.9}, True])
+def test_non_numeric_threshold_is_rejected(env, threshold):
+    speculate()
+    status, body = call({'action': 'chat', 'userId': USER_ID, 'sessionId': 's1', 'speculationId': 'spec-1',
+                         'speculationThreshold': threshold, 'messages': MESSAGES})
+    assert status == 400
+    assert 'speculationThreshold' in body['error']
+
+
+@pytest.mark.parametrize('messages', [['I like hiking.'], [None]])
+def test_non_object_messages_are_rejected(env, messages):
+    status, _ = call({'action': 'chat', 'userId': USER_ID, 'speculationId': 'spec-1', 'messages': messages})
+    assert status == 400
+
+
+def test_numeric_threshold_commits_speculation(env):
+    speculate()
+    status, body = call({'action': 'chat', 'userId': USER_ID, 'sessionId': 's1', 'speculationId': 'spec-1',
+                         'speculationThreshold': 0.9, 'messages': MESSAGES})
+    assert status == 200
+    assert body.get('speculated') is True
+
+
+@pytest.mark.parametrize('days', ['week', [7], 7.5, True])
+def test_speculation_stats_rejects_non_integer_days(env, days):
+    status, body = call({'action': 'get_speculation_stats', 'days': days})
+    assert status == 400
+    assert 'days' in body['error']
+
+
+def test_speculation_stats_accepts_integer_days(env):
+    status, _ = call({'action': 'get_speculation_stats', 'days': 3})
+    assert status == 200
@@ -0,0 +1,46 @@
+"""번역 캐시 테스트 (정규화는 캐시 키에만 적용)
+
+실행: python -m pytest backend/tests
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import lambda_function
+
+ORIGINAL = 'Line one.\n\n  - bullet   two'
+
+
+def test_translate_sends_original_text_and_shares_normalized_key(env):
+    lambda_function.TRANSLATION_CACHE.clear()
+    translation, tier = lambda_function.translate_with_cache(ORIGINAL, 'en', 'ko')
+    assert tier is None
+    assert translation == f'[ko] {ORIGINAL}'
+
+    _, tier = lambda_function.translate_with_cache(' '.join(ORIGINAL.split()), 'en', 'ko')
+    assert tier == 'memory'
+
+
+def test_batch_translate_sends_original_text(env):
+    lambda_function.TRANSLATION_CACHE.clear()
+    texts = ['Batch  text\twith   spacing', 'Another\nline']
+    translations, unique, misses = lambda_function.translate_many_with_cache(texts, 'en', 'ko')
+    assert (unique, misses) == (2, 2)
+    assert translations == [f'[ko] {text}' for text in texts]
+    assert env.translate_client.characters == sum(len(text) for text in texts)
+
+
+def test_concurrent_batch_translate_keeps_cache_consistent(env, monkeypatch):
+    lambda_function.TRANSLATION_CACHE.clear()
+    lambda_function.TRANSLATION_CACHE_STATS.update(memoryHits=0, dynamodbHits=0, misses=0)
+    monkeypatch.setattr(lambda_function, 'TRANSLATION_CACHE_MAX_ENTRIES', 50)
+    texts = [f'Sentence number {i}' for i in range(200)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda chunk: lambda_function.translate_many_with_cache(chunk, 'en', 'ko')[0],
+            [texts[i::4] for i in range(4)] * 2
+        ))
+
+    assert results[:4] == [[f'[ko] {text}' for text in texts[i::4]] for i in range(4)]
+    assert len(lambda_function.TRANSLATION_CACHE) == 50
+    stats = lambda_function.get_translation_cache_stats()
+    assert stats['memoryHits'] + stats['dynamodbHits'] + stats['misses'] == 400
@@ -0,0 +1,51 @@
+"""한도 정리로 삭제된 클론 음성 테스트 (참조 정리 + Polly 대체)
+
+실행: python -m pytest backend/tests
+"""
+import lambda_function
+from conftest import call
+
+USER_ID = 'voice-owner'
+VOICE_ID = 'evictedvoice0000001'
+
+
+def seed_voice(env):
+    env.elevenlabs.voices[VOICE_ID] = 'My Voice'
+    lambda_function.register_voice(VOICE_ID, USER_ID, f'voice-samples/{USER_ID}/sample.webm', 'hash')
+    table = lambda_function.get_table()
+    table.put_item(Item={'PK': f'USER#{USER_ID}', 'SK': 'CUSTOM_VOICE', 'voiceId': VOICE_ID})
+    table.put_item(Item={'PK': f'DEVICE#{USER_ID}', 'SK': 'CUSTOM_TUTOR', 'voiceId': VOICE_ID, 'name': 'Tutor'})
+
+
+def get_item(pk, sk):
+    return lambda_function.get_table().get_item(Key={'PK': pk, 'SK': sk}).get('Item') or {}
+
+
+def test_evicted_voice_is_unlinked_and_tts_falls_back_to_polly(env):
+    seed_voice(env)
+    env.elevenlabs.voice_limit = lambda_function.VOICE_QUOTA_HEADROOM
+    lambda_function.ensure_voice_slot_available()
+
+    assert VOICE_ID not in env.elevenlabs.voices
+    assert 'voiceId' not in get_item(f'USER#{USER_ID}', 'CUSTOM_VOICE')
+    assert 'voiceId' not in get_item(f'DEVICE#{USER_ID}', 'CUSTOM_TUTOR')
+
+    # 클라이언트가 캐시해 둔 voiceId로 요청해도 500이 아닌 기본 음성
+    status, body = call({'action': 'tts_custom_voice', 'userId': USER_ID, 'text': 'Hello again!',
+                         'voiceId': VOICE_ID})
+    assert status == 200
+    assert body['engine'] == 'polly-fallback'
+    assert body['voiceUnavailable'] is True
+    assert body['audio']
+
+
+def test_replaced_voice_moves_custom_tutor_to_new_voice(env):
+    seed_voice(env)
+    lambda_function.unlink_voice(USER_ID, VOICE_ID, replacement_id='newvoice')
+    assert get_item(f'DEVICE#{USER_ID}', 'CUSTOM_TUTOR')['voiceId'] == 'newvoice'
+
+
+def test_unlink_keeps_tutor_pointing_at_other_voice(env):
+    seed_voice(env)
+    lambda_function.unlink_voice(USER_ID, 'someothervoice')
+    assert get_item(f'DEVICE#{USER_ID}', 'CUSTOM_TUTOR')['voiceId'] == VOICE_ID
@@ -0,0 +1,27 @@
+"""음성 샘플 정리 테스트
+
+실행: python -m pytest backend/tests
+"""
+from datetime import datetime, timedelta, timezone
+
+import lambda_function
+
+USER_ID = 'voice-user'
+
+
+def put_sample(env, name, age_days):
+    key = f'voice-samples/{USER_ID}/{name}.webm'
+    env.s3.put_object(Bucket=lambda_function.S3_BUCKET, Key=key, Body=b'sample')
+    env.s3.objects[key]['LastModified'] = datetime.now(timezone.utc) - timedelta(days=age_days)
+    return key
+
+
+def test_orphan_cleanup_keeps_current_and_recent_samples(env):
+    current = put_sample(env, 'current', 5)
+    uploading = put_sample(env, 'uploading', 0)
+    stale = put_sample(env, 'stale', lambda_function.VOICE_SAMPLE_GC_MIN_AGE_DAYS + 1)
+
+    assert lambda_function.delete_orphan_voice_samples(USER_ID, keep_key=current) == 1
+    assert current in env.s3.objects
+    assert uploading in env.s3.objects
+    assert stale not in env.s3.objects
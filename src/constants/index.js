@@ -285,6 +285,7 @@ export const DEFAULT_SETTINGS = {
   level: 'intermediate',
   topic: 'business',
   conversationStyle: 'teacher',
+  speculativeReplies: false, // 말하는 중 다음 응답 미리 생성 (스트리밍 STT 모드)
 }
 
 /**
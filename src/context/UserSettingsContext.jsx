@@ -1,7 +1,7 @@
 import { createContext, useContext, useMemo, useCallback } from 'react'
 import { useLocalStorage } from '../hooks/useLocalStorage'
 import { DEFAULT_SETTINGS, ACCENT_LABELS, TUTORS, STORAGE_KEYS } from '../constants'
-import { getFromStorage } from '../utils/helpers'
+import { mergeTutorSettings } from '../utils/helpers'
 
 /**
  * 사용자 설정 Context
@@ -24,21 +24,8 @@ export function UserSettingsProvider({ children }) {
     DEFAULT_SETTINGS
   )
 
-  // 기본값과 병합된 설정 (커스텀 튜터 voiceId 포함)
-  const settings = useMemo(() => {
-    const baseSettings = {
-      ...DEFAULT_SETTINGS,
-      ...storedSettings
-    }
-
-    // 커스텀 튜터가 선택되어 있고 voiceId가 있으면 포함
-    const customTutor = getFromStorage(STORAGE_KEYS.CUSTOM_TUTOR, null)
-    if (storedSettings.tutorId === 'custom-tutor' && customTutor?.voiceId) {
-      baseSettings.voiceId = customTutor.voiceId
-    }
-
-    return baseSettings
-  }, [storedSettings])
+  // 기본값과 병합된 설정 (커스텀 튜터 voiceId 포함, 첫 인사 API와 같은 계산)
+  const settings = useMemo(() => mergeTutorSettings(storedSettings), [storedSettings])
 
   // 튜터 이름 계산
   const tutorName = useMemo(() => {
@@ -1,7 +1,8 @@
 import { useState, useEffect, useRef } from 'react'
-import { useNavigate } from 'react-router-dom'
+import { useNavigate, useLocation } from 'react-router-dom'
 import { Mic, MicOff, Volume2, VolumeX, Captions, X } from 'lucide-react'
-import { sendMessage, textToSpeech, textToSpeechWithCustomVoice, playAudioBase64, speechToText, startSession, endSession, saveMessage, translateText, extractUserInfo } from '../utils/api'
+import { sendMessage, speculateChat, cancelSpeculation, textToSpeech, textToSpeechWithCustomVoice, playAudioBase64, playAudioUrl, speechToText, startSession, endSession, saveMessage, translateText, extractUserInfo, getGreeting } from '../utils/api'
+import { takePrewarmedGreeting } from '../utils/callScheduler'
 import { haptic, configureStatusBar } from '../utils/capacitor'
 import { TranscribeStreamingClient } from '../utils/transcribeStreaming'
 import { useUserSettings, useUsage } from '../context'
@@ -22,6 +23,20 @@ const SUBTITLE_BUTTON_LABELS = {
   off: '자막 끄기'
 }
 
+// 추측 응답 설정 (settings.speculativeReplies로 켬, 스트리밍 STT 모드에서만 동작)
+const SPECULATION_MIN_WORDS = 4     // 이보다 짧은 발화로는 미리 생성하지 않음
+const SPECULATION_STABLE_MS = 400   // 부분 결과가 이 시간 동안 그대로면 말이 멈춘 것으로 보고 생성 시작
+const SPECULATION_MAX_EXTRA_WORDS = 2 // 최종 발화가 추측보다 이만큼 넘게 길어지면 기다리지 않음
+
+// 화면 메시지 → API 메시지 형식 (추측/최종 요청이 같은 기록을 보내야 서버에서 맞춰볼 수 있음)
+const toApiMessages = (list) => list.map(m => ({
+  role: m.role || (m.speaker === 'ai' ? 'assistant' : 'user'),
+  content: m.content
+}))
+
+// 발화 비교용 정규화 (소문자, 구두점 제거)
+const normalizeUtterance = (text) => (text || '').toLowerCase().replace(/[^\w\s']/g, ' ').split(/\s+/).filter(Boolean)
+
 // AI 응답에서 톤 지시어 제거 (예: *in a friendly tone*)
 const cleanSubtitleText = (text) => {
   if (!text) return ''
@@ -33,6 +48,7 @@ const cleanSubtitleText = (text) => {
 
 function Call() {
   const navigate = useNavigate()
+  const location = useLocation()
   const [callTime, setCallTime] = useState(0)
   const [isListening, setIsListening] = useState(false)
   const [isSpeaking, setIsSpeaking] = useState(false)
@@ -82,6 +98,11 @@ function Call() {
   const finalTranscriptRef = useRef('') // 최종 확정 텍스트
   const silenceAfterSpeechTimerRef = useRef(null) // 말 끝난 후 침묵 타이머
 
+  // 추측 응답 refs
+  const messagesRef = useRef([]) // 스트리밍 콜백에서 최신 대화 기록 참조용
+  const speculationRef = useRef(null) // { id, text, promise }
+  const speculationTimerRef = useRef(null)
+
   // 자막 스트리밍 효과용 refs
   const subtitleStreamRef = useRef(null)
   const subtitleWordsRef = useRef([])
@@ -112,6 +133,7 @@ function Call() {
   useEffect(() => { isMutedRef.current = isMuted }, [isMuted])
   useEffect(() => { isProcessingSTTRef.current = isProcessingSTT }, [isProcessingSTT])
   useEffect(() => { sttModeRef.current = sttMode }, [sttMode])
+  useEffect(() => { messagesRef.current = messages }, [messages])
 
   // 타이머
   useEffect(() => {
@@ -363,6 +385,14 @@ function Call() {
           if (silenceAfterSpeechTimerRef.current) {
             clearTimeout(silenceAfterSpeechTimerRef.current)
           }
+
+          // 부분 결과가 잠시 그대로면 다음 응답 미리 생성
+          if (speculationTimerRef.current) {
+            clearTimeout(speculationTimerRef.current)
+          }
+          speculationTimerRef.current = setTimeout(() => {
+            startSpeculation(`${finalTranscriptRef.current} ${text}`)
+          }, SPECULATION_STABLE_MS)
         },
         onTranscript: (text) => {
           // 최종 확정 결과 - 이전 텍스트에 추가 (교체 X)
@@ -376,6 +406,12 @@ function Call() {
             }
             console.log('[Streaming] Accumulated transcript:', finalTranscriptRef.current)
 
+            // 확정 구간이 나오면 바로 미리 생성 (처리까지 1.5초 대기하는 동안 응답 준비)
+            if (speculationTimerRef.current) {
+              clearTimeout(speculationTimerRef.current)
+            }
+            startSpeculation(finalTranscriptRef.current)
+
             // 최종 결과가 오면 잠시 후 처리 (추가 발화 대기)
             if (silenceAfterSpeechTimerRef.current) {
               clearTimeout(silenceAfterSpeechTimerRef.current)
@@ -440,6 +476,52 @@ function Call() {
     setStreamingText('')
   }
 
+  // 부분/확정 발화로 다음 튜터 응답 미리 생성 (같은 발화면 재요청하지 않음)
+  const startSpeculation = (text) => {
+    if (!settings.speculativeReplies) return
+
+    const trimmed = text.trim()
+    if (normalizeUtterance(trimmed).length < SPECULATION_MIN_WORDS) return
+    if (speculationRef.current?.text === trimmed) return
+
+    const id = crypto.randomUUID()
+    const apiMessages = [...toApiMessages(messagesRef.current), { role: 'user', content: trimmed }]
+    console.log('[Speculation] Start:', trimmed)
+
+    speculationRef.current = {
+      id,
+      text: trimmed,
+      promise: speculateChat(apiMessages, id, sessionId, settings, { translateTo: 'ko' })
+        .catch((err) => {
+          console.error('[Speculation] Failed:', err)
+          return null
+        })
+    }
+  }
+
+  // 최종 발화에 쓸 수 있는 추측이면 완료를 기다려 ID 반환, 아니면 폐기
+  const takeSpeculation = async (finalText) => {
+    if (speculationTimerRef.current) {
+      clearTimeout(speculationTimerRef.current)
+      speculationTimerRef.current = null
+    }
+    const speculation = speculationRef.current
+    speculationRef.current = null
+    if (!speculation) return null
+
+    const guessed = normalizeUtterance(speculation.text)
+    const final = normalizeUtterance(finalText)
+    const isPrefix = guessed.every((word, i) => final[i] === word)
+    if (!isPrefix || final.length - guessed.length > SPECULATION_MAX_EXTRA_WORDS) {
+      cancelSpeculation(speculation.id, sessionId).catch(() => {})
+      return null
+    }
+
+    // 진행 중이면 완료까지 대기 (새로 생성하는 것보다 먼저 끝남)
+    const result = await speculation.promise
+    return result?.speculationId ? speculation.id : null
+  }
+
   // Streaming 결과 처리
   const processStreamingResult = async (text) => {
     if (!text || !text.trim()) {
@@ -555,8 +637,9 @@ function Call() {
         }
       }
 
-      // 2. AI 응답 받기
-      const response = await sendMessage([], settings)
+      // 2. AI 응답 받기 (예약 전화로 받았으면 미리 생성한 첫 인사 사용)
+      const greeting = location.state?.fromIncomingCall ? await loadPrewarmedGreeting() : null
+      const response = greeting || await sendMessage([], settings, { translateTo: 'ko' })
       incrementLocal('chat') // 사용량 증가
 
       const aiMessage = {
@@ -567,8 +650,12 @@ function Call() {
       setMessages([aiMessage])
       setCurrentSubtitle(response.message)
 
-      // 3. 번역 가져오기 (비동기, TTS 블로킹하지 않음)
-      fetchTranslation(response.message)
+      // 3. 번역 표시 (채팅 응답에 포함되지 않았으면 별도 요청)
+      if (response.translation) {
+        setCurrentTranslation(response.translation)
+      } else {
+        fetchTranslation(response.message)
+      }
 
       // 4. 첫 AI 메시지 DynamoDB에 저장
       try {
@@ -582,7 +669,7 @@ function Call() {
         console.error('[DB] Failed to save message:', dbErr)
       }
 
-      await speakText(response.message)
+      await speakText(response.message, greeting?.audioUrl)
     } catch (err) {
       console.error('Start conversation error:', err)
       const mockMessage = "Hello! This is " + tutorName + ". How are you doing today?"
@@ -594,6 +681,16 @@ function Call() {
     }
   }
 
+  // 벨이 울리는 동안 준비한 첫 인사 (없으면 예약 시 서버에 만들어 둔 인사)
+  const loadPrewarmedGreeting = async () => {
+    try {
+      return (await takePrewarmedGreeting()) || (await getGreeting()).greeting
+    } catch (err) {
+      console.error('[Greeting] Failed to load prewarmed greeting:', err)
+      return null
+    }
+  }
+
   // 자막 스트리밍 효과 (단어 단위로 자연스럽게 나타남)
   const showSubtitleWithFade = (text) => {
     const cleanedText = cleanSubtitleText(text)
@@ -626,7 +723,7 @@ function Call() {
     }, 60) // 60ms per word for natural reading speed
   }
 
-  const speakText = async (text) => {
+  const speakText = async (text, audioUrl = null) => {
     // 이미 재생 중인 오디오가 있으면 먼저 정지
     if (audioRef.current) {
       audioRef.current.pause()
@@ -652,16 +749,21 @@ function Call() {
     try {
       let ttsResponse
 
-      // 커스텀 음성(voiceId)이 있으면 ElevenLabs 커스텀 TTS 사용
-      if (settings.voiceId) {
-        console.log('[TTS] Using custom voice:', settings.voiceId)
-        ttsResponse = await textToSpeechWithCustomVoice(text, settings.voiceId, settings)
+      if (audioUrl) {
+        // 미리 생성된 음성은 바로 재생
+        await playAudioUrl(audioUrl, audioRef)
       } else {
-        ttsResponse = await textToSpeech(text, settings)
-      }
+        // 커스텀 음성(voiceId)이 있으면 ElevenLabs 커스텀 TTS 사용
+        if (settings.voiceId) {
+          console.log('[TTS] Using custom voice:', settings.voiceId)
+          ttsResponse = await textToSpeechWithCustomVoice(text, settings.voiceId, settings)
+        } else {
+          ttsResponse = await textToSpeech(text, settings)
+        }
 
-      if (ttsResponse.audio) {
-        await playAudioBase64(ttsResponse.audio, audioRef)
+        if (ttsResponse.audio) {
+          await playAudioBase64(ttsResponse.audio, audioRef)
+        }
       }
 
       setIsSpeaking(false)
@@ -852,12 +954,14 @@ function Call() {
     setIsLoading(true)
 
     try {
-      const apiMessages = updatedMessages.map(m => ({
-        role: m.role || (m.speaker === 'ai' ? 'assistant' : 'user'),
-        content: m.content
-      }))
+      const apiMessages = toApiMessages(updatedMessages)
 
-      const response = await sendMessage(apiMessages, settings)
+      // 말하는 중에 미리 생성한 응답이 있으면 서버에서 확인 후 바로 사용
+      const speculationId = await takeSpeculation(text)
+      const response = await sendMessage(apiMessages, settings, { translateTo: 'ko', speculationId, sessionId })
+      if (response.speculated) {
+        console.log('[Speculation] Hit, saved ~', response.latencySavedMs, 'ms')
+      }
 
       const aiMessage = {
         role: 'assistant',
@@ -867,8 +971,12 @@ function Call() {
 
       setMessages(prev => [...prev, aiMessage])
 
-      // 번역 가져오기 (비동기, TTS 블로킹하지 않음)
-      fetchTranslation(response.message)
+      // 번역 표시 (채팅 응답에 포함되지 않았으면 별도 요청)
+      if (response.translation) {
+        setCurrentTranslation(response.translation)
+      } else {
+        fetchTranslation(response.message)
+      }
 
       // AI 응답 DynamoDB에 저장
       try {
@@ -902,6 +1010,15 @@ function Call() {
     clearInterval(timerRef.current)
     cleanupAudio()
 
+    // 사용하지 않은 추측 응답 폐기
+    if (speculationTimerRef.current) {
+      clearTimeout(speculationTimerRef.current)
+    }
+    if (speculationRef.current) {
+      cancelSpeculation(speculationRef.current.id, sessionId).catch(() => {})
+      speculationRef.current = null
+    }
+
     if (audioRef.current) {
       audioRef.current.pause()
       audioRef.current = null
@@ -925,7 +1042,7 @@ function Call() {
 
     // 대화에서 사용자 정보 추출 (비동기 - 백그라운드 처리)
     if (messages.length >= 4) {
-      extractUserInfo(messages)
+      extractUserInfo(messages, sessionId)
         .then(res => {
           if (res.extracted && Object.keys(res.extracted).length > 0) {
             console.log('[Memory] Extracted user info:', Object.keys(res.extracted))
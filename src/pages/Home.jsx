@@ -68,7 +68,7 @@ function Home() {
       console.log('[Home] usePetAsProfile:', usePet)
 
       try {
-        const response = await getPet()
+        const response = await getPet(128) // 프로필 아바타용 썸네일
         console.log('[Home] getPet response:', response)
         if (response.success && response.pet) {
           setPetData({
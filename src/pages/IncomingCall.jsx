@@ -3,12 +3,13 @@
  * @description 전화 수신 화면 - 실제 전화 오는 것처럼 보이는 UI
  */
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate, useLocation } from 'react-router-dom'
 import { Phone, PhoneOff } from 'lucide-react'
 import { haptic } from '../utils/capacitor'
 import { getFromStorage } from '../utils/helpers'
 import { TUTORS } from '../constants'
+import { warmUpIncomingCallGreeting, syncScheduledCalls } from '../utils/callScheduler'
 import './IncomingCall.css'
 
 function IncomingCall() {
@@ -21,6 +22,16 @@ function IncomingCall() {
   const selectedTutorId = getFromStorage('selectedTutor', 'sophia')
   const tutor = TUTORS.find(t => t.id === selectedTutorId) || TUTORS[0]
   const tutorName = getFromStorage('tutorName', tutor.name)
+  const greetingWarmedRef = useRef(false)
+
+  // 벨이 울리는 동안 첫 인사 준비 (받자마자 재생). 설정은 로컬스토리지에서 동기로 읽으므로
+  // 마운트 시점에 이미 확정됨 → 벨 한 번에 한 번만 조회/생성 (조회한 인사는 서버에서 삭제됨)
+  // 준비가 끝나면 반복 일정의 다음 회차를 예약하고 그 회차 인사를 미리 생성
+  useEffect(() => {
+    if (greetingWarmedRef.current) return
+    greetingWarmedRef.current = true
+    warmUpIncomingCallGreeting().finally(() => syncScheduledCalls())
+  }, [])
 
   // 진동 효과 (전화 벨 시뮬레이션)
   useEffect(() => {
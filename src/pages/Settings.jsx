@@ -92,7 +92,7 @@ function Settings() {
   // 반려동물 정보 로드
   const loadPetData = async () => {
     try {
-      const response = await getPet()
+      const response = await getPet(128) // 프로필 아바타용 썸네일
       console.log('[Settings] getPet response:', response)
       if (response.success && response.pet) {
         setPetData({
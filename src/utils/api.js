@@ -11,8 +11,8 @@
  * 모든 API는 단일 Lambda 엔드포인트를 통해 action 파라미터로 구분됩니다.
  */
 
-import { API_URL, FCM_API_URL, SPEEDS } from '../constants'
-import { getTutorSettings } from './helpers'
+import { API_URL, FCM_API_URL, SPEEDS, STORAGE_KEYS } from '../constants'
+import { getTutorSettings, getCallSettings, getFromStorage, setToStorage } from './helpers'
 import { cognitoService } from '../auth'
 
 // ============================================
@@ -28,6 +28,7 @@ const API_ACTIONS = {
   TTS: 'tts',             // 텍스트 → 음성
   STT: 'stt',             // 음성 → 텍스트
   TRANSLATE: 'translate', // 번역
+  TRANSLATE_BATCH: 'translate_batch', // 일괄 번역
   ANALYZE: 'analyze',     // 대화 분석
 }
 
@@ -137,6 +138,39 @@ function blobToBase64(blob) {
   })
 }
 
+/**
+ * S3 Presigned POST로 파일 직접 업로드
+ * Lambda를 거치지 않으므로 base64 변환/페이로드 크기 제한이 없음
+ *
+ * @private
+ * @param {string} kind - 업로드 종류 ('pet_image' | 'voice_sample' | 'stt_audio')
+ * @param {Blob|string} data - 업로드할 Blob 또는 data URL
+ * @returns {Promise<string>} 업로드된 S3 키
+ * @throws {Error} 업로드 정책 발급 또는 업로드 실패 시
+ */
+async function uploadToS3(kind, data) {
+  const blob = typeof data === 'string' ? await (await fetch(data)).blob() : data
+
+  const upload = await apiRequest(
+    {
+      action: 'get_upload_url',
+      kind,
+      contentType: blob.type,
+    },
+    'GetUploadUrl'
+  )
+
+  const formData = new FormData()
+  Object.entries(upload.fields).forEach(([key, value]) => formData.append(key, value))
+  formData.append('file', blob) // file 필드는 마지막에 위치해야 함
+
+  const response = await fetch(upload.url, { method: 'POST', body: formData })
+  if (!response.ok) {
+    throw new Error(`S3 upload error: ${response.status}`)
+  }
+  return upload.s3Key
+}
+
 // ============================================
 // AI 채팅 API
 // ============================================
@@ -149,16 +183,23 @@ function blobToBase64(blob) {
  * @param {Object} messages[].role - 메시지 역할 ('user' | 'assistant')
  * @param {string} messages[].content - 메시지 내용
  * @param {Object} [settings] - 튜터 설정 (없으면 로컬스토리지에서 로드)
+ * @param {Object} [options] - 추가 옵션
+ * @param {string} [options.translateTo] - 지정 시 응답 번역을 함께 반환 (예: 'ko')
+ * @param {string} [options.speculationId] - speculateChat으로 미리 생성한 응답 ID (맞으면 즉시 반환)
+ * @param {string} [options.sessionId] - 세션 ID (추측 응답 조회용)
  * @returns {Promise<Object>} AI 응답
  * @returns {string} return.message - AI의 응답 메시지
+ * @returns {string} [return.translation] - translateTo 지정 시 번역된 응답
+ * @returns {boolean} [return.speculated] - 미리 생성한 응답을 사용했는지
  *
  * @example
  * const response = await sendMessage([
  *   { role: 'user', content: 'Hello!' }
- * ])
+ * ], null, { translateTo: 'ko' })
  * console.log(response.message) // "Hello! How are you today?"
+ * console.log(response.translation) // "안녕하세요! 오늘 어떠세요?"
  */
-export async function sendMessage(messages, settings = null) {
+export async function sendMessage(messages, settings = null, options = {}) {
   const currentSettings = settings || getTutorSettings()
 
   return apiRequest(
@@ -166,11 +207,59 @@ export async function sendMessage(messages, settings = null) {
       action: API_ACTIONS.CHAT,
       messages,
       settings: currentSettings,
+      ...(options.translateTo && { translateTo: options.translateTo }),
+      ...(options.speculationId && { speculationId: options.speculationId, sessionId: options.sessionId }),
     },
     'Chat'
   )
 }
 
+/**
+ * 사용자가 말하는 중(부분 인식 결과)에 다음 튜터 응답을 미리 생성
+ * 최종 발화로 sendMessage를 호출할 때 같은 speculationId를 넘기면
+ * 서버가 발화 유사도를 비교해 맞으면 미리 만든 응답을 바로 반환
+ *
+ * @param {Array} messages - 대화 히스토리 + 부분 인식된 사용자 발화 (마지막)
+ * @param {string} speculationId - 추측 식별자
+ * @param {string} sessionId - 세션 ID
+ * @param {Object} [settings] - 튜터 설정
+ * @param {Object} [options] - sendMessage와 같은 옵션 (translateTo)
+ * @returns {Promise<Object>} { speculationId, generationMs }
+ */
+export async function speculateChat(messages, speculationId, sessionId, settings = null, options = {}) {
+  const currentSettings = settings || getTutorSettings()
+
+  return apiRequest(
+    {
+      action: 'speculate_chat',
+      messages,
+      speculationId,
+      sessionId,
+      settings: currentSettings,
+      ...(options.translateTo && { translateTo: options.translateTo }),
+    },
+    'SpeculateChat'
+  )
+}
+
+/**
+ * 미리 생성한 응답 폐기 (사용자가 말을 이어가 추측이 빗나간 경우)
+ *
+ * @param {string} speculationId - 추측 식별자
+ * @param {string} sessionId - 세션 ID
+ * @returns {Promise<Object>} { success }
+ */
+export async function cancelSpeculation(speculationId, sessionId) {
+  return apiRequest(
+    {
+      action: 'cancel_speculation',
+      speculationId,
+      sessionId,
+    },
+    'CancelSpeculation'
+  )
+}
+
 // ============================================
 // 대화 분석 API
 // ============================================
@@ -233,6 +322,32 @@ export async function translateText(text, sourceLang = 'en', targetLang = 'ko')
   )
 }
 
+/**
+ * 여러 텍스트 일괄 번역 (AWS Translate)
+ * 대화 기록 전체를 한 번의 호출로 번역하며, 결과는 입력 순서와 동일
+ *
+ * @param {string[]} texts - 번역할 텍스트 배열 (최대 100개)
+ * @param {string} [sourceLang='en'] - 원본 언어 코드
+ * @param {string} [targetLang='ko'] - 대상 언어 코드
+ * @returns {Promise<Object>} 번역 결과
+ * @returns {string[]} return.translations - 입력 순서의 번역 텍스트 (실패 항목은 null)
+ *
+ * @example
+ * const result = await translateBatch(messages.map(m => m.content))
+ * console.log(result.translations[0])
+ */
+export async function translateBatch(texts, sourceLang = 'en', targetLang = 'ko') {
+  return apiRequest(
+    {
+      action: API_ACTIONS.TRANSLATE_BATCH,
+      texts,
+      sourceLang,
+      targetLang,
+    },
+    'TranslateBatch'
+  )
+}
+
 // ============================================
 // 음성 합성 (TTS) API
 // ============================================
@@ -279,6 +394,21 @@ export async function textToSpeech(text, settings = null) {
  * // 정지: audioRef.current?.pause()
  */
 export function playAudioBase64(base64Audio, audioRef = null) {
+  return playAudioUrl(`data:audio/mpeg;base64,${base64Audio}`, audioRef)
+}
+
+/**
+ * URL(presigned S3 URL 등)의 오디오를 재생
+ *
+ * @param {string} url - 오디오 URL
+ * @param {Object} [audioRef] - React ref 객체 (재생 중 오디오 참조 저장용)
+ * @returns {Promise<void>} 재생 완료 시 resolve
+ *
+ * @example
+ * const { greeting } = await getGreeting()
+ * await playAudioUrl(greeting.audioUrl, audioRef)
+ */
+export function playAudioUrl(url, audioRef = null) {
   return new Promise((resolve, reject) => {
     try {
       // 이전 오디오가 있으면 먼저 정지
@@ -293,7 +423,7 @@ export function playAudioBase64(base64Audio, audioRef = null) {
         speechSynthesis.cancel()
       }
 
-      const audio = new Audio(`data:audio/mpeg;base64,${base64Audio}`)
+      const audio = new Audio(url)
 
       // audioRef가 제공되면 참조 저장 (정지 가능하도록)
       if (audioRef) {
@@ -398,13 +528,13 @@ export async function speakText(text, settings = null, audioRef = null) {
  * console.log(result.transcript) // "Hello, how are you?"
  */
 export async function speechToText(audioBlob, language = 'en-US') {
-  // Blob을 Base64로 변환
-  const base64Audio = await blobToBase64(audioBlob)
+  // S3에 직접 업로드 후 키만 전달
+  const s3Key = await uploadToS3('stt_audio', audioBlob)
 
   return apiRequest(
     {
       action: API_ACTIONS.STT,
-      audio: base64Audio,
+      s3Key,
       language,
     },
     'STT'
@@ -884,7 +1014,7 @@ export async function sendPushNotification(deviceId, title, body, data = {}) {
 /**
  * 펫 이미지를 S3에 업로드
  *
- * @param {string} imageBase64 - Base64 인코딩된 이미지 데이터
+ * @param {string|Blob} imageBase64 - 이미지 data URL 또는 Blob
  * @returns {Promise<Object>} 업로드 결과
  * @returns {boolean} return.success - 성공 여부
  * @returns {string} return.imageUrl - S3 이미지 URL
@@ -895,10 +1025,13 @@ export async function sendPushNotification(deviceId, title, body, data = {}) {
  * console.log(result.imageUrl)
  */
 export async function uploadPetImage(imageBase64) {
+  // S3에 직접 업로드 후 키만 전달
+  const s3Key = await uploadToS3('pet_image', imageBase64)
+
   return apiRequest(
     {
       action: 'upload_pet_image',
-      image: imageBase64,
+      s3Key,
     },
     'UploadPetImage'
   )
@@ -930,6 +1063,7 @@ export async function savePet(petName, imageUrl) {
 /**
  * 서버에서 펫 정보 조회
  *
+ * @param {number} [imageSize] - 표시 크기(px). 지정 시 그 이상인 가장 작은 썸네일 URL 반환
  * @returns {Promise<Object>} 펫 정보
  * @returns {boolean} return.success - 성공 여부
  * @returns {Object|null} return.pet - 펫 정보 (없으면 null)
@@ -938,15 +1072,16 @@ export async function savePet(petName, imageUrl) {
  * @returns {string} return.pet.updatedAt - 마지막 업데이트 시간
  *
  * @example
- * const { pet } = await getPet()
+ * const { pet } = await getPet(128)
  * if (pet) {
  *   console.log(pet.name, pet.imageUrl)
  * }
  */
-export async function getPet() {
+export async function getPet(imageSize = null) {
   return apiRequest(
     {
       action: 'get_pet',
+      ...(imageSize && { imageSize }),
     },
     'GetPet'
   )
@@ -994,14 +1129,16 @@ export async function saveCustomTutor(tutorData) {
 /**
  * 서버에서 커스텀 튜터 정보 조회 (presigned URL 포함)
  *
+ * @param {number} [imageSize] - 표시 크기(px). 지정 시 그 이상인 가장 작은 썸네일 URL 반환
  * @returns {Promise<Object>} 튜터 정보
  * @returns {boolean} return.success - 성공 여부
  * @returns {Object|null} return.tutor - 튜터 정보 (없으면 null)
  */
-export async function getCustomTutor() {
+export async function getCustomTutor(imageSize = null) {
   return apiRequest(
     {
       action: 'get_custom_tutor',
+      ...(imageSize && { imageSize }),
     },
     'GetCustomTutor'
   )
@@ -1028,7 +1165,7 @@ export async function deleteCustomTutor() {
 /**
  * 음성 클로닝 - 사용자 음성으로 AI 튜터 음성 생성
  *
- * @param {string} audioBase64 - Base64 인코딩된 오디오 데이터 (webm/mp3)
+ * @param {string|Blob} audioBase64 - 오디오 data URL 또는 Blob (webm/mp3)
  * @param {string} voiceName - 음성 이름 (튜터 이름)
  * @returns {Promise<Object>} 클로닝 결과
  * @returns {boolean} return.success - 성공 여부
@@ -1040,10 +1177,13 @@ export async function deleteCustomTutor() {
  * console.log(result.voiceId) // 'abc123...'
  */
 export async function cloneVoice(audioBase64, voiceName) {
+  // S3에 직접 업로드 후 키만 전달
+  const s3Key = await uploadToS3('voice_sample', audioBase64)
+
   return apiRequest(
     {
       action: 'clone_voice',
-      audio: audioBase64,
+      s3Key,
       voiceName,
     },
     'CloneVoice'
@@ -1052,12 +1192,15 @@ export async function cloneVoice(audioBase64, voiceName) {
 
 /**
  * 클로닝된 음성으로 TTS 생성 (ElevenLabs)
+ * 음성이 서버에서 삭제되었으면 기본 음성 오디오와 voiceUnavailable=true가 오고,
+ * 로컬 커스텀 튜터의 voiceId를 지워 다음 통화부터 기본 음성을 사용
  *
  * @param {string} text - 변환할 텍스트
  * @param {string} voiceId - ElevenLabs Voice ID
  * @param {Object} [settings] - 추가 설정
  * @returns {Promise<Object>} TTS 응답
  * @returns {string} return.audio - Base64 인코딩된 오디오
+ * @returns {boolean} [return.voiceUnavailable] - 커스텀 음성이 없어 기본 음성으로 대체됨
  *
  * @example
  * const response = await textToSpeechWithCustomVoice('Hello!', voiceId)
@@ -1066,7 +1209,7 @@ export async function cloneVoice(audioBase64, voiceName) {
 export async function textToSpeechWithCustomVoice(text, voiceId, settings = null) {
   const currentSettings = settings || getTutorSettings()
 
-  return apiRequest(
+  const response = await apiRequest(
     {
       action: 'tts_custom_voice',
       text,
@@ -1075,6 +1218,57 @@ export async function textToSpeechWithCustomVoice(text, voiceId, settings = null
     },
     'TTSCustomVoice'
   )
+
+  if (response?.voiceUnavailable) {
+    const customTutor = getFromStorage(STORAGE_KEYS.CUSTOM_TUTOR, null)
+    if (customTutor?.voiceId === voiceId) {
+      const updatedTutor = { ...customTutor }
+      delete updatedTutor.voiceId
+      setToStorage(STORAGE_KEYS.CUSTOM_TUTOR, updatedTutor)
+    }
+  }
+  return response
+}
+
+// ============================================
+// 첫 인사 사전 생성 API (예약 전화)
+// ============================================
+
+/**
+ * 첫 인사(문장 + 번역 + 음성) 사전 생성
+ * 예약 직후/벨이 울리는 동안 미리 만들어 받자마자 재생
+ * 튜터 설정은 항상 getCallSettings()로 만들어 보냄 (getGreeting·통화 화면과 같은 설정 지문)
+ *
+ * @param {number} [scheduledFor] - 예약 시각 (epoch ms, 유효 시간 계산용)
+ * @param {boolean} [persist=true] - 서버에 저장해 getGreeting으로 받을 수 있게 할지
+ * @returns {Promise<Object>} { greeting: { message, translation, audioUrl, engine }, expiresAt }
+ */
+export async function prepareGreeting(scheduledFor = null, persist = true) {
+  return apiRequest(
+    {
+      action: 'prepare_greeting',
+      settings: getCallSettings(),
+      persist,
+      ...(scheduledFor && { scheduledFor }),
+    },
+    'PrepareGreeting'
+  )
+}
+
+/**
+ * 사전 생성된 첫 인사 조회 (한 번 사용하면 서버에서 삭제)
+ * 생성 후 설정이 바뀌었거나 만료되었으면 greeting이 null (설정은 prepareGreeting과 같은 방식으로 계산)
+ *
+ * @returns {Promise<Object>} { greeting: { message, translation, audioUrl, engine } | null }
+ */
+export async function getGreeting() {
+  return apiRequest(
+    {
+      action: 'get_greeting',
+      settings: getCallSettings(),
+    },
+    'GetGreeting'
+  )
 }
 
 // ============================================
@@ -1128,21 +1322,25 @@ export async function saveUserMemory(memory) {
 /**
  * 대화에서 사용자 정보 추출
  * AI가 대화 내용을 분석하여 사용자 정보 자동 추출 및 저장
+ * sessionId를 넘기면 서버에 저장된 메시지 중 아직 추출하지 않은 부분만 비동기 처리
  *
  * @param {Array} messages - 대화 메시지 배열
+ * @param {string} [sessionId] - 세션 ID (워터마크 기반 증분 추출)
  * @returns {Promise<Object>} 추출 결과
  * @returns {boolean} return.success - 성공 여부
- * @returns {Object} return.extracted - 추출된 정보
+ * @returns {boolean} return.queued - 비동기 큐에 등록된 경우 true (extracted 없음)
+ * @returns {Object} [return.extracted] - 추출된 정보
  *
  * @example
  * const { extracted } = await extractUserInfo(messages)
  * console.log(extracted) // { name: 'John', job: 'Engineer', hobbies: ['coding'] }
  */
-export async function extractUserInfo(messages) {
+export async function extractUserInfo(messages, sessionId = null) {
   return apiRequest(
     {
       action: 'extract_user_info',
       messages,
+      ...(sessionId && { sessionId }),
     },
     'ExtractUserInfo'
   )
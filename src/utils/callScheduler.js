@@ -5,10 +5,70 @@
  */
 
 import { Capacitor, registerPlugin } from '@capacitor/core';
+import { prepareGreeting, getGreeting } from './api';
+import { getFromStorage } from './helpers';
 
 // 네이티브 플러그인 등록
 const CallScheduler = registerPlugin('CallScheduler');
 
+// 이 시간 안에 울릴 예약 전화만 첫 인사를 미리 생성 (서버 보관 시간과 동일)
+const GREETING_PREWARM_WINDOW_MS = 24 * 60 * 60 * 1000;
+
+// 벨이 울리는 동안 준비 중/완료된 첫 인사 (전화 화면에서 한 번 꺼내 씀)
+let pendingGreeting = null;
+
+// 반복 일정 요일 → Date.getDay() 값
+const DAY_OF_WEEK = {
+  sunday: 0,
+  monday: 1,
+  tuesday: 2,
+  wednesday: 3,
+  thursday: 4,
+  friday: 5,
+  saturday: 6
+};
+
+// 반복 일정 알람 식별자 시작값
+const SCHEDULE_REQUEST_CODE_START = 1000;
+
+/**
+ * 예약 전화의 첫 인사(문장 + 번역 + 음성)를 서버에 미리 생성해 둠
+ * 전화를 받으면 getGreeting으로 바로 받아 재생
+ * @param {number} [scheduledFor] - 예약 시각 (epoch ms)
+ */
+export async function prewarmGreeting(scheduledFor = null) {
+  try {
+    await prepareGreeting(scheduledFor);
+    console.log('[CallScheduler] Greeting prewarmed for', new Date(scheduledFor || Date.now()));
+  } catch (error) {
+    console.error('[CallScheduler] Greeting prewarm failed:', error);
+  }
+}
+
+/**
+ * 전화 벨이 울리기 시작할 때 한 번 호출: 미리 만든 인사를 받아두고, 없으면 지금 생성
+ * @returns {Promise<Object|null>} 인사 (실패 시 null)
+ */
+export function warmUpIncomingCallGreeting() {
+  pendingGreeting = getGreeting()
+    .then((response) => response?.greeting || prepareGreeting(null, false).then((r) => r?.greeting || null))
+    .catch((error) => {
+      console.error('[CallScheduler] Greeting warm-up failed:', error);
+      return null;
+    });
+  return pendingGreeting;
+}
+
+/**
+ * 벨이 울리는 동안 준비한 첫 인사를 꺼냄 (한 번만 사용)
+ * @returns {Promise<Object|null>} 인사 또는 null
+ */
+export function takePrewarmedGreeting() {
+  const greeting = pendingGreeting;
+  pendingGreeting = null;
+  return greeting || Promise.resolve(null);
+}
+
 /**
  * 플랫폼 체크
  */
@@ -130,8 +190,9 @@ export async function scheduleTestCall(delaySeconds = 5, tutorName = 'AI Tutor')
  * @param {Date} triggerDate - 전화가 올 시간
  * @param {string} tutorName - 튜터 이름
  * @param {number} requestCode - 알람 식별자 (취소 시 필요)
+ * @param {boolean} [prewarm=true] - 곧 울릴 전화면 첫 인사를 미리 생성할지
  */
-export async function scheduleCall(triggerDate, tutorName = 'AI Tutor', requestCode = 0) {
+export async function scheduleCall(triggerDate, tutorName = 'AI Tutor', requestCode = 0, prewarm = true) {
   if (!isAndroid()) {
     console.log('[CallScheduler] Not Android, cannot schedule');
     return { scheduled: false, reason: 'Not Android' };
@@ -144,6 +205,12 @@ export async function scheduleCall(triggerDate, tutorName = 'AI Tutor', requestC
       requestCode
     });
     console.log('[CallScheduler] Call scheduled:', result);
+
+    // 곧 울릴 전화면 첫 인사를 미리 만들어 둠 (받자마자 재생)
+    const triggerTime = triggerDate.getTime();
+    if (prewarm && triggerTime - Date.now() <= GREETING_PREWARM_WINDOW_MS) {
+      prewarmGreeting(triggerTime);
+    }
     return result;
   } catch (error) {
     console.error('[CallScheduler] Error scheduling call:', error);
@@ -151,6 +218,61 @@ export async function scheduleCall(triggerDate, tutorName = 'AI Tutor', requestC
   }
 }
 
+/**
+ * 반복 일정의 다음 발생 시각 (오늘 해당 요일이지만 시간이 지났으면 다음 주)
+ * @param {string} dayId - 요일 (sunday ~ saturday)
+ * @param {string} time - 시각 (HH:mm)
+ * @param {Date} [now] - 기준 시각
+ * @returns {Date} 다음 발생 시각
+ */
+export function getNextOccurrence(dayId, time, now = new Date()) {
+  const [hours, minutes] = time.split(':').map(Number);
+  const next = new Date(now);
+  next.setHours(hours, minutes, 0, 0);
+
+  let daysUntilTarget = (DAY_OF_WEEK[dayId] - now.getDay() + 7) % 7;
+  if (daysUntilTarget === 0 && next <= now) {
+    daysUntilTarget = 7;
+  }
+  next.setDate(now.getDate() + daysUntilTarget);
+  return next;
+}
+
+/**
+ * 반복 일정 전체를 다음 발생 시각으로 네이티브 예약
+ * 일정 변경 시와 예약 전화가 울린 뒤(다음 회차 예약) 호출.
+ * 첫 인사는 가장 가까운 회차 하나만 미리 생성 (서버에 한 건만 보관되므로)
+ * @param {Object} [allSchedules] - 요일별 일정 (기본값: 저장된 일정)
+ */
+export async function syncScheduledCalls(allSchedules = getFromStorage('callSchedules', {})) {
+  if (!isAndroid()) return;
+
+  const tutorName = getFromStorage('tutorName', 'AI Tutor');
+  let requestCode = SCHEDULE_REQUEST_CODE_START;
+  let soonest = null;
+
+  for (const [dayId, daySchedules] of Object.entries(allSchedules)) {
+    for (const schedule of daySchedules) {
+      const nextOccurrence = getNextOccurrence(dayId, schedule.time);
+      try {
+        await scheduleCall(nextOccurrence, tutorName, requestCode, false);
+        console.log(`[CallScheduler] Call scheduled for ${dayId} ${schedule.time}, next: ${nextOccurrence}`);
+        if (!soonest || nextOccurrence < soonest) {
+          soonest = nextOccurrence;
+        }
+      } catch (error) {
+        console.error('[CallScheduler] Failed to schedule call:', error);
+      }
+      requestCode++;
+    }
+  }
+
+  if (soonest && soonest.getTime() - Date.now() <= GREETING_PREWARM_WINDOW_MS) {
+    prewarmGreeting(soonest.getTime());
+  }
+  console.log('[CallScheduler] All schedules synced');
+}
+
 /**
  * 예약된 전화 취소
  * @param {number} requestCode - 알람 식별자
@@ -193,11 +315,15 @@ export async function triggerCallNow(tutorName = 'AI Tutor') {
 export default {
   scheduleTestCall,
   scheduleCall,
+  syncScheduledCalls,
   cancelCall,
   triggerCallNow,
   checkPermissions,
   requestExactAlarmPermission,
   requestBatteryOptimizationExemption,
   ensurePermissions,
+  prewarmGreeting,
+  warmUpIncomingCallGreeting,
+  takePrewarmedGreeting,
   isAndroid
 };
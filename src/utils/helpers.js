@@ -112,6 +112,35 @@ export function getTutorSettings() {
   }
 }
 
+/**
+ * 저장된 튜터 설정을 기본값과 병합 (커스텀 튜터 선택 시 커스텀 음성 voiceId 포함)
+ * UserSettingsContext와 첫 인사 API가 같은 설정을 쓰도록 한 곳에서 계산
+ *
+ * @param {Object} storedSettings - 로컬스토리지의 튜터 설정
+ * @returns {Object} 통화에 쓰는 튜터 설정
+ */
+export function mergeTutorSettings(storedSettings) {
+  const settings = {
+    ...DEFAULT_SETTINGS,
+    ...storedSettings
+  }
+
+  const customTutor = getFromStorage(STORAGE_KEYS.CUSTOM_TUTOR, null)
+  if (storedSettings.tutorId === 'custom-tutor' && customTutor?.voiceId) {
+    settings.voiceId = customTutor.voiceId
+  }
+  return settings
+}
+
+/**
+ * 통화에 쓰는 튜터 설정 (useUserSettings().settings와 동일, 컴포넌트 밖에서 사용)
+ *
+ * @returns {Object} 튜터 설정 객체
+ */
+export function getCallSettings() {
+  return mergeTutorSettings(getFromStorage(STORAGE_KEYS.TUTOR_SETTINGS, DEFAULT_SETTINGS))
+}
+
 /**
  * 튜터 설정을 로컬스토리지에 저장
  *